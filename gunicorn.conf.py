@@ -0,0 +1,75 @@
+# Production server settings, used by startup.sh:
+#   gunicorn --config gunicorn.conf.py
+#
+# The app is imported once in the master process (preload_app), which loads the spaCy
+# pipeline, the matcher, the lexicon and the endpoint registry before any worker is
+# forked. The workers share those pages copy-on-write instead of each loading its own
+# copy. gc.freeze() moves everything loaded so far out of the garbage collector's reach,
+# so collections in the workers do not write to (and so copy) the shared pages.
+#
+# Settings come from environment variables:
+#   GunicornWorkers  worker processes (default: the number of CPUs)
+#   GunicornThreads  request threads per worker (default 4)
+#   GunicornTimeout  seconds before a silent worker is restarted (default 60)
+#   GunicornPreload  "false" to load the app in each worker instead, e.g. to compare
+#                    memory use (default "true")
+#   GunicornFreeze   "false" to skip gc.freeze() in a preloaded master, e.g. to compare
+#                    memory use (default "true")
+#   PROMETHEUS_MULTIPROC_DIR  where the workers write their metrics for /metrics to add
+#                    up (default: a moderation-api-metrics folder in the temp folder).
+#                    It is emptied at startup, so values from a previous run are dropped
+import gc
+import glob
+import multiprocessing
+import os
+import tempfile
+
+wsgi_app = "app:app"
+pythonpath = "src"
+bind = "0.0.0.0:5000"
+
+workers = int(os.getenv("GunicornWorkers", multiprocessing.cpu_count()))
+threads = int(os.getenv("GunicornThreads", 4))
+worker_class = "gthread" if threads > 1 else "sync"
+timeout = int(os.getenv("GunicornTimeout", 60))
+preload_app = os.getenv("GunicornPreload", "true").lower() == "true"
+freeze = os.getenv("GunicornFreeze", "true").lower() == "true"
+
+accesslog = "-"
+
+# Must be set before the app, and with it prometheus_client, is imported
+metrics_dir = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR",
+    os.path.join(tempfile.gettempdir(), "moderation-api-metrics"),
+)
+os.makedirs(metrics_dir, exist_ok=True)
+for stale in glob.glob(os.path.join(metrics_dir, "*.db")):
+    os.remove(stale)
+
+
+def when_ready(server):
+    """Freeze the master's objects and drop its gauges, once, before the first fork"""
+    from prometheus_client import multiprocess
+
+    if preload_app and freeze:
+        gc.freeze()
+        server.log.info(f"Froze {gc.get_freeze_count()} objects loaded by the master")
+    # A preloaded master recorded the lexicon version it loaded, but serves no
+    # requests and never reloads; only the workers report the version they use
+    multiprocess.mark_process_dead(os.getpid())
+
+
+def post_fork(server, worker):
+    """Report the lexicon version and start the threads of a worker, not the master"""
+    from helpers.metrics import record_lexicon_version
+    from lexicon import get_lexicon, start_lexicon_watcher
+
+    record_lexicon_version(get_lexicon().version)
+    start_lexicon_watcher()
+
+
+def child_exit(server, worker):
+    """Stop reporting a dead worker's gauges, e.g. its queued rule calls, in /metrics"""
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
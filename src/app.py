@@ -1,16 +1,52 @@
 import json
+import time
 
 import dotenv
 from flask import Flask, Response, request
 
-from hardrules import HardRules
+from config import (
+    BATCH_DEADLINE_SECONDS,
+    MAX_BATCH_SIZE,
+    REQUEST_DEADLINE_SECONDS,
+)
+from hardrules import apply_batch, apply_review
 from helpers import common_functions
+from helpers.endpoints import endpoints
+from helpers.executor import get_rule_executor
 from helpers.logging_config import configure_logging
+from helpers.metrics import render
+from helpers.micro_batch import batching_stats
+from helpers.request_timing import DEBUG_TIMING_HEADER, RequestTiming, wants_timing
+from helpers.review_api import batch_error, build_response, parse_review
+from helpers.spacy_pipeline import log_pipeline_report
+from lexicon import get_lexicon, reload_lexicon, start_lexicon_watcher
+from src.spacy_nlp_matcher_making import pipeline_report
 
 app = Flask(__name__, static_folder="./static")
 
 configure_logging()
-common_functions.load_env_variables()
+log_pipeline_report(pipeline_report)
+# Fail at startup, rather than on the first review, if any model endpoint is missing
+endpoints.load()
+# Load the word lists now, so a missing list fails startup rather than the first
+# review. Under gunicorn this runs in the master, and each worker starts its own
+# watcher for edits to the lists in post_fork (gunicorn.conf.py)
+get_lexicon()
+
+
+def lexicon_response(body, lexicon, status=200):
+    """Build a JSON response reporting the lexicon version that produced it"""
+    return Response(
+        response=json.dumps(body),
+        status=status,
+        content_type="application/json",
+        headers={"X-Lexicon-Version": lexicon.version},
+    )
+
+
+def is_admin_request():
+    """True if the request carries the admin key. Admin routes are off without one"""
+    return common_functions.is_admin_authorization(request.headers.get("Authorization"))
 
 
 # Route used by the auto moderation tool
@@ -20,27 +56,162 @@ def automoderator():
     if request.method != "POST":
         return False
 
+    # Rules that have not returned by the deadline are reported as timed out
+    deadline = time.monotonic() + REQUEST_DEADLINE_SECONDS
+    started = time.perf_counter()
+
     data = request.get_json()
-    request_id_key = next(iter(data))
-    request_id = data[request_id_key]
+    request_id_key, request_id, title, comment, org = parse_review(data)
+
+    # Only a request that asks for a timing breakdown has its work timed
+    timing = None
+    if wants_timing(request.headers.get(DEBUG_TIMING_HEADER), data, is_admin_request()):
+        timing = RequestTiming(["title", "comment"], started)
+        timing.record("parse_json", time.perf_counter() - started)
+
+    # One snapshot of the word lists for the whole review, even if they are reloaded
+    lexicon = get_lexicon()
+
+    # Moderate the title and comment as one task graph: each text's rules start as
+    # soon as it is parsed, and every rule of both texts is in flight at once
+    title, comment = apply_review(
+        [title, comment],
+        org_name=org,
+        lexicon=lexicon,
+        deadline=deadline,
+        timing=timing,
+    )
+
+    Automoderator = build_response(request_id_key, request_id, title, comment)
+
+    if timing:
+        # The time to encode the response as it would be without the breakdown
+        start = time.perf_counter()
+        json.dumps(Automoderator)
+        timing.record("serialise", time.perf_counter() - start)
+        Automoderator["timing"] = timing.report()
+
+    return lexicon_response(Automoderator, lexicon)
+
+
+# Route used to moderate a backlog of reviews in one call
+@app.route("/automoderator/batch", methods=["POST"])
+def automoderator_batch():
+
+    # Rules that have not returned by the deadline are reported as timed out
+    deadline = time.monotonic() + BATCH_DEADLINE_SECONDS
+
+    data = request.get_json()
+
+    if not isinstance(data, list):
+        return Response(
+            response=json.dumps({"error": "expected a list of reviews"}),
+            status=400,
+            content_type="application/json",
+        )
+    if len(data) > MAX_BATCH_SIZE:
+        return Response(
+            response=json.dumps(
+                {"error": f"at most {MAX_BATCH_SIZE} reviews are accepted per batch"}
+            ),
+            status=400,
+            content_type="application/json",
+        )
+
+    # Parse every item up front so a malformed review only fails itself
+    parsed = []
+    for item in data:
+        try:
+            parsed.append(parse_review(item))
+        except (KeyError, IndexError, TypeError, StopIteration) as e:
+            parsed.append(e)
+
+    reviews = []
+    for review in parsed:
+        if not isinstance(review, Exception):
+            _, _, title, comment, org = review
+            reviews.extend([(title, org), (comment, org)])
+
+    lexicon = get_lexicon()
+    results = iter(apply_batch(reviews, lexicon=lexicon, deadline=deadline))
+
+    Automoderator = []
+    for item, review in zip(data, parsed):
+        if isinstance(review, Exception):
+            Automoderator.append(batch_error(item, review))
+            continue
+
+        request_id_key, request_id, _, _, _ = review
+        title, comment = next(results), next(results)
+        for result in (title, comment):
+            if isinstance(result, Exception):
+                Automoderator.append(batch_error(item, result))
+                break
+        else:
+            Automoderator.append(
+                build_response(request_id_key, request_id, title, comment)
+            )
+
+    return lexicon_response(Automoderator, lexicon)
+
+
+# Route used to load edited word lists straight away, rather than at the next check by
+# the lexicon watcher. It reloads the worker that handles it; the others pick the
+# change up from their own watchers.
+@app.route("/admin/lexicon/reload", methods=["POST"])
+def reload_word_lists():
+
+    if not is_admin_request():
+        return Response(status=403)
+
+    reloaded = reload_lexicon(force=True)
+    lexicon = get_lexicon()
+
+    return lexicon_response({"version": lexicon.version, "reloaded": reloaded}, lexicon)
+
+
+# Route reporting how busy this worker's rule executor is: queue depth, active threads
+# and how long rule calls wait for a thread
+@app.route("/admin/executor", methods=["GET"])
+def executor_stats():
+
+    if not is_admin_request():
+        return Response(status=403)
+
+    return Response(
+        response=json.dumps(get_rule_executor().stats()),
+        status=200,
+        content_type="application/json",
+    )
+
+
+# Route reporting how this worker's scoring calls to the batched endpoints were sized
+@app.route("/admin/batching", methods=["GET"])
+def micro_batch_stats():
+
+    if not is_admin_request():
+        return Response(status=403)
+
+    return Response(
+        response=json.dumps(batching_stats()),
+        status=200,
+        content_type="application/json",
+    )
+
 
-    title = data["request"][0]["text"]
-    comment = data["request"][1]["text"]
-    org = data["organisation-name"]
-    # call HardRules on the title:
-    title = HardRules(body=title, org_name=org).apply()
-    title["id"] = "title"
-    # call HardRules on the comment:
-    comment = HardRules(body=comment, org_name=org).apply()
-    comment["id"] = "comment"
+# Route serving the metrics of every worker in the Prometheus text format, for
+# Prometheus to scrape with the admin key as its bearer token
+@app.route("/metrics", methods=["GET"])
+def metrics():
 
-    Automoderator = {
-        "{}".format(request_id_key): "{}".format(request_id),
-        "response": [title, comment],
-    }
+    if not is_admin_request():
+        return Response(status=403)
 
-    return Response(response=json.dumps(Automoderator), content_type="application/json")
+    body, content_type = render()
+    return Response(response=body, status=200, content_type=content_type)
 
 
 if __name__ == "__main__":
+    # Pick up edits to the word lists without a restart
+    start_lexicon_watcher()
     app.run(host="localhost", port=8080, debug=True)
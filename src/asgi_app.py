@@ -0,0 +1,157 @@
+# Async entry point serving the same /automoderator contract as the Flask app in app.py,
+# for an ASGI server. From the src folder:
+#   uvicorn asgi_app:app --host 0.0.0.0 --port 5000
+#
+# A request holds no thread while it waits. The review is handed to the shared event
+# loop (helpers/event_loop.py) as one task graph: the title and comment are parsed by
+# spaCy, which is CPU bound, on the rule executor so parsing cannot stall the server's
+# event loop, and every rule call for both texts is awaited at once. One process can
+# hold hundreds of requests in flight; calls beyond MODEL_CALL_WORKERS queue for a
+# thread rather than each request tying one up.
+import json
+import time
+
+from config import REQUEST_DEADLINE_SECONDS
+from hardrules import apply_review_async
+from helpers import common_functions
+from helpers.endpoints import endpoints
+from helpers.event_loop import run_on_shared_loop
+from helpers.logging_config import configure_logging
+from helpers.request_timing import DEBUG_TIMING_HEADER, RequestTiming, wants_timing
+from helpers.review_api import build_response, parse_review
+from helpers.spacy_pipeline import log_pipeline_report
+from lexicon import get_lexicon, start_lexicon_watcher
+from src.spacy_nlp_matcher_making import pipeline_report
+
+configure_logging()
+log_pipeline_report(pipeline_report)
+# Fail at startup, rather than on the first review, if any model endpoint is missing
+endpoints.load()
+# Load the word lists now, so a missing list fails startup rather than the first
+# review. Each worker process starts its watcher for edits to them at lifespan startup
+get_lexicon()
+
+
+async def automoderator(data, timing=None):
+    """Moderate one /automoderator request body
+
+    Args:
+      data (dict): the decoded request JSON
+      timing (RequestTiming, optional): where to record the time each text's parse
+                                        and rules take
+
+    Returns:
+      tuple: the response body, and the lexicon that produced it
+    """
+
+    # Rules that have not returned by the deadline are reported as timed out
+    deadline = time.monotonic() + REQUEST_DEADLINE_SECONDS
+
+    request_id_key, request_id, title, comment, org = parse_review(data)
+
+    # One snapshot of the word lists for the whole review, even if they are reloaded
+    lexicon = get_lexicon()
+
+    title, comment = await run_on_shared_loop(
+        apply_review_async(
+            [title, comment],
+            org_name=org,
+            lexicon=lexicon,
+            deadline=deadline,
+            timing=timing,
+        )
+    )
+
+    return build_response(request_id_key, request_id, title, comment), lexicon
+
+
+async def read_body(receive) -> bytes:
+    """Read the whole request body from the ASGI receive channel"""
+    body = b""
+    more_body = True
+    while more_body:
+        message = await receive()
+        body += message.get("body", b"")
+        more_body = message.get("more_body", False)
+    return body
+
+
+def request_header(scope, name: str):
+    """The value of a request header, or None if it was not sent"""
+    name = name.lower().encode()
+    for key, value in scope.get("headers", []):
+        if key.lower() == name:
+            return value.decode("latin-1")
+    return None
+
+
+async def send_json(send, body, status=200, headers=None):
+    """Send a complete JSON response on the ASGI send channel"""
+    payload = json.dumps(body).encode()
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(payload)).encode()),
+            ]
+            + (headers or []),
+        }
+    )
+    await send({"type": "http.response.body", "body": payload})
+
+
+async def lifespan(receive, send):
+    """Start the lexicon watcher at startup, and acknowledge startup and shutdown"""
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            # Pick up edits to the word lists without a restart
+            start_lexicon_watcher()
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    """The ASGI application"""
+    if scope["type"] == "lifespan":
+        return await lifespan(receive, send)
+
+    if scope["path"] != "/automoderator":
+        return await send_json(send, {"error": "not found"}, status=404)
+    if scope["method"] != "POST":
+        return await send_json(send, {"error": "method not allowed"}, status=405)
+
+    body = await read_body(receive)
+    started = time.perf_counter()
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return await send_json(send, {"error": "request body must be JSON"}, status=400)
+
+    # Only a request that asks for a timing breakdown has its work timed
+    timing = None
+    admin = common_functions.is_admin_authorization(
+        request_header(scope, "Authorization")
+    )
+    if wants_timing(request_header(scope, DEBUG_TIMING_HEADER), data, admin):
+        timing = RequestTiming(["title", "comment"], started)
+        timing.record("parse_json", time.perf_counter() - started)
+
+    Automoderator, lexicon = await automoderator(data, timing)
+
+    if timing:
+        # The time to encode the response as it would be without the breakdown
+        start = time.perf_counter()
+        json.dumps(Automoderator)
+        timing.record("serialise", time.perf_counter() - start)
+        Automoderator["timing"] = timing.report()
+
+    await send_json(
+        send,
+        Automoderator,
+        headers=[(b"x-lexicon-version", lexicon.version.encode())],
+    )
@@ -1,8 +1,17 @@
-# config file to set thresholds and read in data lists
+# config file to set thresholds. The data lists are compiled in lexicon.py
 
 import os
 
-from helpers.filehelper import read_csv_list
+import dotenv
+
+# environmentShort values of the deployed environments, which set their variables for
+# real rather than in a .env file
+DEPLOYED_ENVIRONMENTS = {"PROD", "INT", "DEV", "STAG"}
+
+# The settings below are read from the environment when this module is imported, so a
+# local .env file is loaded first
+if os.getenv("environmentShort") not in DEPLOYED_ENVIRONMENTS:
+    dotenv.load_dotenv()
 
 ALL_CAPS_THRESHOLD = 3  # 3 all caps words or less allowed per review
 LANGUAGE_THRESHOLD = 99  # /100   # Retired, used in archived module detect_lang.py
@@ -11,18 +20,67 @@ PARTIAL_RATIO_THRESHOLD = 89  # Used in names module fuzzy matching
 MAX_TITLE_CHARS = (
     60  # Used to determine whether text is the review title or review body
 )
+MAX_BATCH_SIZE = 500  # Maximum number of reviews accepted by /automoderator/batch
+BATCH_N_JOBS = 16  # Rule invocations run concurrently across a whole batch
+MODEL_CALL_WORKERS = 32  # Threads in the process-wide executor running rule calls
+MODEL_CALL_QUEUE_SIZE = 1024  # Rule calls queued for a thread; more wait on the loop
+MODEL_POOL_MAXSIZE = 32  # Keep-alive connections kept open per model endpoint host
+MODEL_CONNECT_TIMEOUT = 3.05  # seconds to establish a connection to a model endpoint
+MODEL_READ_TIMEOUT = 30  # seconds to wait for a model endpoint to respond
+VERDICT_CACHE_SIZE = 20000  # remote rule verdicts kept in memory per worker
+VERDICT_CACHE_TTL_SECONDS = 6 * 60 * 60  # cached verdicts are refetched after this long
+VERDICT_CACHE_RULES = {  # endpoint name -> whether that rule's verdicts are cached
+    "complaint": True,
+    "descriptor": True,
+    "names": True,
+    "not_experience": True,
+    "safeguarding": False,  # always ask the model about safeguarding concerns
+}
+MICRO_BATCH_RULES = (
+    {  # endpoint name -> (most texts per scoring call, ms to wait for more)
+        "complaint": (
+            int(os.getenv("ComplaintBatchSize", 16)),
+            float(os.getenv("ComplaintBatchWaitMs", 5)),
+        ),
+        "not_experience": (
+            int(os.getenv("NotAnExperienceBatchSize", 16)),
+            float(os.getenv("NotAnExperienceBatchWaitMs", 5)),
+        ),
+    }
+)  # a batch size of 1 sends every text on its own
+VERDICT_DISK_CACHE_PATH = os.getenv(
+    "VerdictCachePath"
+)  # SQLite file shared by the workers on a node; unset to disable the disk cache
+VERDICT_DISK_CACHE_MAX_AGE_SECONDS = 7 * 24 * 60 * 60  # disk verdicts kept this long
+VERDICT_DISK_CACHE_MAX_ENTRIES = 500000  # eviction keeps the newest disk verdicts
+VERDICT_DISK_CACHE_EVICT_EVERY = 1000  # a worker evicts after this many disk writes
+LEXICON_WATCH_SECONDS = float(
+    os.getenv("LexiconWatchSeconds", 60)
+)  # how often the word lists are checked for changes; 0 disables hot reloading
+ADMIN_API_KEY = os.getenv(
+    "AdminKey"
+)  # bearer key for the /admin routes; unset to disable them
+SPACY_PIPELINE_TIMINGS = (
+    os.getenv("SpacyPipelineTimings", "true").lower() == "true"
+)  # time the spaCy components at startup to report what removing unused ones saves
+LANGUAGE_DETECTOR = os.getenv(
+    "LanguageDetector", "ngram"
+)  # detector behind Doc._.language: "ngram" (shipped, deterministic) or "langdetect"
+REQUEST_DEADLINE_SECONDS = float(
+    os.getenv("RequestDeadlineSeconds", 10)
+)  # rules still running after this long are reported for human moderation
+BATCH_DEADLINE_SECONDS = float(
+    os.getenv("BatchDeadlineSeconds", 60)
+)  # as REQUEST_DEADLINE_SECONDS, for a whole /automoderator/batch request
+RULE_POLICY = os.getenv(
+    "RulePolicy", "run_all"
+)  # "run_all", or "stop_on_fail" to skip the remote models once a rule fails (code 1)
+COMBINE_REVIEW_TEXTS = (
+    os.getenv("CombineReviewTexts", "true").lower() == "true"
+)  # send a review's title and comment to a model in one call, where the model allows
+DISABLED_RULES = [
+    name.strip() for name in os.getenv("DisabledRules", "").split(",") if name.strip()
+]  # comma separated rule names (e.g. "complaintRule") that are not run or reported
 
 
 data_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
-
-acronyms = read_csv_list(os.path.join(data_path, "acronym-list.csv"))
-profanity = read_csv_list(os.path.join(data_path, "profanity-list-hard.csv"))
-profanity_soft = read_csv_list(os.path.join(data_path, "profanity-list-soft.csv"))
-descriptions_adj = read_csv_list(os.path.join(data_path, "descriptions-adjectives.csv"))
-descriptions_nouns = read_csv_list(os.path.join(data_path, "descriptions-nouns.csv"))
-non_names = [
-    word.lower() for word in read_csv_list(os.path.join(data_path, "non-names.csv"))
-]  # read in and ensure lowercase
-def_names = [
-    word.lower() for word in read_csv_list(os.path.join(data_path, "def-names.csv"))
-]  # read in and ensure lowercase
@@ -0,0 +1,42 @@
+# The comment length bins the evaluation scripts report by, as first plotted by
+# performance_test.check_len_distribution(): narrow bins for the short comments most
+# reviews are, wider ones for the long tail.
+from typing import List
+
+# Bin edges, in characters
+LENGTH_BINS = [
+    100,
+    200,
+    300,
+    400,
+    500,
+    600,
+    700,
+    800,
+    900,
+    1000,
+    1250,
+    1500,
+    1750,
+    2000,
+    3000,
+]
+
+
+def length_bin(length: int) -> str:
+    """The label of the length bin a text of length characters falls in
+
+    Texts shorter than the first edge are labelled "0-100", and texts of the last
+    edge or longer "3000+".
+    """
+    if length < LENGTH_BINS[0]:
+        return f"0-{LENGTH_BINS[0]}"
+    for low, high in zip(LENGTH_BINS, LENGTH_BINS[1:]):
+        if length < high:
+            return f"{low}-{high}"
+    return f"{LENGTH_BINS[-1]}+"
+
+
+def sort_by_length_bin(labels) -> List[str]:
+    """Sort length_bin() labels from the shortest bin to the longest"""
+    return sorted(labels, key=lambda label: int(label.rstrip("+").split("-")[0]))
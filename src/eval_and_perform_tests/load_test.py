@@ -0,0 +1,347 @@
+# This is an open-loop load generator for the /automoderator route, to measure how much
+# traffic an instance can take rather than how fast one idle request is. Reviews are
+# replayed from a JSONL file or one of the test csvs at a target request rate: requests
+# are sent on a fixed schedule whether or not earlier ones have been answered, as real
+# traffic is, so a slow server builds up a queue instead of slowing the test down.
+# The rate can ramp up from --start-rate over --ramp-up seconds, and at most
+# --concurrency requests are in flight at once; a request that has to wait for a slot
+# is counted as late, and its latency is measured from when it was due to be sent, so
+# waiting for a slot is not hidden.
+#
+# Throughput, error rate and p50/p95/p99/p99.9 latency are printed for the whole run
+# and by comment length (the bins of check_len_distribution()), and written as JSON
+# with --output. Requests sent during the ramp-up are left out of the figures.
+#
+# A JSONL line is either an /automoderator request body, or an object with the review's
+# title, comment and organisation in the fields named by --title-field, --comment-field
+# and --org-field. A csv needs the "Comment Title", "Comment Text" and "Org Name"
+# columns, as performance_test.py reads.
+# IMPORTANT: every review is sent to the app, and by it to the models. Only run this
+# against a local app or a non-production environment, ideally with the app's model
+# endpoints pointed at eval_and_perform_tests/mock_scoring_server.py.
+# Usage (from the src folder):
+#   python -m eval_and_perform_tests.load_test reviews.jsonl --rate 50 --duration 60
+#     --ramp-up 10 --concurrency 64 --url http://localhost:5000/automoderator
+import argparse
+import csv
+import json
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from statistics import mean
+from time import sleep
+from timeit import default_timer
+from typing import Dict, List, Optional
+
+import urllib3
+
+from eval_and_perform_tests.length_bins import length_bin, sort_by_length_bin
+
+RANDOMSEED = 12
+PERCENTILES = [50, 95, 99, 99.9]
+DEFAULT_ORG = "Riverside Medical Practice"
+
+
+def review_body(title: str, comment: str, org_name: str, request_id: str) -> dict:
+    """An /automoderator request body for one review"""
+    return {
+        "organisation-name": org_name,
+        "request-id": request_id,
+        "request": [{"text": title}, {"text": comment}],
+    }
+
+
+def load_reviews(
+    path: str,
+    title_field: str = "title",
+    comment_field: str = "body",
+    org_field: str = "org",
+) -> List[dict]:
+    """Read request bodies from a JSONL file or a csv of reviews"""
+    bodies = []
+    if path.endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as f:
+            for i, row in enumerate(csv.DictReader(f)):
+                bodies.append(
+                    review_body(
+                        row["Comment Title"].replace("’", "'"),
+                        row["Comment Text"].replace("’", "'"),
+                        row["Org Name"].replace("’", "'"),
+                        str(i),
+                    )
+                )
+        return bodies
+
+    with open(path, encoding="utf-8") as f:
+        for i, line in enumerate(f):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if "request" in record:
+                bodies.append(record)
+            else:
+                bodies.append(
+                    review_body(
+                        record.get(title_field, ""),
+                        record.get(comment_field, ""),
+                        record.get(org_field, DEFAULT_ORG),
+                        str(i),
+                    )
+                )
+    return bodies
+
+
+def comment_length(body: dict) -> int:
+    """The length of a review's comment, the last text in the request"""
+    texts = body.get("request") or [{"text": ""}]
+    return len(texts[-1].get("text", ""))
+
+
+def schedule(
+    rate: float,
+    duration: float,
+    ramp_up: float = 0.0,
+    start_rate: float = 1.0,
+    poisson: bool = True,
+    rng: Optional[random.Random] = None,
+) -> List[float]:
+    """The times, in seconds from the start, at which to send requests
+
+    Args:
+      rate (float): the target requests per second
+      duration (float): how long to send at the target rate, after the ramp-up
+      ramp_up (float): seconds over which the rate rises linearly from start_rate
+      start_rate (float): requests per second at the start of the ramp-up
+      poisson (bool): space requests randomly, as independent arrivals are, rather
+                      than evenly
+      rng (random.Random): the source of the random spacing
+
+    Returns:
+      list: send times in ascending order
+    """
+    rng = rng or random.Random(RANDOMSEED)
+    times = []
+    t = 0.0
+    end = ramp_up + duration
+    while True:
+        current = rate
+        if t < ramp_up:
+            current = start_rate + (rate - start_rate) * t / ramp_up
+        t += rng.expovariate(current) if poisson else 1 / current
+        if t >= end:
+            return times
+        times.append(t)
+
+
+def percentiles(latencies: List[float]) -> Dict[str, float]:
+    """p50/p95/p99/p99.9 and max of latencies, in milliseconds, by nearest rank"""
+    if not latencies:
+        return {}
+    ordered = sorted(latencies)
+    result = {}
+    for p in PERCENTILES:
+        rank = max(int(-(-p * len(ordered) // 100)) - 1, 0)
+        result[f"p{p:g}_ms"] = ordered[rank] * 1000
+    result["max_ms"] = ordered[-1] * 1000
+    return result
+
+
+class LoadTest:
+    """Sends requests on a schedule and records what happened to each.
+
+    Attributes:
+    url (str): The /automoderator URL.
+    headers (Dict[str, str]): Headers sent with every request.
+    concurrency (int): The most requests in flight at once.
+    timeout (float): Seconds to wait for each response.
+    results (List[dict]): One record per request sent.
+
+    Methods:
+    run(bodies, send_times): Send bodies in turn at send_times and wait for every response.
+    """
+
+    def __init__(
+        self, url: str, headers: Dict[str, str], concurrency: int, timeout: float
+    ):
+        self.url = url
+        self.headers = {"Content-Type": "application/json", **headers}
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.results = []
+        self._lock = threading.Lock()
+        self._http = urllib3.PoolManager(
+            maxsize=concurrency,
+            timeout=urllib3.Timeout(total=timeout),
+            retries=False,
+        )
+
+    def _send(self, body: dict, due: float, start: float, ramp_up: bool):
+        sent = default_timer()
+        status, error = None, None
+        try:
+            response = self._http.request(
+                "POST", self.url, body=json.dumps(body).encode(), headers=self.headers
+            )
+            status = response.status
+            if status != 200:
+                error = f"HTTP {status}"
+        except Exception as e:
+            error = type(e).__name__
+        done = default_timer()
+        with self._lock:
+            self.results.append(
+                {
+                    "due": due,
+                    # Queued for a slot: sent more than 10 ms after it was due
+                    "late": sent - start - due > 0.01,
+                    "latency": done - start - due,
+                    "done": done - start,
+                    "status": status,
+                    "error": error,
+                    "length": comment_length(body),
+                    "ramp_up": ramp_up,
+                }
+            )
+
+    def run(self, bodies: List[dict], send_times: List[float], ramp_up: float = 0.0):
+        """Send bodies, in turn and repeating as needed, at send_times"""
+        pool = ThreadPoolExecutor(
+            max_workers=self.concurrency, thread_name_prefix="load"
+        )
+        start = default_timer()
+        for i, due in enumerate(send_times):
+            wait = start + due - default_timer()
+            if wait > 0:
+                sleep(wait)
+            body = bodies[i % len(bodies)]
+            pool.submit(self._send, body, due, start, due < ramp_up)
+        pool.shutdown(wait=True)
+
+
+def summarise(results: List[dict], duration: float) -> dict:
+    """Throughput, error rate, lateness and latency percentiles of some requests"""
+    if not results:
+        return {"requests": 0}
+    errors = [r for r in results if r["error"]]
+    ok = [r["latency"] for r in results if not r["error"]]
+    error_counts = {}
+    for r in errors:
+        error_counts[r["error"]] = error_counts.get(r["error"], 0) + 1
+    return {
+        "requests": len(results),
+        "throughput_rps": (len(results) - len(errors)) / duration,
+        "error_rate": len(errors) / len(results),
+        "errors": error_counts,
+        "late": sum(r["late"] for r in results),
+        "mean_ms": mean(ok) * 1000 if ok else None,
+        **percentiles(ok),
+    }
+
+
+def report(results: List[dict]) -> dict:
+    """Summarise the requests sent after the ramp-up, overall and by comment length"""
+    measured = [r for r in results if not r["ramp_up"]]
+    if not measured:
+        return {"overall": {"requests": 0}, "by_length": {}}
+    # From the first measured request being due to the last one being answered
+    duration = max(r["done"] for r in measured) - min(r["due"] for r in measured)
+    by_length = {}
+    for r in measured:
+        by_length.setdefault(length_bin(r["length"]), []).append(r)
+    return {
+        "overall": summarise(measured, duration),
+        "ramp_up_requests": len(results) - len(measured),
+        "by_length": {
+            label: summarise(by_length[label], duration)
+            for label in sort_by_length_bin(by_length)
+        },
+    }
+
+
+def print_summary(name: str, summary: dict):
+    """Print one summarise() result"""
+    if not summary.get("requests"):
+        print(f"{name}: no requests")
+        return
+    latency = ", ".join(
+        f"p{p:g}: {round(summary[f'p{p:g}_ms'], 1)} ms"
+        for p in PERCENTILES
+        if f"p{p:g}_ms" in summary
+    )
+    print(
+        f"{name}:\nRequests: {summary['requests']}, "
+        f"Throughput: {round(summary['throughput_rps'], 1)}/s, "
+        f"Errors: {round(summary['error_rate'] * 100, 2)}% {summary['errors'] or ''}, "
+        f"Late: {summary['late']}\n{latency}\n"
+    )
+
+
+def parse_header(value: str):
+    """Split "Name: value" for --header"""
+    name, _, header_value = value.partition(":")
+    if not header_value:
+        raise argparse.ArgumentTypeError("Expected a header as 'Name: value'")
+    return name.strip(), header_value.strip()
+
+
+def main(argv: Optional[List[str]] = None):
+    """Replay reviews against /automoderator at a target rate and report latency"""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("corpus", help="a JSONL file of reviews, or a csv")
+    parser.add_argument("--url", default="http://localhost:5000/automoderator")
+    parser.add_argument("--rate", type=float, default=10.0, help="requests/second")
+    parser.add_argument("--duration", type=float, default=60.0, help="seconds")
+    parser.add_argument("--ramp-up", type=float, default=0.0, help="seconds")
+    parser.add_argument("--start-rate", type=float, default=1.0)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--timeout", type=float, default=30.0, help="seconds")
+    parser.add_argument(
+        "--even",
+        action="store_true",
+        help="space requests evenly instead of as random arrivals",
+    )
+    parser.add_argument("--shuffle", action="store_true")
+    parser.add_argument(
+        "--header", action="append", default=[], type=parse_header, help="Name: value"
+    )
+    parser.add_argument("--title-field", default="title")
+    parser.add_argument("--comment-field", default="body")
+    parser.add_argument("--org-field", default="org")
+    parser.add_argument("--seed", type=int, default=RANDOMSEED)
+    parser.add_argument("--output", help="write the report as JSON to this file")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    bodies = load_reviews(
+        args.corpus, args.title_field, args.comment_field, args.org_field
+    )
+    if args.shuffle:
+        rng.shuffle(bodies)
+    send_times = schedule(
+        args.rate, args.duration, args.ramp_up, args.start_rate, not args.even, rng
+    )
+    print(
+        f"Sending {len(send_times)} requests from {len(bodies)} reviews to {args.url}: "
+        f"{args.rate}/s for {args.duration} s after {args.ramp_up} s ramp-up, "
+        f"at most {args.concurrency} in flight\n"
+    )
+
+    load_test = LoadTest(args.url, dict(args.header), args.concurrency, args.timeout)
+    load_test.run(bodies, send_times, args.ramp_up)
+    results = report(load_test.results)
+
+    print_summary("Overall", results["overall"])
+    for label, summary in results["by_length"].items():
+        print_summary(f"Comments of {label} characters", summary)
+
+    if args.output:
+        results["settings"] = {
+            key: value for key, value in vars(args).items() if key != "header"
+        }
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved report to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+# This is a script to benchmark each local rule, and the spaCy parse they all depend on,
+# on its own. A synthetic corpus of comments is built from ordinary review words with a
+# few all caps words, emails, URLs, list words and names mixed in. Its lengths are drawn
+# from the bins of performance_test.check_len_distribution(), weighted by an assumed
+# shape (mostly short comments, with a long tail) or, with --lengths-from-csv, by the
+# histogram of a csv of real reviews.
+# Every comment is parsed once up front, so each rule is timed on exactly the input
+# HardRules gives it and nothing else.
+#
+# For each benchmark the mean, median, p95 and stdev of the time per call are printed,
+# with the mean per comment length bin, and written as JSON with --output. Pass the JSON
+# of an earlier run with --baseline to compare medians against it: benchmarks more than
+# --threshold slower are reported as regressions and the script exits with status 1.
+# This script makes no model calls, so it is safe to run against any environment.
+# Usage (from the src folder):
+#   python -m eval_and_perform_tests.local_rules_benchmark --output before.json
+#   python -m eval_and_perform_tests.local_rules_benchmark --baseline before.json
+import argparse
+import json
+import platform
+import random
+import sys
+from datetime import datetime, timezone
+from statistics import mean, median, stdev
+from timeit import default_timer
+from typing import Callable, Dict, List, Optional
+
+from eval_and_perform_tests.length_bins import (
+    LENGTH_BINS,
+    length_bin,
+    sort_by_length_bin,
+)
+from lexicon import get_lexicon, read_sources
+from modules.allcaps import all_caps_rule
+from modules.email_rule import check_email_rule
+from modules.names_helpers import (
+    allow_name_signoff,
+    allow_org_name,
+    definite_names,
+    remove_non_names,
+)
+from modules.profanity import profanity_rule
+from modules.profanity_soft import profanity_rule_soft
+from modules.url_rule import check_url_rule
+from src.spacy_nlp_matcher_making import matcher, nlp
+
+RANDOMSEED = 12
+CORPUS_SIZE = 500  # comments
+REPEATS = 5  # timed passes over the corpus
+THRESHOLD = 0.1  # a median this much slower than the baseline is a regression
+
+# Relative share of comments in each of LENGTH_BINS. These are an assumed shape, not
+# measured: no review data ships with the repo. Use --lengths-from-csv to weight the
+# bins by a csv of real reviews instead
+LENGTH_WEIGHTS = [22, 17, 13, 10, 8, 6, 5, 4, 3, 4, 3, 2, 2, 1]
+
+ORG_NAME = "Riverside Medical Practice"
+filler_words = (
+    "the doctor was very helpful and the nurse explained everything clearly "
+    "i had to wait a long time at reception but the staff were kind and the "
+    "surgery was clean appointment booking online was easy"
+).split()
+# (chance per word, words to pick from): the matches the rules look for
+extra_words = [
+    (0.01, ["VERY", "RUDE", "NEVER", "AGAIN", "GP", "NHS"]),
+    (0.003, ["someone@example.com", "info@surgery.nhs.uk"]),
+    (0.003, ["www.nhs.uk", "https://example.com/booking"]),
+    (0.005, ["Dr Patel", "nurse Sarah", "Riverside", "Mrs Jones"]),
+]
+
+
+def length_weights_from_csv(path: str, column: str = "Comment Text") -> List[int]:
+    """Count a csv's comments in each length bin of check_len_distribution()"""
+    import pandas as pd
+
+    counts = [0] * (len(LENGTH_BINS) - 1)
+    for comment in pd.read_csv(path)[column]:
+        length = len(comment.replace("’", "'"))
+        for i, (low, high) in enumerate(zip(LENGTH_BINS, LENGTH_BINS[1:])):
+            if low <= length < high or (high == LENGTH_BINS[-1] and length == high):
+                counts[i] += 1
+                break
+    return counts
+
+
+def make_comment(length: int, rng: random.Random, sentences: List[str]) -> str:
+    """Build a comment of about length characters from review words and rule matches"""
+    words = []
+    while sum(len(word) + 1 for word in words) < length:
+        for chance, choices in extra_words + [(0.02, sentences)]:
+            if rng.random() < chance:
+                words.append(rng.choice(choices))
+                break
+        else:
+            words.append(rng.choice(filler_words))
+        if rng.random() < 0.06:
+            words[-1] += "."
+    return " ".join(words)
+
+
+def make_corpus(size: int, weights: List[int], rng: random.Random) -> List[str]:
+    """Build size comments with lengths drawn from the length histogram"""
+    sources = read_sources()
+    list_words = [
+        word.lower().strip()
+        for word in sources["profanity_soft"][:20] + sources["profanity"][:20]
+    ]
+    bins = list(zip(LENGTH_BINS, LENGTH_BINS[1:]))
+    corpus = []
+    for low, high in rng.choices(bins, weights=weights, k=size):
+        corpus.append(make_comment(rng.randint(low, high - 1), rng, list_words))
+    return corpus
+
+
+def names_helpers(text: str, candidates: List[str], lexicon) -> List[str]:
+    """The local part of names_rule: filtering the names the model found"""
+    names = remove_non_names(candidates, lexicon)
+    names = list(set(definite_names(text, lexicon) + names))
+    names = allow_org_name(ORG_NAME, names)
+    return allow_name_signoff(text, names)
+
+
+def benchmarks(lexicon) -> Dict[str, Callable]:
+    """Benchmark name -> function timed on one prepared comment"""
+    return {
+        "nlp": lambda c: nlp(c["text"]),
+        "all_caps_rule": lambda c: all_caps_rule(c["doc"], lexicon),
+        "check_email_rule": lambda c: check_email_rule(c["text"]),
+        "check_url_rule": lambda c: check_url_rule(nlp, c["doc"], matcher),
+        "profanity_rule": lambda c: profanity_rule(c["words"], lexicon=lexicon),
+        "profanity_rule_soft": lambda c: profanity_rule_soft(
+            c["lower_text"], lexicon=lexicon
+        ),
+        "names_helpers": lambda c: names_helpers(c["text"], c["candidates"], lexicon),
+    }
+
+
+def prepare(text: str) -> dict:
+    """Parse a comment once into every input the benchmarks read, as HardRules does"""
+    doc = nlp(text)
+    return {
+        "text": text,
+        "doc": doc,
+        "lower_text": doc.text.lower(),
+        "words": [token.text.lower() for token in doc],
+        # Stand in for the names model: capitalised words, lowercased as names_rule does
+        "candidates": [w.strip(".").lower() for w in text.split() if w[:1].isupper()],
+    }
+
+
+def percentile(sorted_times: List[float], share: float) -> float:
+    """The value share of the way through sorted_times"""
+    return sorted_times[min(int(share * len(sorted_times)), len(sorted_times) - 1)]
+
+
+def run_benchmark(func: Callable, comments: List[dict], repeats: int) -> dict:
+    """Time func on every comment repeats times, after one untimed pass
+
+    Returns:
+      dict: "calls", and the "mean_ms", "median_ms", "p95_ms" and "stdev_ms" of the
+            time per call, and "by_length" (length bin -> mean_ms)
+    """
+    for comment in comments:
+        func(comment)
+
+    times = []
+    by_length = {}
+    for _ in range(repeats):
+        for comment in comments:
+            t1 = default_timer()
+            func(comment)
+            t2 = default_timer()
+            times.append(t2 - t1)
+            by_length.setdefault(comment["bin"], []).append(t2 - t1)
+
+    ordered = sorted(times)
+    return {
+        "calls": len(times),
+        "mean_ms": mean(times) * 1000,
+        "median_ms": median(times) * 1000,
+        "p95_ms": percentile(ordered, 0.95) * 1000,
+        "stdev_ms": stdev(times) * 1000 if len(times) > 1 else 0.0,
+        "by_length": {
+            label: mean(by_length[label]) * 1000
+            for label in sort_by_length_bin(by_length)
+        },
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> List[str]:
+    """Print each benchmark's median against the baseline's and list the regressions"""
+    regressions = []
+    print(f"Against baseline from {baseline['metadata']['date']}:")
+    for name, result in results["benchmarks"].items():
+        if name not in baseline["benchmarks"]:
+            print(f"{name}: not in baseline")
+            continue
+        before = baseline["benchmarks"][name]["median_ms"]
+        ratio = result["median_ms"] / before if before else float("inf")
+        flag = ""
+        if ratio > 1 + threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(
+            f"{name}: {round(before, 4)} -> {round(result['median_ms'], 4)} ms "
+            f"median ({round(ratio, 2)}x){flag}"
+        )
+    return regressions
+
+
+def local_rules_performance(
+    size: int = CORPUS_SIZE,
+    repeats: int = REPEATS,
+    weights: List[int] = LENGTH_WEIGHTS,
+    only: Optional[List[str]] = None,
+    weights_source: str = "assumed",
+) -> dict:
+    """Run the benchmarks on a synthetic corpus and print their times
+
+    Args:
+      weights_source (str): "assumed", or the csv weights were counted from, recorded
+                            with the results
+
+    Returns:
+      dict: "metadata" about the run and "benchmarks" (name -> run_benchmark() result)
+    """
+    rng = random.Random(RANDOMSEED)
+    lexicon = get_lexicon()
+    comments = []
+    for text in make_corpus(size, weights, rng):
+        comment = prepare(text)
+        comment["bin"] = length_bin(len(text))
+        comments.append(comment)
+    print(
+        f"{len(comments)} comments, mean length "
+        f"{round(mean(len(c['text']) for c in comments))} characters, "
+        f"{repeats} timed passes\n"
+    )
+
+    results = {}
+    for name, func in benchmarks(lexicon).items():
+        if only and name not in only:
+            continue
+        results[name] = run_benchmark(func, comments, repeats)
+        result = results[name]
+        print(
+            f"{name}:\nMean: {round(result['mean_ms'], 4)} ms, "
+            f"Median: {round(result['median_ms'], 4)} ms, "
+            f"p95: {round(result['p95_ms'], 4)} ms, "
+            f"Stdev: {round(result['stdev_ms'], 4)} ms\n"
+        )
+
+    return {
+        "metadata": {
+            "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "lexicon_version": lexicon.version,
+            "seed": RANDOMSEED,
+            "corpus_size": size,
+            "repeats": repeats,
+            "length_bins": LENGTH_BINS,
+            "length_weights": weights,
+            "length_weights_source": weights_source,
+        },
+        "benchmarks": results,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the local rule benchmarks, save them and compare them with a baseline"""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--size", type=int, default=CORPUS_SIZE)
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    parser.add_argument(
+        "--only", action="append", help="run only this benchmark (repeatable)"
+    )
+    parser.add_argument(
+        "--lengths-from-csv",
+        help="draw comment lengths from this csv's Comment Text column",
+    )
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--baseline", help="compare with the results in this file")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD)
+    args = parser.parse_args(argv)
+
+    weights, weights_source = LENGTH_WEIGHTS, "assumed"
+    if args.lengths_from_csv:
+        weights = length_weights_from_csv(args.lengths_from_csv)
+        weights_source = args.lengths_from_csv
+
+    results = local_rules_performance(
+        args.size, args.repeats, weights, args.only, weights_source
+    )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved results to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,310 @@
+# This is a local stand-in for the Azure ML scoring endpoints, so that HardRules, the
+# Flask app and the load tests can be benchmarked at full speed without touching the
+# real models. Each endpoint takes and returns exactly the formats the rules expect:
+#   /complaint       {"data": [texts]} -> a JSON list of 0/1 predictions
+#   /not_experience  {"data": [texts]} -> a JSON string holding {"0": 0/1, ...}
+#   /safeguarding    {"data": text}    -> a JSON string holding {"0": level, "1": prob}
+#   /names           {"data": text}    -> a JSON string holding {"0": {"entity_group":
+#                                         "PER", "word": ...}, ...}
+#   /descriptor      {"data": text}    -> a JSON string holding {"0": [adj, noun], ...}
+# The "JSON string holding" bodies are double-encoded, as the real endpoints' are.
+# Predictions come from simple keyword checks, so the same text always gets the same
+# answer; they are stand-ins for timing, not for judging the rules.
+#
+# Latency, errors and timeouts can be injected for every endpoint or per endpoint:
+#   --latency fixed:MS | uniform:MIN,MAX | normal:MEAN,SD | lognormal:MEDIAN,SIGMA
+#     (milliseconds, e.g. lognormal:120,0.5 for a long tail around 120 ms)
+#   --error-rate P     answer this share of requests with a 503
+#   --timeout-rate P   hold this share of requests for --hang-seconds, so the client's
+#                      read timeout fires
+#   --endpoint NAME:OPTION=VALUE to override one endpoint, e.g.
+#     --endpoint names:latency=uniform:200,400 --endpoint complaint:error-rate=0.05
+#
+# Usage (from the src folder):
+#   python -m eval_and_perform_tests.mock_scoring_server --port 8099 --latency fixed:50
+# then point the app at it, e.g. with the variables printed by --print-env:
+#   eval $(python -m eval_and_perform_tests.mock_scoring_server --port 8099 --print-env)
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+
+from helpers.endpoints import ENDPOINT_SETTINGS
+
+RANDOMSEED = 12
+
+COMPLAINT_WORDS = ("complain", "complaint", "sue", "legal", "solicitor", "tribunal")
+NOT_EXPERIENCE_WORDS = ("buy", "sell", "advert", "click", "subscribe", "?")
+SAFEGUARDING_WORDS = {
+    "Strongly Concerning": ("kill myself", "suicide", "end my life"),
+    "Possibly Concerning": ("self harm", "hurt myself", "abuse", "unsafe"),
+}
+NAME_TITLES = ("dr", "doctor", "nurse", "mr", "mrs", "ms", "miss")
+
+
+def complaint_response(data: List[str]) -> str:
+    """The complaint model's response: a JSON list of predictions"""
+    return json.dumps(
+        [int(any(word in text for word in COMPLAINT_WORDS)) for text in data]
+    )
+
+
+def not_experience_response(data: List[str]) -> str:
+    """The not an experience model's response: a double-encoded dict of predictions"""
+    predictions = {
+        str(i): int(any(word in text for word in NOT_EXPERIENCE_WORDS))
+        for i, text in enumerate(data)
+    }
+    return json.dumps(json.dumps(predictions))
+
+
+def safeguarding_response(data: str) -> str:
+    """The safeguarding model's response: a double-encoded risk level and probability"""
+    level, probability = "No safeguarding", "0.97"
+    for concern, phrases in SAFEGUARDING_WORDS.items():
+        if any(phrase in data for phrase in phrases):
+            level, probability = concern, "0.91"
+            break
+    return json.dumps(json.dumps({"0": level, "1": probability}))
+
+
+def names_response(data: str) -> str:
+    """The names model's response: a double-encoded dict of entities
+
+    The word after a title such as "Dr" or "nurse" is reported as a person.
+    """
+    words = data.split()
+    entities = {}
+    for title, word in zip(words, words[1:]):
+        if title.lower().rstrip(".") in NAME_TITLES and word[:1].isupper():
+            entities[str(len(entities))] = {
+                "entity_group": "PER",
+                "word": word.strip(".,!?"),
+                "score": 0.99,
+            }
+    return json.dumps(json.dumps(entities))
+
+
+def descriptor_response(data: str) -> str:
+    """The descriptor model's response: a double-encoded dict of adjective-noun pairs
+
+    Every pair of neighbouring words is reported; the rule keeps those in its lists.
+    """
+    words = [word.strip(".,!?") for word in data.split()]
+    pairs = {str(i): [a, b] for i, (a, b) in enumerate(zip(words, words[1:]))}
+    return json.dumps(json.dumps(pairs))
+
+
+RESPONSES: Dict[str, Callable] = {
+    "complaint": complaint_response,
+    "not_experience": not_experience_response,
+    "safeguarding": safeguarding_response,
+    "names": names_response,
+    "descriptor": descriptor_response,
+}
+
+
+def latency_sampler(spec: str) -> Callable[[random.Random], float]:
+    """Parse a latency distribution into a function returning a delay in seconds
+
+    Args:
+      spec (str): "fixed:MS", "uniform:MIN,MAX", "normal:MEAN,SD" or
+                  "lognormal:MEDIAN,SIGMA", in milliseconds
+
+    Returns:
+      callable: takes a random.Random and returns a delay of at least 0 seconds
+    """
+    kind, _, values = spec.partition(":")
+    params = [float(value) for value in values.split(",")] if values else []
+    samplers = {
+        ("fixed", 1): lambda rng: params[0],
+        ("uniform", 2): lambda rng: rng.uniform(params[0], params[1]),
+        ("normal", 2): lambda rng: rng.gauss(params[0], params[1]),
+        ("lognormal", 2): lambda rng: params[0] * rng.lognormvariate(0, params[1]),
+    }
+    if (kind, len(params)) not in samplers:
+        raise argparse.ArgumentTypeError(f"Unrecognised latency {spec!r}")
+    sample = samplers[(kind, len(params))]
+    return lambda rng: max(sample(rng), 0) / 1000
+
+
+class Behaviour:
+    """The injected latency and faults of one endpoint.
+
+    Attributes:
+    latency (str): The latency distribution, see latency_sampler().
+    error_rate (float): The share of requests answered with a 503.
+    timeout_rate (float): The share of requests held for hang_seconds.
+    hang_seconds (float): How long a timed out request is held before it is dropped.
+    """
+
+    def __init__(
+        self,
+        latency: str = "fixed:0",
+        error_rate: float = 0.0,
+        timeout_rate: float = 0.0,
+        hang_seconds: float = 60.0,
+    ):
+        self.latency = latency
+        self.sample_latency = latency_sampler(latency)
+        self.error_rate = error_rate
+        self.timeout_rate = timeout_rate
+        self.hang_seconds = hang_seconds
+
+    def override(self, option: str, value: str) -> "Behaviour":
+        """A copy of this behaviour with one option changed"""
+        settings = dict(
+            latency=self.latency,
+            error_rate=self.error_rate,
+            timeout_rate=self.timeout_rate,
+            hang_seconds=self.hang_seconds,
+        )
+        name = option.replace("-", "_")
+        if name not in settings:
+            raise argparse.ArgumentTypeError(f"Unrecognised endpoint option {option!r}")
+        settings[name] = value if name == "latency" else float(value)
+        return Behaviour(**settings)
+
+
+class MockScoringServer(ThreadingHTTPServer):
+    """A threaded HTTP server answering as the scoring endpoints.
+
+    Attributes:
+    behaviours (Dict[str, Behaviour]): The injected latency and faults per endpoint.
+    counts (Dict[str, Dict[str, int]]): Requests served, errors and timeouts per endpoint.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, behaviours: Dict[str, Behaviour], seed: int):
+        super().__init__(address, ScoringHandler)
+        self.behaviours = behaviours
+        self.counts = {
+            name: {"requests": 0, "errors": 0, "timeouts": 0} for name in RESPONSES
+        }
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def draw(self, name: str):
+        """Decide what happens to one request: its delay and whether it fails or hangs"""
+        behaviour = self.behaviours[name]
+        with self._lock:
+            delay = behaviour.sample_latency(self._rng)
+            roll = self._rng.random()
+            self.counts[name]["requests"] += 1
+            if roll < behaviour.timeout_rate:
+                self.counts[name]["timeouts"] += 1
+                return behaviour.hang_seconds, "timeout"
+            if roll < behaviour.timeout_rate + behaviour.error_rate:
+                self.counts[name]["errors"] += 1
+                return delay, "error"
+        return delay, None
+
+
+class ScoringHandler(BaseHTTPRequestHandler):
+    """Answers POST /<endpoint name> in that endpoint's format"""
+
+    def do_POST(self):
+        name = self.path.strip("/").split("/")[0]
+        if name not in RESPONSES:
+            return self.reply(404, json.dumps({"error": f"no endpoint {name!r}"}))
+        if not self.headers.get("Authorization", "").startswith("Bearer "):
+            return self.reply(401, json.dumps({"error": "missing bearer key"}))
+
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        delay, fault = self.server.draw(name)
+        time.sleep(delay)
+        if fault == "timeout":
+            # Hold the connection until the client gives up, then drop it unanswered
+            self.close_connection = True
+            return
+        if fault == "error":
+            return self.reply(503, json.dumps({"error": "injected failure"}))
+        self.reply(200, RESPONSES[name](body["data"]))
+
+    def reply(self, status: int, body: str):
+        payload = body.encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        # One log line per request would dominate the time of a load test
+        pass
+
+
+def env_settings(host: str, port: int) -> Dict[str, str]:
+    """The URL and key environment variables that point the app at the mock server"""
+    settings = {}
+    for name, (url_var, key_var, _) in ENDPOINT_SETTINGS.items():
+        settings[url_var] = f"http://{host}:{port}/{name}"
+        settings[key_var] = "mock-key"
+    return settings
+
+
+def parse_endpoint_option(value: str):
+    """Split "NAME:OPTION=VALUE" for --endpoint"""
+    name, _, setting = value.partition(":")
+    option, _, option_value = setting.partition("=")
+    if name not in RESPONSES or not option_value:
+        raise argparse.ArgumentTypeError(
+            f"Expected NAME:OPTION=VALUE with NAME one of {sorted(RESPONSES)}"
+        )
+    return name, option, option_value
+
+
+def main(argv: Optional[List[str]] = None):
+    """Serve the mock scoring endpoints until interrupted"""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency", default="fixed:0", type=str)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--timeout-rate", type=float, default=0.0)
+    parser.add_argument("--hang-seconds", type=float, default=60.0)
+    parser.add_argument(
+        "--endpoint", action="append", default=[], type=parse_endpoint_option
+    )
+    parser.add_argument("--seed", type=int, default=RANDOMSEED)
+    parser.add_argument(
+        "--print-env",
+        action="store_true",
+        help="print export lines pointing the app at the server, and exit",
+    )
+    args = parser.parse_args(argv)
+
+    if args.print_env:
+        for variable, value in env_settings(args.host, args.port).items():
+            print(f"export {variable}={value}")
+        return
+
+    default = Behaviour(
+        args.latency, args.error_rate, args.timeout_rate, args.hang_seconds
+    )
+    behaviours = {name: default for name in RESPONSES}
+    for name, option, value in args.endpoint:
+        behaviours[name] = behaviours[name].override(option, value)
+
+    server = MockScoringServer((args.host, args.port), behaviours, args.seed)
+    print(f"Mock scoring endpoints on http://{args.host}:{args.port}/<endpoint>")
+    for name, behaviour in behaviours.items():
+        print(
+            f"  {name}: latency {behaviour.latency}, error rate "
+            f"{behaviour.error_rate}, timeout rate {behaviour.timeout_rate}"
+        )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(json.dumps(server.counts, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,9 @@
 # The mean, median and stdev of time taken is printed to the terminal.
 # Before running the test suite on a large volume of data, check which endpoint is being queried in
 # each rule - only sumbit large volumes of data to non-production endpoints and/or add a
-# sleep to the for loop to avoid affecting live traffic
+# sleep to the for loop to avoid affecting live traffic.
+# Against the local mock endpoints (eval_and_perform_tests/mock_scoring_server.py) there is
+# no live traffic to protect, so set PerformanceTestSleepSeconds=0 to run at full speed.
 import os
 from statistics import mean, median, stdev
 from time import sleep
@@ -13,6 +15,7 @@ import matplotlib.pyplot as plt
 import pandas as pd
 import requests
 
+from eval_and_perform_tests.length_bins import LENGTH_BINS
 from hardrules import HardRules
 from helpers.common_functions import clean_api_key, correct_url_format
 from modules.allcaps import all_caps_rule
@@ -27,6 +30,9 @@ from modules.safeguarding_rule import safeguarding_rule
 from modules.url_rule import check_url_rule
 from src.spacy_nlp_matcher_making import matcher, nlp
 
+# Pause between rows, so the endpoints see a trickle rather than a burst
+SLEEP_SECONDS = float(os.getenv("PerformanceTestSleepSeconds", "10"))
+
 test_data = pd.read_csv("./src/data/testing_data/some_publishable_data.csv")
 
 
@@ -43,23 +49,7 @@ def check_len_distribution():
         comment_lengths,
         color="lightgreen",
         ec="black",
-        bins=[
-            100,
-            200,
-            300,
-            400,
-            500,
-            600,
-            700,
-            800,
-            900,
-            1000,
-            1250,
-            1500,
-            1750,
-            2000,
-            3000,
-        ],
+        bins=LENGTH_BINS,
     )
     plt.show()
     exit(0)
@@ -84,38 +74,39 @@ def models_performance():
         comment = comment.replace("’", "'")
         org_name = row["Org Name"]
         org_name = org_name.replace("’", "'")
+        title_doc = nlp(title)
+        comment_doc = nlp(comment)
 
         t1 = default_timer()
-        title_result = names_rule(nlp(title).text, org_name)
-        comment_result = names_rule(nlp(comment).text, org_name)
+        title_result = names_rule(title_doc.text, org_name)
+        comment_result = names_rule(comment_doc.text, org_name)
         t2 = default_timer()
         names_times.append(t2 - t1)
 
         t1 = default_timer()
-        title_result = descriptor_rule(nlp(title).text.lower())
-        comment_result = descriptor_rule(nlp(comment).text.lower())
+        title_result = descriptor_rule(title_doc.text.lower())
+        comment_result = descriptor_rule(comment_doc.text.lower())
         t2 = default_timer()
         descriptor_times.append(t2 - t1)
 
         t1 = default_timer()
-        title_result = not_experience_rule(nlp(title).text.lower())
-        comment_result = not_experience_rule(nlp(comment).text.lower())
+        title_result = not_experience_rule(title_doc.text.lower())
+        comment_result = not_experience_rule(comment_doc.text.lower())
         t2 = default_timer()
         nae_times.append(t2 - t1)
 
         t1 = default_timer()
-        title_result = complaint_rule(nlp(title).text.lower())
-        comment_result = complaint_rule(nlp(comment).text.lower())
+        title_result = complaint_rule(title_doc.text.lower())
+        comment_result = complaint_rule(comment_doc.text.lower())
         t2 = default_timer()
         complaint_times.append(t2 - t1)
 
         t1 = default_timer()
-        title_result = safeguarding_rule(nlp(title).text.lower())
-        comment_result = safeguarding_rule(nlp(comment).text.lower())
+        title_result = safeguarding_rule(title_doc.text.lower())
+        comment_result = safeguarding_rule(comment_doc.text.lower())
         t2 = default_timer()
         safeguarding_times.append(t2 - t1)
-        # sleep for 10 seconds
-        sleep(10)
+        sleep(SLEEP_SECONDS)
     print(
         f"Names rule:\nMean: {round(mean(names_times),2)}, Median: {round(median(names_times),2)}, Stdev: {round(stdev(names_times),2)}\n"
     )
@@ -134,7 +125,8 @@ def models_performance():
 
 
 # Test local rules:
-# These can be tested together as they are likely to be very quick and negligable
+# These are timed together, including parsing each text once. For the time of each rule
+# on its own, run eval_and_perform_tests/local_rules_benchmark.py
 local_times = []
 
 
@@ -149,16 +141,18 @@ def local_performance():
         org_name = org_name.replace("’", "'")
 
         t1 = default_timer()
-        title_result = all_caps_rule(nlp(title))
-        comment_result = all_caps_rule(nlp(comment))
-        title_result = check_email_rule(nlp, nlp(title), matcher)
-        comment_result = check_email_rule(nlp, nlp(comment), matcher)
-        title_result = profanity_rule_soft(nlp(title).text.lower())
-        comment_result = profanity_rule_soft(nlp(comment).text.lower())
-        title_result = profanity_rule([word.text.lower() for word in nlp(title)])
-        comment_result = profanity_rule([word.text.lower() for word in nlp(comment)])
-        title_result = check_url_rule(nlp, nlp(title), matcher)
-        comment_result = check_url_rule(nlp, nlp(comment), matcher)
+        title_doc = nlp(title)
+        comment_doc = nlp(comment)
+        title_result = all_caps_rule(title_doc)
+        comment_result = all_caps_rule(comment_doc)
+        title_result = check_email_rule(title)
+        comment_result = check_email_rule(comment)
+        title_result = profanity_rule_soft(title_doc.text.lower())
+        comment_result = profanity_rule_soft(comment_doc.text.lower())
+        title_result = profanity_rule([word.text.lower() for word in title_doc])
+        comment_result = profanity_rule([word.text.lower() for word in comment_doc])
+        title_result = check_url_rule(nlp, title_doc, matcher)
+        comment_result = check_url_rule(nlp, comment_doc, matcher)
         t2 = default_timer()
         local_times.append(t2 - t1)
     print(
@@ -185,8 +179,7 @@ def hr_performance():
         HardRules(body=comment, org_name=org_name).apply()
         t2 = default_timer()
         hr_times.append(t2 - t1)
-        # sleep for 10 seconds
-        sleep(10)
+        sleep(SLEEP_SECONDS)
     print(
         f"HardRules:\nMean: {round(mean(hr_times),2)}, Median: {round(median(hr_times),2)}, Stdev: {round(stdev(hr_times),2)}\n"
     )
@@ -237,8 +230,7 @@ def app_performance(env: str):
             print(f"Recieved a {response.status_code} response code")
             continue
         app_times.append(t2 - t1)
-        # sleep for 10 seconds
-        sleep(10)
+        sleep(SLEEP_SECONDS)
     print(
         f"App:\nMean: {round(mean(app_times),2)}, Median: {round(median(app_times),2)}, Stdev: {round(stdev(app_times),2)}\n"
     )
@@ -0,0 +1,110 @@
+# This is a script to benchmark the profanity rules against the implementations they
+# replaced: one regex search per soft profanity list entry, and a linear scan of the
+# token list per hard profanity list entry. Synthetic comments of increasing length are
+# built from ordinary review words with a few list entries mixed in. Both versions must
+# return the same words; the mean time per comment and the speedup are printed to the
+# terminal.
+# This script makes no model calls, so it is safe to run against any environment.
+# Usage (from the src folder): python -m eval_and_perform_tests.profanity_benchmark
+import random
+import re
+from timeit import default_timer
+from typing import List
+
+from lexicon import read_sources
+from modules.profanity import profanity_rule
+from modules.profanity_soft import profanity_rule_soft
+
+RANDOMSEED = 12
+COMMENT_LENGTHS = [100, 500, 1000, 3000]  # characters
+REPEATS = 50
+
+sources = read_sources()
+profanity = sources["profanity"]
+profanity_soft = sources["profanity_soft"]
+
+filler_words = (
+    "the doctor was very helpful and the nurse explained everything clearly "
+    "i had to wait a long time at reception but the staff were kind and the "
+    "surgery was clean appointment booking online was easy"
+).split()
+
+
+def legacy_profanity_rule_soft(submission_words: str, profanity_list=profanity_soft):
+    """The soft profanity rule as it was: one regex search per list entry"""
+    result = []
+    for profane_word in profanity_list:
+        pattern = r"\b" + profane_word.lower().strip() + r"\b"
+        if re.search(pattern, submission_words):
+            result.append(profane_word.lower())
+    return list(set(result))
+
+
+def legacy_profanity_rule(submission_words: List[str], profanity_list=profanity):
+    """The hard profanity rule as it was: a scan of the tokens per list entry"""
+    return list(
+        set(
+            [
+                profane_word.lower()
+                for profane_word in profanity_list
+                if profane_word.lower() in submission_words
+            ]
+        )
+    )
+
+
+def make_comment(length: int, rng: random.Random) -> str:
+    """Build a lowercase comment of about length characters with some list words in it"""
+    words = []
+    while sum(len(word) + 1 for word in words) < length:
+        if rng.random() < 0.02:
+            words.append(rng.choice(profanity_soft + profanity).lower().strip())
+        else:
+            words.append(rng.choice(filler_words))
+    return " ".join(words)
+
+
+def time_per_call(func, inputs) -> float:
+    """Mean seconds per call of func over inputs"""
+    t1 = default_timer()
+    for value in inputs:
+        func(value)
+    t2 = default_timer()
+    return (t2 - t1) / len(inputs)
+
+
+def profanity_performance():
+    """Compare the legacy and current profanity rules on comments of each length"""
+    rng = random.Random(RANDOMSEED)
+    print(
+        f"{len(profanity_soft)} soft and {len(profanity)} hard list entries, "
+        f"{REPEATS} comments per length\n"
+    )
+    for length in COMMENT_LENGTHS:
+        comments = [make_comment(length, rng) for _ in range(REPEATS)]
+        tokens = [comment.split() for comment in comments]
+
+        for comment, words in zip(comments, tokens):
+            assert sorted(legacy_profanity_rule_soft(comment)) == sorted(
+                profanity_rule_soft(comment)[1]
+            )
+            assert sorted(legacy_profanity_rule(words)) == sorted(
+                profanity_rule(words)[1]
+            )
+
+        for name, legacy, current, inputs in [
+            ("Soft", legacy_profanity_rule_soft, profanity_rule_soft, comments),
+            ("Hard", legacy_profanity_rule, profanity_rule, tokens),
+        ]:
+            legacy_time = time_per_call(legacy, inputs)
+            current_time = time_per_call(current, inputs)
+            print(
+                f"{name} profanity, {length} chars:\n"
+                f"Legacy: {round(legacy_time * 1000, 3)} ms, "
+                f"Current: {round(current_time * 1000, 3)} ms, "
+                f"Speedup: {round(legacy_time / current_time, 1)}x\n"
+            )
+
+
+if __name__ == "__main__":
+    profanity_performance()
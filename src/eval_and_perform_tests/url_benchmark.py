@@ -0,0 +1,85 @@
+# This is a script to benchmark the URL regex against the implementation it replaced:
+# the full pattern, with a plain alternation of every top level domain, passed to
+# regex.findall on every call with no prefilter. Synthetic 3000 character comments are
+# built from ordinary review words, with and without sentence punctuation and with a
+# few URLs mixed in. Both versions must return the same URLs; the mean time per comment
+# and the speedup are printed to the terminal.
+# This script makes no model calls, so it is safe to run against any environment.
+# Usage (from the src folder): python -m eval_and_perform_tests.url_benchmark
+import random
+from timeit import default_timer
+
+import regex as re
+
+from modules.url_rule import URL_TLDS, find_match_for_url_rule, url_pattern
+
+RANDOMSEED = 12
+COMMENT_LENGTH = 3000  # characters
+REPEATS = 50
+
+legacy_pattern = url_pattern("|".join(URL_TLDS))
+
+filler_words = (
+    "the doctor was very helpful and the nurse explained everything clearly "
+    "i had to wait a long time at reception but the staff were kind and the "
+    "surgery was clean appointment booking online was easy"
+).split()
+urls = ["www.nhs.uk", "https://example.com/booking", "gov.uk/guidance", "t.co"]
+
+
+def legacy_find_match_for_url_rule(text: str):
+    """The URL regex search as it was: findall with the uncompiled pattern"""
+    urls_found = re.findall(legacy_pattern, text)
+    return int(bool(urls_found)), urls_found
+
+
+def make_comment(rng: random.Random, sentences: bool, with_urls: bool) -> str:
+    """Build a comment of about COMMENT_LENGTH characters"""
+    words = []
+    while sum(len(word) + 1 for word in words) < COMMENT_LENGTH:
+        if with_urls and rng.random() < 0.01:
+            words.append(rng.choice(urls))
+        elif sentences and rng.random() < 0.08:
+            words.append(rng.choice(filler_words) + ".")
+        else:
+            words.append(rng.choice(filler_words))
+    return " ".join(words)
+
+
+def time_per_call(func, inputs) -> float:
+    """Mean seconds per call of func over inputs"""
+    t1 = default_timer()
+    for value in inputs:
+        func(value)
+    t2 = default_timer()
+    return (t2 - t1) / len(inputs)
+
+
+def url_performance():
+    """Compare the legacy and current URL regex search on each kind of comment"""
+    rng = random.Random(RANDOMSEED)
+    print(f"{REPEATS} comments of {COMMENT_LENGTH} characters per kind\n")
+    for name, sentences, with_urls in [
+        ("No punctuation", False, False),
+        ("Sentences", True, False),
+        ("Sentences and URLs", True, True),
+    ]:
+        comments = [make_comment(rng, sentences, with_urls) for _ in range(REPEATS)]
+
+        for comment in comments:
+            assert legacy_find_match_for_url_rule(comment) == find_match_for_url_rule(
+                comment
+            )
+
+        legacy_time = time_per_call(legacy_find_match_for_url_rule, comments)
+        current_time = time_per_call(find_match_for_url_rule, comments)
+        print(
+            f"{name}:\n"
+            f"Legacy: {round(legacy_time * 1000, 3)} ms, "
+            f"Current: {round(current_time * 1000, 3)} ms, "
+            f"Speedup: {round(legacy_time / current_time, 1)}x\n"
+        )
+
+
+if __name__ == "__main__":
+    url_performance()
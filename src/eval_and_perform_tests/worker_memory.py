@@ -0,0 +1,89 @@
+# This is a script to measure how much memory each gunicorn worker really costs. RSS
+# counts pages shared copy-on-write with the master (the spaCy model, matcher and
+# lexicon) in full for every process, so it overstates the total; PSS splits each
+# shared page between the processes sharing it, and the private (USS) figure is what
+# one more worker would add.
+# Linux only: it reads /proc/<pid>/smaps_rollup. Run it on the host or container
+# running the app, after sending some traffic so the workers are warmed up.
+# Usage (from the src folder):
+#   python -m eval_and_perform_tests.worker_memory <gunicorn master pid>
+# Compare GunicornPreload=true (the default) with GunicornPreload=false to see what
+# loading the model once in the master saves, and GunicornFreeze=false to see what
+# gc.freeze() adds.
+import argparse
+import os
+from typing import Dict, List
+
+SMAPS_FIELDS = {
+    "Rss": "rss",
+    "Pss": "pss",
+    "Shared_Clean": "shared",
+    "Shared_Dirty": "shared",
+    "Private_Clean": "private",
+    "Private_Dirty": "private",
+}
+
+
+def process_memory(pid: int) -> Dict[str, int]:
+    """Read a process's memory use from /proc
+
+    Args:
+      pid (int): the process id
+
+    Returns:
+      dict: rss, pss, shared and private memory, in kB
+    """
+    memory = {"rss": 0, "pss": 0, "shared": 0, "private": 0}
+    with open(f"/proc/{pid}/smaps_rollup") as fh:
+        for line in fh:
+            parts = line.split()
+            field = parts[0].rstrip(":")
+            if field in SMAPS_FIELDS and len(parts) == 3:
+                memory[SMAPS_FIELDS[field]] += int(parts[1])
+    return memory
+
+
+def child_pids(pid: int) -> List[int]:
+    """List the direct children of a process, i.e. the workers of a gunicorn master"""
+    children = []
+    for task in os.listdir(f"/proc/{pid}/task"):
+        with open(f"/proc/{pid}/task/{task}/children") as fh:
+            children.extend(int(child) for child in fh.read().split())
+    return sorted(children)
+
+
+def worker_memory(master_pid: int):
+    """Print the memory use of a gunicorn master and each of its workers"""
+    rows = [("master", master_pid)] + [
+        ("worker", pid) for pid in child_pids(master_pid)
+    ]
+    usage = {pid: process_memory(pid) for _, pid in rows}
+
+    print(
+        f"{'process':<8}{'pid':>8}{'RSS MiB':>10}{'PSS MiB':>10}"
+        f"{'shared MiB':>12}{'private MiB':>13}"
+    )
+    for role, pid in rows:
+        memory = usage[pid]
+        print(
+            f"{role:<8}{pid:>8}"
+            f"{memory['rss'] / 1024:>10.1f}{memory['pss'] / 1024:>10.1f}"
+            f"{memory['shared'] / 1024:>12.1f}{memory['private'] / 1024:>13.1f}"
+        )
+
+    workers = [pid for role, pid in rows if role == "worker"]
+    total_pss = sum(memory["pss"] for memory in usage.values())
+    print(f"\nTotal PSS (memory really used by the server): {total_pss / 1024:.1f} MiB")
+    if workers:
+        private = sum(usage[pid]["private"] for pid in workers) / len(workers)
+        pss = sum(usage[pid]["pss"] for pid in workers) / len(workers)
+        print(
+            f"Mean per worker: {pss / 1024:.1f} MiB PSS, {private / 1024:.1f} MiB private"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=worker_memory.__doc__)
+    parser.add_argument("master_pid", type=int, help="pid of the gunicorn master")
+    args = parser.parse_args()
+    worker_memory(args.master_pid)
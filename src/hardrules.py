@@ -1,157 +1,500 @@
+import asyncio
 import logging
-from typing import Callable, Dict, Union
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
-from joblib import Parallel, delayed, parallel_backend
+from spacy.tokens import Doc
 
+from config import (
+    BATCH_DEADLINE_SECONDS,
+    BATCH_N_JOBS,
+    COMBINE_REVIEW_TEXTS,
+    REQUEST_DEADLINE_SECONDS,
+    RULE_POLICY,
+)
 from helpers import common_functions
-from helpers.common_functions import exec_in_parallel, log_exceptions
-from modules.allcaps import all_caps_rule
-from modules.complaint_rule import complaint_rule
-from modules.descriptor_rule import descriptor_rule
-from modules.email_rule import check_email_rule
-from modules.names_rule import names_rule
-from modules.not_experience_rule import not_experience_rule
-from modules.profanity import profanity_rule
-from modules.profanity_soft import profanity_rule_soft
-from modules.safeguarding_rule import safeguarding_rule
-from modules.url_rule import check_url_rule
+from helpers.common_functions import capture_exceptions, log_exceptions
+from helpers.event_loop import SKIPPED, TIMED_OUT, gather_calls, run_coroutine
+from helpers.executor import get_rule_executor
+from helpers.metrics import RULE_TIMEOUTS, instrumented
+from helpers.request_timing import RequestTiming, TextTiming, timed_together
+from lexicon import Lexicon, get_lexicon
+from rule_registry import ACTIVE_RULES, STOP_ON_FAIL, Rule, run_stages
 from src.spacy_nlp_matcher_making import matcher, nlp
 
 common_functions.load_env_variables()
 
+logger = logging.getLogger(__name__)
+
 
 class HardRules:
     """Defines a class for enforcing moderation rules on user-generated comments.
 
-    The HardRules class encapsulates a set of moderation rules applied to the text of user-generated comments to ensure they adhere to specific standards. It preprocesses the text for rule application and provides a method to validate the text against all moderation rules, returning a structured report on rule violations.
+    The HardRules class encapsulates a set of moderation rules applied to the text of user-generated comments to ensure they adhere to specific standards. It preprocesses the text for rule application and provides a method to validate the text against all moderation rules, returning a structured report on rule violations. The rules themselves, and the policy deciding which of them run, come from rule_registry.py.
 
     Attributes:
     body (Doc): The processed text of the user comment, prepared for NLP operations.
     org_name (str): The name of the organisation associated with the comment.
     words (List[str]): A list of words in the comment, used for rule validation.
+    lexicon (Lexicon): The snapshot of the word lists used by every rule for this comment.
+    rules (Tuple[Rule, ...]): The rules to apply, in report order.
+    policy (str): The rule policy deciding which rules run, one of RULE_POLICIES.
+    timing (TextTiming, optional): Records how long each rule call takes, when the request asked for a timing breakdown.
 
     Methods:
-    apply() -> Dict[int, Dict[str, Union[int, str, Dict[str, str]]]]: Applies all hard moderation rules to the comment text and returns a dictionary of results indicating rule passes, failures, and flags for review.
+    apply() -> Dict[int, Dict[str, Union[int, str, Dict[str, str]]]]: Applies the hard moderation rules to the comment text and returns a dictionary of results indicating rule passes, failures, and flags for review.
+    rule_inputs() -> Dict[str, Any]: The values the rules can read, by RULE_INPUTS name.
+    rule_calls() -> List[Tuple[Callable, List, dict]]: The rule invocations apply() may run, so they can be scheduled alongside those of other texts.
+    stages() -> List[List[int]]: The rule_calls() indexes grouped into the stages the policy runs them in.
+    decided(results) -> bool: Whether the policy stops calling rules given the results so far.
+    apply_async() -> Dict[int, Dict[str, Union[int, str, Dict[str, str]]]]: Coroutine version of apply() that runs the rules of each stage concurrently on the shared event loop.
+    collate(results) -> Dict[int, Dict[str, Union[int, str, Dict[str, str]]]]: Builds the apply() report from the outputs of rule_calls().
     """
 
-    def __init__(self, body: str, org_name: str):
+    def __init__(
+        self,
+        body: Union[str, Doc],
+        org_name: str,
+        lexicon: Optional[Lexicon] = None,
+        rules: Optional[Tuple[Rule, ...]] = None,
+        policy: str = RULE_POLICY,
+        timing: Optional[TextTiming] = None,
+    ):
         """Instantiate HardRules object (now includes all moderation rules).
 
         Args:
-          body (str): The text to be validated
+          body (str or Doc): The text to be validated, or an already parsed Doc
           org_name (str): The organisation being reviewed
+          lexicon (Lexicon, optional): The word lists to use. Defaults to the current
+                                       lexicon, taken once so a reload mid-review
+                                       cannot mix old and new lists
+          rules (tuple, optional): The rules to apply. Defaults to the registered
+                                   rules less those disabled by DisabledRules
+          policy (str): The rule policy. Defaults to RulePolicy
+          timing (TextTiming, optional): where to record the time each rule call
+                                         takes. Defaults to not timing the rules
 
         Returns:
           HardRules object
         """
 
-        self.body = nlp(body)
+        self.body = body if isinstance(body, Doc) else nlp(body)
         self.org_name = org_name
         self.words = [word.text.lower() for word in self.body]
+        self.lexicon = lexicon or get_lexicon()
+        self.rules = ACTIVE_RULES if rules is None else rules
+        self.policy = policy
+        self.timing = timing
+
+    def rule_inputs(self) -> Dict[str, Any]:
+        """The values rules can read from this body, by RULE_INPUTS name"""
+
+        return {
+            "doc": self.body,
+            "text": self.body.text,
+            "lower_text": self.body.text.lower(),
+            "words": self.words,
+            "org_name": self.org_name,
+            "lexicon": self.lexicon,
+            "nlp": nlp,
+            "matcher": matcher,
+        }
+
+    def rule_calls(self) -> List[Tuple[Callable, List, dict]]:
+        """Build the rule invocations for this body, in the order expected by collate()
+
+        Returns:
+          calls (list): (callable, args, kwargs) tuples as accepted by gather_calls,
+                        one per rule in self.rules
+        """
+
+        inputs = self.rule_inputs()
+        calls = []
+        for rule in self.rules:
+            func = instrumented(rule.name, rule.func)
+            if self.timing:
+                func = self.timing.timed(rule.name, func)
+            calls.append(
+                (func, [], {kwarg: inputs[name] for kwarg, name in rule.inputs.items()})
+            )
+        return calls
+
+    def stages(self) -> List[List[int]]:
+        """The rule_calls() indexes, grouped into the stages the policy runs them in"""
+
+        return run_stages(self.rules, self.policy)
+
+    def decided(self, results: List[Any]) -> bool:
+        """Whether the policy calls no more rules, given the rule outputs so far
 
-    def apply(self) -> Dict[int, Dict[str, Union[int, str, Dict[str, str]]]]:
+        Args:
+          results (list): outputs of the rule_calls() callables run so far. Rules not
+                          run yet are SKIPPED
+
+        Returns:
+          bool: True if a rule has failed (code 1) under the stop_on_fail policy
+        """
+
+        return self.policy == STOP_ON_FAIL and any(
+            is_failure(result) for result in results
+        )
+
+    def apply(
+        self, deadline: Optional[float] = None
+    ) -> Dict[int, Dict[str, Union[int, str, Dict[str, str]]]]:
         """Validate all of the hard rules
 
+        Args:
+          deadline (float, optional): time.monotonic() value by which the rules must
+                                      return. Defaults to REQUEST_DEADLINE_SECONDS from now.
+
         Returns:
           results (dict): results for each rule applied to the body. 0 for pass, 1 for
-                          fail, 2 for flag for review
+                          fail, 2 for flag for review. Rules still running at the
+                          deadline are reported with code 2 and "timedOut": True
         """
 
-        self.results = exec_in_parallel(
-            [
-                (all_caps_rule, [], dict(body=self.body)),
-                (check_url_rule, [], dict(nlp=nlp, doc=self.body, matcher=matcher)),
-                (
-                    names_rule,
-                    [],
-                    dict(submission_words=self.body.text, org_name=self.org_name),
-                ),
-                (descriptor_rule, [], dict(submission_words=self.body.text.lower())),
-                (safeguarding_rule, [], dict(submission_words=self.body.text.lower())),
-                (complaint_rule, [], dict(submission_words=self.body.text.lower())),
-                (
-                    profanity_rule_soft,
-                    [],
-                    dict(submission_words=self.body.text.lower()),
-                ),
-                (check_email_rule, [], dict(submission_words=self.body.text)),
-                (
-                    not_experience_rule,
-                    [],
-                    dict(submission_words=self.body.text.lower()),
-                ),
-            ],
-            n_jobs=4,
-        )
+        return run_coroutine(self.apply_async(deadline))
 
-        self.profanity_rule_results = profanity_rule(self.words)
+    async def apply_async(
+        self, deadline: Optional[float] = None
+    ) -> Dict[int, Dict[str, Union[int, str, Dict[str, str]]]]:
+        """Validate the hard rules, with every rule call of a stage in flight at once
 
-        self.all_caps_results = self.results[0]
-        self.url_rule_results = self.results[1]
-        self.names_rule_results = self.results[2]
-        self.descriptor_rule_results = self.results[3]
-        self.safeguarding_rule_results = self.results[4]
-        self.complaint_rule_results = self.results[5]
-        self.profanity_rule_soft_results = self.results[6]
-        self.email_rule_results = self.results[7]
-        self.not_experience_rule_results = self.results[8]
+        Args:
+          deadline (float, optional): as for apply()
+
+        Returns:
+          results (dict): as for apply()
+        """
+
+        if deadline is None:
+            deadline = time.monotonic() + REQUEST_DEADLINE_SECONDS
+
+        calls = self.rule_calls()
+        results = [SKIPPED] * len(calls)
+        stop_when = is_failure if self.policy == STOP_ON_FAIL else None
+        for stage in self.stages():
+            if self.decided(results):
+                break
+            stage_results = await gather_calls(
+                [calls[i] for i in stage], deadline=deadline, stop_when=stop_when
+            )
+            for i, result in zip(stage, stage_results):
+                results[i] = result
+
+        return self.collate(results)
+
+    def collate(
+        self, results: List[Any]
+    ) -> Dict[int, Dict[str, Union[int, str, Dict[str, str]]]]:
+        """Turn the raw rule outputs from rule_calls() into the moderation report
+
+        Args:
+          results (list): outputs of the rule_calls() callables, in the same order.
+                          Rules that were not run are SKIPPED
+
+        Returns:
+          results (dict): results for each rule applied to the body. 0 for pass, 1 for
+                          fail, 2 for flag for review
+        """
+
+        skipped = [
+            rule.name for rule, result in zip(self.rules, results) if result is SKIPPED
+        ]
+        if skipped:
+            logger.debug(f"Rules not run as the outcome was already decided: {skipped}")
 
         self.results = {
             "id": "ids",
             "results": [
-                {
-                    "rule": "allCaps",
-                    "code": self.all_caps_results[0],
-                    "values": self.all_caps_results[2],
-                },
-                {
-                    "rule": "emailRule",
-                    "code": self.email_rule_results[0],
-                    "values": self.email_rule_results[1],
-                },
-                {
-                    "rule": "urlRule",
-                    "code": self.url_rule_results[0],
-                    "values": self.url_rule_results[1],
-                },
-                {
-                    "rule": "profanityDetectionHard",
-                    "code": self.profanity_rule_results[0],
-                    "values": self.profanity_rule_results[1],
-                },
-                {
-                    "rule": "profanityDetectionSoft",
-                    "code": self.profanity_rule_soft_results[0],
-                    "values": self.profanity_rule_soft_results[1],
-                },
-                {
-                    "rule": "namesRule",
-                    "code": self.names_rule_results[0],
-                    "values": self.names_rule_results[1],
-                },
-                {
-                    "rule": "descriptorRuleHard",
-                    "code": self.descriptor_rule_results[0],
-                    "values": self.descriptor_rule_results[1],
-                },
-                {
-                    "rule": "safeguardingRule",
-                    "code": self.safeguarding_rule_results[0],
-                    "values": self.safeguarding_rule_results[1],
-                    "probability": self.safeguarding_rule_results[2],
-                },
-                {
-                    "rule": "complaintRule",
-                    "code": self.complaint_rule_results[0],
-                    "values": self.complaint_rule_results[1],
-                },
-                {
-                    "rule": "notAnExperienceRule",
-                    "code": self.not_experience_rule_results[0],
-                    "values": self.not_experience_rule_results[1],
-                },
+                rule_entry(
+                    rule.name,
+                    result,
+                    values_index=rule.values_index,
+                    probability_index=rule.probability_index,
+                )
+                for rule, result in zip(self.rules, results)
+                if result is not SKIPPED
             ],
         }
 
+        timed_out = [x["rule"] for x in self.results["results"] if x.get("timedOut")]
+        for rule in timed_out:
+            RULE_TIMEOUTS.labels(rule).inc()
+        if timed_out:
+            logger.warning(f"Rules timed out and need human moderation: {timed_out}")
+
         self.results["results"] = [x for x in self.results["results"] if x["code"] >= 1]
         return self.results
+
+
+def is_failure(result: Any) -> bool:
+    """True if a rule output is a fail (code 1), rather than a pass, flag or placeholder"""
+    return isinstance(result, tuple) and result[0] == 1
+
+
+def rule_entry(
+    rule: str,
+    result: Any,
+    values_index: int = 1,
+    probability_index: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Build the report entry for one rule from its raw output
+
+    Args:
+      rule (str): the rule name reported to the caller
+      result: the rule's output tuple, or TIMED_OUT if it missed the deadline
+      values_index (int): position of the matched values in the output tuple
+      probability_index (int, optional): position of a probability to report
+
+    Returns:
+      entry (dict): the rule's code and values. A rule that timed out is flagged
+                    for human moderation (code 2) and marked "timedOut": True
+    """
+    if result is TIMED_OUT:
+        return {"rule": rule, "code": 2, "values": [], "timedOut": True}
+
+    entry = {"rule": rule, "code": result[0], "values": result[values_index]}
+    if probability_index is not None:
+        entry["probability"] = result[probability_index]
+    return entry
+
+
+async def parse_async(
+    body: Union[str, Doc], timing: Optional[TextTiming] = None
+) -> Doc:
+    """Parse a text with spaCy on the rule executor, so parsing does not block the loop
+
+    Args:
+      body (str or Doc): the text to parse. A Doc is returned as it is
+      timing (TextTiming, optional): where to record the time the parse takes
+
+    Returns:
+      Doc: the parsed text
+    """
+    if isinstance(body, Doc):
+        return body
+    return await get_rule_executor().run_async(
+        timing.timed_parse(nlp) if timing else nlp, body
+    )
+
+
+def apply_review(
+    bodies: List[Union[str, Doc]],
+    org_name: str,
+    lexicon: Optional[Lexicon] = None,
+    deadline: Optional[float] = None,
+    combine: bool = COMBINE_REVIEW_TEXTS,
+    timing: Optional[RequestTiming] = None,
+) -> List[Dict[int, Dict[str, Union[int, str, Dict[str, str]]]]]:
+    """Moderate the texts of one review, e.g. its title and comment, as one task graph
+
+    Args:
+      bodies (list): the texts to validate, or already parsed Docs
+      org_name (str): the organisation being reviewed
+      lexicon (Lexicon, optional): the word lists used for every text. Defaults to
+                                   the current lexicon
+      deadline (float, optional): time.monotonic() value shared by every rule, as for
+                                  HardRules.apply()
+      combine (bool): send the texts to each model that accepts a list in one call.
+                      Defaults to CombineReviewTexts
+      timing (RequestTiming, optional): where to record the time each text's parse
+                                        and rules take, with a timing for each text
+
+    Returns:
+      results (list): the apply() report for each text, in input order
+    """
+
+    return run_coroutine(
+        apply_review_async(bodies, org_name, lexicon, deadline, combine, timing)
+    )
+
+
+async def apply_review_async(
+    bodies: List[Union[str, Doc]],
+    org_name: str,
+    lexicon: Optional[Lexicon] = None,
+    deadline: Optional[float] = None,
+    combine: bool = COMBINE_REVIEW_TEXTS,
+    timing: Optional[RequestTiming] = None,
+) -> List[Dict[int, Dict[str, Union[int, str, Dict[str, str]]]]]:
+    """Coroutine version of apply_review(), to await on the shared event loop
+
+    Each text is parsed on the rule executor and its rules, the local ones included,
+    are started as soon as its own parse is done, without waiting for the other texts.
+    The rule calls of a short title are in flight while a long comment is still being
+    parsed, and the review takes as long as its slowest text rather than the sum.
+
+    With combine, the texts are all parsed first, and then each rule whose model
+    accepts a list of texts (a rule with a batch_func) is sent every text in one call,
+    halving the outbound calls to those models for a title and comment. The reports
+    are the same either way.
+
+    Args:
+      bodies, org_name, lexicon, deadline, combine, timing: as for apply_review()
+
+    Returns:
+      results (list): as for apply_review()
+    """
+
+    lexicon = lexicon or get_lexicon()
+    if deadline is None:
+        deadline = time.monotonic() + REQUEST_DEADLINE_SECONDS
+    text_timings = timing.texts if timing else [None] * len(bodies)
+
+    if combine and len(bodies) > 1:
+        docs = await asyncio.gather(
+            *(parse_async(body, t) for body, t in zip(bodies, text_timings))
+        )
+        hard_rules = [
+            HardRules(body=doc, org_name=org_name, lexicon=lexicon, timing=t)
+            for doc, t in zip(docs, text_timings)
+        ]
+        rule_results = await run_rules_together(
+            hard_rules, deadline=deadline, combine=True
+        )
+        for text_results in rule_results:
+            for result in text_results:
+                if isinstance(result, Exception):
+                    raise result
+        return [
+            rules.collate(text_results)
+            for rules, text_results in zip(hard_rules, rule_results)
+        ]
+
+    async def moderate(body, text_timing):
+        doc = await parse_async(body, text_timing)
+        rules = HardRules(
+            body=doc, org_name=org_name, lexicon=lexicon, timing=text_timing
+        )
+        return await rules.apply_async(deadline)
+
+    return await asyncio.gather(
+        *(moderate(body, t) for body, t in zip(bodies, text_timings))
+    )
+
+
+async def run_rules_together(
+    hard_rules: List[HardRules],
+    limit: Optional[int] = None,
+    deadline: Optional[float] = None,
+    combine: bool = False,
+) -> List[List[Any]]:
+    """Run the rules of several texts stage by stage, with each stage fanned out across all of them
+
+    Texts the policy has already decided, or whose rules raised, have no more rules
+    called. With combine, a rule with a batch_func is called once for all the texts
+    still running rather than once per text, so its model gets one request.
+
+    Args:
+      hard_rules (list): HardRules objects for the texts, sharing the same rules and
+                         policy
+      limit (int, optional): maximum number of rule invocations in flight at once
+      deadline (float, optional): time.monotonic() value after which rules still
+                                  running are TIMED_OUT
+      combine (bool): call rules that have a batch_func once for all the texts
+
+    Returns:
+      results (list): for each text, the outputs of its rule_calls(), with the
+                      exception in place of any rule that raised, and SKIPPED for
+                      rules that were not run
+    """
+
+    calls = [rules.rule_calls() for rules in hard_rules]
+    rule_results = [[SKIPPED] * len(rule_calls) for rule_calls in calls]
+
+    for stage in hard_rules[0].stages() if hard_rules else []:
+        running = [
+            t
+            for t, rules in enumerate(hard_rules)
+            if not rules.decided(rule_results[t])
+            and not any(isinstance(r, Exception) for r in rule_results[t])
+        ]
+
+        # Each job is one call, and the (text, rule) slots its output fills
+        jobs = []
+        for i in stage:
+            rule = hard_rules[0].rules[i]
+            if combine and rule.batch_func is not None and len(running) > 1:
+                kwargs = {
+                    kwarg: [calls[t][i][2][kwarg] for t in running]
+                    for kwarg in rule.inputs
+                }
+                batch_func = instrumented(rule.name, rule.batch_func)
+                if hard_rules[running[0]].timing:
+                    batch_func = timed_together(
+                        [hard_rules[t].timing for t in running], rule.name, batch_func
+                    )
+                jobs.append(((batch_func, [], kwargs), [(t, i) for t in running]))
+            else:
+                jobs.extend((calls[t][i], [(t, i)]) for t in running)
+
+        outputs = await gather_calls(
+            [(capture_exceptions(c), args, kwargs) for (c, args, kwargs), _ in jobs],
+            limit=limit,
+            deadline=deadline,
+        )
+        for (_, slots), output in zip(jobs, outputs):
+            if len(slots) == 1:
+                ((t, i),) = slots
+                rule_results[t][i] = output
+                continue
+            # A combined call's placeholder or exception stands for every text in it
+            split = isinstance(output, list)
+            for n, (t, i) in enumerate(slots):
+                rule_results[t][i] = output[n] if split else output
+
+    return rule_results
+
+
+def apply_batch(
+    reviews: List[Tuple[str, str]],
+    n_jobs: int = BATCH_N_JOBS,
+    lexicon: Optional[Lexicon] = None,
+    deadline: Optional[float] = None,
+) -> List[Union[Dict[int, Dict[str, Union[int, str, Dict[str, str]]]], Exception]]:
+    """Apply the hard rules to many texts at once
+
+    All texts are parsed in a single nlp.pipe pass and the rules for every text are
+    fanned out together on the shared event loop, rather than one pool per text. A failure in any
+    rule only affects the text it was applied to.
+
+    Args:
+      reviews (list): (body, org_name) tuples to validate
+      n_jobs (int): maximum number of rule invocations in flight across the batch
+      lexicon (Lexicon, optional): the word lists used for every text in the batch.
+                                   Defaults to the current lexicon
+      deadline (float, optional): time.monotonic() value after which rules still
+                                  running are reported with code 2 and
+                                  "timedOut": True, as for HardRules.apply().
+                                  Defaults to BATCH_DEADLINE_SECONDS from now
+
+    Returns:
+      results (list): the apply() report for each text, in input order, or the
+                      exception raised while validating that text
+    """
+
+    lexicon = lexicon or get_lexicon()
+    if deadline is None:
+        deadline = time.monotonic() + BATCH_DEADLINE_SECONDS
+    hard_rules = [
+        HardRules(body=doc, org_name=org_name, lexicon=lexicon)
+        for doc, (_, org_name) in zip(nlp.pipe([body for body, _ in reviews]), reviews)
+    ]
+    rule_results = run_coroutine(
+        run_rules_together(hard_rules, limit=n_jobs, deadline=deadline)
+    )
+
+    results = []
+    for rules, text_results in zip(hard_rules, rule_results):
+        errors = [r for r in text_results if isinstance(r, Exception)]
+        if errors:
+            results.append(errors[0])
+            continue
+        try:
+            results.append(rules.collate(text_results))
+        except Exception as e:
+            results.append(e)
+
+    return results
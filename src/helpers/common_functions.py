@@ -1,12 +1,14 @@
 import functools
+import hmac
 import logging
 import os
 import re
-from typing import Any, Callable, List, Tuple
+from typing import Callable, Optional
 
 import dotenv
 import emoji
-from joblib import Parallel, delayed, parallel_backend
+
+from config import ADMIN_API_KEY, DEPLOYED_ENVIRONMENTS
 
 
 def clean_api_key(api_key: str):
@@ -25,6 +27,21 @@ def clean_api_key(api_key: str):
     return api_key
 
 
+def is_admin_authorization(authorization: Optional[str]) -> bool:
+    """True if an Authorization header value carries the admin key
+
+    Parameters:
+    authorization (str, optional): the request's Authorization header, if it sent one.
+
+    Returns:
+    bool: False whenever the AdminKey environment variable is unset.
+    """
+    if not ADMIN_API_KEY:
+        return False
+    supplied = authorization or ""
+    return hmac.compare_digest(supplied.encode(), f"Bearer {ADMIN_API_KEY}".encode())
+
+
 def correct_url_format(url):
     """
     Corrects common formatting issues in URLs including removing leading apostrophes.
@@ -73,9 +90,24 @@ def log_exceptions(func: Callable):
     return wrapper
 
 
+def capture_exceptions(func: Callable):
+    """A decorator that wraps the passed in function and returns any exception
+    raised instead of propagating it, so one failing call in a batch does not
+    abort the others"""
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        except Exception as e:
+            return e
+
+    return wrapper
+
+
 def load_env_variables():
     """Loads environment variables from local .env file"""
-    if os.getenv("environmentShort") not in {"PROD", "INT", "DEV", "STAG"}:
+    if os.getenv("environmentShort") not in DEPLOYED_ENVIRONMENTS:
         dotenv.load_dotenv()
 
 
@@ -192,28 +224,3 @@ def colouring(html_table):
         print(key, value)
 
     return html_table
-
-
-def exec_in_parallel(
-    callables: List[Tuple[Callable, List, dict]], n_jobs: int = 1
-) -> List[Any]:
-    """Use joblib to execute the callables via c() for c in callables
-
-    Args:
-    - callables: A list of tuples, each containing:
-        - c (Callable): The callable function to be executed.
-        - args (List): The positional arguments to be passed to the callable.
-        - kwargs (dict): The keyword arguments to be passed to the callable.
-
-    - n_jobs (int, optional): Number of parallel jobs to run. Default is 1.
-
-    Returns:
-    - List[Any]: A list containing the results of the parallel executions.
-    """
-
-    with parallel_backend("threading", n_jobs=n_jobs):
-        ans = Parallel(verbose=True)(
-            delayed(c)(*args, **kwargs) for c, args, kwargs in callables
-        )
-
-    return ans
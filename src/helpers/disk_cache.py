@@ -0,0 +1,262 @@
+# Optional on-disk cache of remote model verdicts, shared by every worker process on a
+# node and kept across restarts and redeploys. It sits behind the in-process verdict
+# cache and is backed by SQLite in WAL mode, so concurrent workers can read while one
+# writes.
+#
+# Usage (from the src folder):
+#   python -m helpers.disk_cache stats
+#   python -m helpers.disk_cache evict --max-age 86400 --max-entries 100000
+#   python -m helpers.disk_cache purge --rule complaint_rule
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from config import (
+    VERDICT_DISK_CACHE_EVICT_EVERY,
+    VERDICT_DISK_CACHE_MAX_AGE_SECONDS,
+    VERDICT_DISK_CACHE_MAX_ENTRIES,
+    VERDICT_DISK_CACHE_PATH,
+)
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS verdicts (
+    key TEXT PRIMARY KEY,
+    rule TEXT NOT NULL,
+    version TEXT NOT NULL,
+    value TEXT NOT NULL,
+    created REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS verdicts_created ON verdicts (created);
+"""
+
+
+class DiskVerdictCache:
+    """A SQLite-backed verdict cache that is safe to share between worker processes.
+
+    Errors from the database are logged and treated as cache misses, so a full or
+    locked cache file never fails a moderation request.
+
+    Attributes:
+    path (str): The SQLite database file.
+    max_age_seconds (float): Verdicts older than this are ignored and evicted.
+    max_entries (int): Eviction keeps at most this many of the newest verdicts.
+
+    Methods:
+    get(key) -> Any: Return a cached verdict, or None on a miss.
+    set(key, rule, version, value) -> None: Store a verdict.
+    evict(max_age_seconds=None, max_entries=None) -> int: Remove old verdicts and trim the cache to size.
+    purge(rule=None) -> int: Remove every verdict, or every verdict for one rule.
+    stats() -> Dict[str, Any]: Entry counts per rule, age range, file size and this process's hit/miss counters.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_age_seconds: float = VERDICT_DISK_CACHE_MAX_AGE_SECONDS,
+        max_entries: int = VERDICT_DISK_CACHE_MAX_ENTRIES,
+        evict_every: int = VERDICT_DISK_CACHE_EVICT_EVERY,
+    ):
+        self.path = path
+        self.max_age_seconds = max_age_seconds
+        self.max_entries = max_entries
+        self.evict_every = evict_every
+        self._local = threading.local()
+        self._counter_lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._writes = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return this thread's connection, opening one if needed (including after a fork)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key: str) -> Any:
+        """Look a verdict up
+
+        Args:
+          key (str): the verdict key, see verdict_cache.verdict_key()
+
+        Returns:
+          The cached verdict, or None if it is missing, too old or unreadable
+        """
+        try:
+            row = (
+                self._connection()
+                .execute(
+                    "SELECT value FROM verdicts WHERE key = ? AND created >= ?",
+                    (key, time.time() - self.max_age_seconds),
+                )
+                .fetchone()
+            )
+        except sqlite3.Error as e:
+            logger.warning(f"Disk verdict cache read failed: {e}")
+            row = None
+
+        with self._counter_lock:
+            if row is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+
+        if row is None:
+            return None
+        # Rule outputs are tuples, which JSON stores as lists
+        return tuple(json.loads(row[0]))
+
+    def set(self, key: str, rule: str, version: str, value: Any):
+        """Store a verdict, evicting old entries every evict_every writes
+
+        Args:
+          key (str): the verdict key, see verdict_cache.verdict_key()
+          rule (str): the rule that produced the verdict
+          version (str): the version tag of the endpoint that produced it
+          value: the rule's output
+        """
+        try:
+            self._connection().execute(
+                "INSERT OR REPLACE INTO verdicts (key, rule, version, value, created) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, rule, version, json.dumps(value), time.time()),
+            )
+        except sqlite3.Error as e:
+            logger.warning(f"Disk verdict cache write failed: {e}")
+            return
+
+        with self._counter_lock:
+            self._writes += 1
+            evict = self._writes % self.evict_every == 0
+        if evict:
+            self.evict()
+
+    def evict(
+        self,
+        max_age_seconds: Optional[float] = None,
+        max_entries: Optional[int] = None,
+    ) -> int:
+        """Remove verdicts older than max_age_seconds, then all but the newest max_entries
+
+        Args:
+          max_age_seconds (float, optional): defaults to the cache's max_age_seconds
+          max_entries (int, optional): defaults to the cache's max_entries
+
+        Returns:
+          int: the number of verdicts removed
+        """
+        max_age_seconds = (
+            self.max_age_seconds if max_age_seconds is None else max_age_seconds
+        )
+        max_entries = self.max_entries if max_entries is None else max_entries
+        try:
+            conn = self._connection()
+            removed = conn.execute(
+                "DELETE FROM verdicts WHERE created < ?",
+                (time.time() - max_age_seconds,),
+            ).rowcount
+            removed += conn.execute(
+                "DELETE FROM verdicts WHERE key IN ("
+                "SELECT key FROM verdicts ORDER BY created DESC LIMIT -1 OFFSET ?)",
+                (max_entries,),
+            ).rowcount
+        except sqlite3.Error as e:
+            logger.warning(f"Disk verdict cache eviction failed: {e}")
+            return 0
+        return removed
+
+    def purge(self, rule: Optional[str] = None) -> int:
+        """Remove every verdict, or only those produced by one rule
+
+        Args:
+          rule (str, optional): the rule name, e.g. "complaint_rule"
+
+        Returns:
+          int: the number of verdicts removed
+        """
+        conn = self._connection()
+        if rule is None:
+            removed = conn.execute("DELETE FROM verdicts").rowcount
+        else:
+            removed = conn.execute(
+                "DELETE FROM verdicts WHERE rule = ?", (rule,)
+            ).rowcount
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        """Report the cache's contents and this process's hit/miss counters"""
+        conn = self._connection()
+        by_rule = dict(
+            conn.execute("SELECT rule, COUNT(*) FROM verdicts GROUP BY rule").fetchall()
+        )
+        oldest, newest = conn.execute(
+            "SELECT MIN(created), MAX(created) FROM verdicts"
+        ).fetchone()
+        with self._counter_lock:
+            hits, misses = self._hits, self._misses
+
+        return {
+            "path": self.path,
+            "entries": sum(by_rule.values()),
+            "by_rule": by_rule,
+            "oldest_age_seconds": None if oldest is None else time.time() - oldest,
+            "newest_age_seconds": None if newest is None else time.time() - newest,
+            "size_bytes": sum(
+                os.path.getsize(self.path + suffix)
+                for suffix in ("", "-wal")
+                if os.path.exists(self.path + suffix)
+            ),
+            "hits": hits,
+            "misses": misses,
+        }
+
+
+disk_verdict_cache = (
+    DiskVerdictCache(VERDICT_DISK_CACHE_PATH) if VERDICT_DISK_CACHE_PATH else None
+)
+
+
+def main(argv=None):
+    """Inspect, evict from or purge the disk verdict cache"""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument(
+        "--path",
+        default=VERDICT_DISK_CACHE_PATH,
+        help="cache file (defaults to the VerdictCachePath environment variable)",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("stats", help="show the number and age of cached verdicts")
+    evict = commands.add_parser("evict", help="remove old verdicts")
+    evict.add_argument("--max-age", type=float, help="seconds to keep verdicts for")
+    evict.add_argument("--max-entries", type=int, help="newest verdicts to keep")
+    purge = commands.add_parser("purge", help="remove cached verdicts")
+    purge.add_argument("--rule", help="only purge this rule, e.g. complaint_rule")
+    args = parser.parse_args(argv)
+
+    if not args.path:
+        parser.error("no cache file given; pass --path or set VerdictCachePath")
+
+    cache = DiskVerdictCache(args.path)
+    if args.command == "stats":
+        print(json.dumps(cache.stats(), indent=2))
+    elif args.command == "evict":
+        print(f"Evicted {cache.evict(args.max_age, args.max_entries)} verdicts")
+    elif args.command == "purge":
+        print(f"Purged {cache.purge(args.rule)} verdicts")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+# Registry of the Azure ML scoring endpoints used by the remote rules. URLs and keys are
+# read from the environment, cleaned and validated once, and the request headers for
+# each endpoint are built up front, so no per-call parsing happens in the rules.
+import hashlib
+import os
+import threading
+from dataclasses import dataclass
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+from helpers.common_functions import clean_api_key, correct_url_format
+
+# Model name -> (URL environment variable, key environment variable, deployment name).
+# The azureml-model-deployment header forces the request to go to a specific deployment;
+# endpoints without one observe the endpoint traffic rules. An optional <prefix>Version
+# variable (e.g. ComplaintsVersion) tags the model version behind each endpoint.
+ENDPOINT_SETTINGS = {
+    "complaint": ("ComplaintsURL", "ComplaintsKey", None),
+    "descriptor": ("DescriptionsURL", "DescriptionsKey", None),
+    "names": ("NamesURL", "NamesKey", "names-module"),
+    "not_experience": ("NotAnExperienceURL", "NotAnExperienceKey", None),
+    "safeguarding": ("SafeguardingURL", "SafeguardingKey", "safeguarding"),
+}
+
+
+class EndpointConfigError(Exception):
+    """Raised when a scoring endpoint's URL or key is missing or invalid"""
+
+
+@dataclass(frozen=True)
+class Endpoint:
+    """A validated scoring endpoint, ready to post to.
+
+    Attributes:
+    name (str): The model name used to look the endpoint up.
+    url (str): The validated scoring URL.
+    api_key (str): The cleaned API key.
+    deployment (str, optional): The Azure ML deployment requests are pinned to.
+    headers (Dict[str, str]): The prebuilt request headers, including authorisation.
+    version (str): Tags the model behind the endpoint, so cached verdicts from an old model are not reused.
+    """
+
+    name: str
+    url: str
+    api_key: str
+    deployment: Optional[str]
+    headers: Dict[str, str]
+    version: str
+
+
+def build_endpoint(
+    name: str,
+    url: str,
+    api_key: str,
+    deployment: Optional[str] = None,
+    version: Optional[str] = None,
+) -> Endpoint:
+    """Clean and validate a URL and key, and build the endpoint's headers
+
+    Args:
+      name (str): the model name
+      url (str): the raw scoring URL
+      api_key (str): the raw API key
+      deployment (str, optional): the Azure ML deployment to pin requests to
+      version (str, optional): the model version tag. Defaults to a hash of the URL
+                               and deployment, so pointing at a new model changes it
+
+    Returns:
+      Endpoint: the validated endpoint
+
+    Raises:
+      EndpointConfigError: if the URL or key is missing or malformed
+    """
+    if not url:
+        raise EndpointConfigError(f"No URL provided for the {name} endpoint")
+    if not api_key:
+        raise EndpointConfigError(f"No key provided for the {name} endpoint")
+
+    url = correct_url_format(url)
+    if not urlparse(url).netloc:
+        raise EndpointConfigError(f"Invalid URL provided for the {name} endpoint")
+
+    api_key = clean_api_key(api_key)
+    if not api_key:
+        raise EndpointConfigError(f"No key provided for the {name} endpoint")
+
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": ("Bearer " + api_key),
+    }
+    if deployment:
+        headers["azureml-model-deployment"] = deployment
+
+    if not version:
+        version = hashlib.sha256(f"{url}|{deployment}".encode()).hexdigest()[:12]
+
+    return Endpoint(
+        name=name,
+        url=url,
+        api_key=api_key,
+        deployment=deployment,
+        headers=headers,
+        version=version,
+    )
+
+
+class EndpointRegistry:
+    """Holds the validated scoring endpoints for every remote model.
+
+    Methods:
+    load() -> None: Build every endpoint from the environment, failing if any are missing or invalid.
+    get(name) -> Endpoint: Look an endpoint up by model name, loading the registry on first use.
+    register(endpoint) -> None: Add or hot-swap a single endpoint.
+    """
+
+    def __init__(self):
+        self._endpoints = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Build every endpoint in ENDPOINT_SETTINGS from environment variables
+
+        Raises:
+          EndpointConfigError: listing every endpoint that is missing or invalid
+        """
+        endpoints = {}
+        errors = []
+        for name, (url_var, key_var, deployment) in ENDPOINT_SETTINGS.items():
+            try:
+                endpoints[name] = build_endpoint(
+                    name,
+                    os.getenv(url_var),
+                    os.getenv(key_var),
+                    deployment,
+                    os.getenv(url_var[: -len("URL")] + "Version"),
+                )
+            except EndpointConfigError as e:
+                errors.append(f"{e} (check {url_var} and {key_var})")
+
+        if errors:
+            raise EndpointConfigError("; ".join(errors))
+
+        # Swap the whole mapping in one assignment so readers never see a partial load
+        self._endpoints = endpoints
+
+    def get(self, name: str) -> Endpoint:
+        """Return the endpoint for a model, loading the registry if needed
+
+        Args:
+          name (str): a model name from ENDPOINT_SETTINGS
+
+        Returns:
+          Endpoint: the validated endpoint
+        """
+        if self._endpoints is None:
+            with self._lock:
+                if self._endpoints is None:
+                    self.load()
+        return self._endpoints[name]
+
+    def register(self, endpoint: Endpoint):
+        """Add or replace a single endpoint, e.g. to point a model at a new deployment
+
+        Args:
+          endpoint (Endpoint): the endpoint to use from now on
+        """
+        with self._lock:
+            if self._endpoints is None:
+                self.load()
+            endpoints = dict(self._endpoints)
+            endpoints[endpoint.name] = endpoint
+            self._endpoints = endpoints
+
+
+endpoints = EndpointRegistry()
+
+
+def get_endpoint(name: str) -> Endpoint:
+    """Return the registered endpoint for a model"""
+    return endpoints.get(name)
@@ -0,0 +1,165 @@
+# A single asyncio event loop shared by the whole process. The loop runs in a daemon
+# thread so that synchronous code (Flask views, HardRules.apply) can hand it work and
+# wait for the result, while every blocking model call is awaited concurrently on the
+# process-wide rule executor (helpers/executor.py) rather than queued behind a small
+# per-request pool.
+import asyncio
+import functools
+import os
+import threading
+import time
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+
+from helpers.executor import get_rule_executor
+
+_loop = None
+_lock = threading.Lock()
+
+
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """Return the shared event loop, starting its thread on first use
+
+    Returns:
+      asyncio.AbstractEventLoop: the running process-wide loop
+    """
+    global _loop
+    with _lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=loop.run_forever, name="event-loop", daemon=True
+            ).start()
+            _loop = loop
+    return _loop
+
+
+def _reset_after_fork():
+    """Forget the parent's loop in a forked child, whose loop thread did not survive"""
+    global _loop, _lock
+    _loop = None
+    _lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def run_coroutine(coro: Awaitable, timeout: Optional[float] = None) -> Any:
+    """Run a coroutine on the shared loop from synchronous code and wait for it
+
+    Args:
+      coro: the coroutine to run
+      timeout (float, optional): seconds to wait before raising TimeoutError
+
+    Returns:
+      The coroutine's result
+    """
+    return asyncio.run_coroutine_threadsafe(coro, get_event_loop()).result(timeout)
+
+
+async def run_on_shared_loop(coro: Awaitable) -> Any:
+    """Run a coroutine on the shared loop and await it from another running loop
+
+    Used by the async app, whose requests run on the server's loop: the rule calls
+    still share the process-wide rule executor, and the server's loop is free while they
+    run. Cancelling the await cancels the coroutine on the shared loop.
+
+    Args:
+      coro: the coroutine to run
+
+    Returns:
+      The coroutine's result
+    """
+    return await asyncio.wrap_future(
+        asyncio.run_coroutine_threadsafe(coro, get_event_loop())
+    )
+
+
+class _TimedOut:
+    """Placeholder result for a call that was still running at its deadline"""
+
+    def __repr__(self):
+        return "TIMED_OUT"
+
+
+TIMED_OUT = _TimedOut()
+
+
+class _Skipped:
+    """Placeholder result for a call dropped because the outcome was already decided"""
+
+    def __repr__(self):
+        return "SKIPPED"
+
+
+SKIPPED = _Skipped()
+
+
+async def gather_calls(
+    callables: List[Tuple[Callable, List, dict]],
+    limit: Optional[int] = None,
+    deadline: Optional[float] = None,
+    stop_when: Optional[Callable[[Any], bool]] = None,
+) -> List[Any]:
+    """Run blocking callables concurrently on the process-wide rule executor
+
+    While the executor is full, calls wait on the loop for room, so the deadline
+    still applies to them and the loop is never blocked.
+
+    Args:
+    - callables: A list of (callable, args, kwargs) tuples
+    - limit (int, optional): maximum number of these callables in flight at once.
+      Default is no limit beyond the size of the shared executor.
+    - deadline (float, optional): time.monotonic() value after which calls that have
+      not returned are abandoned. Default is to wait for every call.
+    - stop_when (callable, optional): called with each result as it arrives. Once it
+      returns True, the calls that have not returned are abandoned. Default is to
+      wait for every call.
+
+    Returns:
+    - List[Any]: the results of the callables, in the order given, with TIMED_OUT in
+      place of any call abandoned at the deadline and SKIPPED in place of any call
+      abandoned because of stop_when
+    """
+    executor = get_rule_executor()
+    semaphore = asyncio.Semaphore(limit) if limit else None
+
+    async def call(c, args, kwargs):
+        if semaphore is None:
+            return await executor.run_async(functools.partial(c, *args, **kwargs))
+        async with semaphore:
+            return await executor.run_async(functools.partial(c, *args, **kwargs))
+
+    tasks = [
+        asyncio.ensure_future(call(c, args, kwargs)) for c, args, kwargs in callables
+    ]
+    if not tasks:
+        return []
+
+    def remaining():
+        return None if deadline is None else max(deadline - time.monotonic(), 0)
+
+    stopped = False
+    if stop_when is None:
+        done, pending = await asyncio.wait(tasks, timeout=remaining())
+    else:
+        done, pending = set(), set(tasks)
+        while pending and not stopped:
+            finished, pending = await asyncio.wait(
+                pending, timeout=remaining(), return_when=asyncio.FIRST_COMPLETED
+            )
+            if not finished:
+                break
+            done |= finished
+            stopped = any(
+                task.exception() is None and stop_when(task.result())
+                for task in finished
+            )
+
+    # The executor threads cannot be interrupted, but their results are dropped.
+    # Calls still waiting for a thread are never started
+    for task in pending:
+        task.cancel()
+
+    abandoned = SKIPPED if stopped else TIMED_OUT
+    return [task.result() if task in done else abandoned for task in tasks]
@@ -0,0 +1,202 @@
+# The process-wide thread pool that runs every rule call, for single reviews, batches
+# and the async app alike. It is created once per process, so no pool is built or torn
+# down on the request path, and its queue is bounded: at most MODEL_CALL_QUEUE_SIZE
+# calls wait for a thread. Code on an event loop submits with run_async(), which waits
+# on the loop for room in the queue, so a full pool pushes back on new work without
+# ever blocking the loop thread: deadlines still fire and other requests still get
+# served. submit() refuses work when the queue is full rather than block its caller.
+# stats() reports the queue depth, busy threads and how long calls wait for a thread,
+# to size MODEL_CALL_WORKERS from.
+import asyncio
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+from config import MODEL_CALL_QUEUE_SIZE, MODEL_CALL_WORKERS
+from helpers.metrics import EXECUTOR_ACTIVE, EXECUTOR_QUEUED, EXECUTOR_WAIT
+
+# The wait of the call each pool thread is running, for current_wait()
+_current = threading.local()
+
+
+class ExecutorFull(RuntimeError):
+    """Raised by RuleExecutor.submit() when every thread is busy and the queue is full"""
+
+
+class RuleExecutor(ThreadPoolExecutor):
+    """A thread pool with a bounded queue that counts what it is doing.
+
+    Attributes:
+    max_workers (int): The number of threads.
+    max_queue (int): The number of calls that can wait for a thread before submit() refuses more.
+
+    Methods:
+    submit(fn, *args, **kwargs) -> Future: Schedule fn(*args, **kwargs), raising ExecutorFull if the queue is full.
+    run_async(fn, *args) -> Any: Coroutine running fn(*args) on the pool, waiting on the event loop for room in the queue.
+    stats() -> Dict[str, float]: Queue depth, active workers and wait time figures.
+    """
+
+    def __init__(
+        self, max_workers: int, max_queue: int, thread_name_prefix: str = "rule"
+    ):
+        super().__init__(max_workers=max_workers, thread_name_prefix=thread_name_prefix)
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        # The room each event loop waits on in run_async(), by loop
+        self._loop_slots = weakref.WeakKeyDictionary()
+        self._stats_lock = threading.Lock()
+        self._queued = 0
+        self._active = 0
+        self._completed = 0
+        self._wait_seconds_total = 0.0
+        self._wait_seconds_max = 0.0
+        self._queued_gauge = EXECUTOR_QUEUED.labels(thread_name_prefix)
+        self._active_gauge = EXECUTOR_ACTIVE.labels(thread_name_prefix)
+        self._wait_histogram = EXECUTOR_WAIT.labels(thread_name_prefix)
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """Schedule fn(*args, **kwargs) on the pool, raising ExecutorFull if the queue is full"""
+        if not self._slots.acquire(blocking=False):
+            raise ExecutorFull(
+                f"{self.max_workers} calls running and {self.max_queue} queued"
+            )
+        with self._stats_lock:
+            self._queued += 1
+        self._queued_gauge.inc()
+        try:
+            future = super().submit(self._run, time.monotonic(), fn, args, kwargs)
+        except BaseException:
+            self._dequeue()
+            raise
+        future.add_done_callback(self._on_done)
+        return future
+
+    async def run_async(self, fn: Callable, *args) -> Any:
+        """Run fn(*args) on the pool from an event loop, and await its result
+
+        While the pool is full the coroutine waits on the loop for a call to finish,
+        so the loop keeps running other work and cancelling the await, e.g. at a
+        deadline, gives up the wait. A call cancelled once it is running keeps its
+        room until its thread is free.
+
+        Args:
+          fn (callable): the blocking function
+          *args: its arguments
+
+        Returns:
+          The result of fn(*args)
+        """
+        loop = asyncio.get_running_loop()
+        slots = self._loop_slots.get(loop)
+        if slots is None:
+            slots = asyncio.Semaphore(self.max_workers + self.max_queue)
+            self._loop_slots[loop] = slots
+
+        await slots.acquire()
+        try:
+            future = self.submit(fn, *args)
+        except BaseException:
+            slots.release()
+            raise
+
+        def release(_):
+            try:
+                loop.call_soon_threadsafe(slots.release)
+            except RuntimeError:
+                pass  # the loop has closed, and its slots with it
+
+        future.add_done_callback(release)
+        return await asyncio.wrap_future(future)
+
+    def _run(self, submitted: float, fn: Callable, args, kwargs):
+        wait = time.monotonic() - submitted
+        with self._stats_lock:
+            self._queued -= 1
+            self._active += 1
+            self._wait_seconds_total += wait
+            self._wait_seconds_max = max(self._wait_seconds_max, wait)
+        self._queued_gauge.dec()
+        self._active_gauge.inc()
+        self._wait_histogram.observe(wait)
+        _current.wait = wait
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _current.wait = 0.0
+            with self._stats_lock:
+                self._active -= 1
+                self._completed += 1
+            self._active_gauge.dec()
+            self._slots.release()
+
+    def _on_done(self, future: Future):
+        # A call cancelled while still queued never reaches _run
+        if future.cancelled():
+            self._dequeue()
+
+    def _dequeue(self):
+        with self._stats_lock:
+            self._queued -= 1
+        self._queued_gauge.dec()
+        self._slots.release()
+
+    def stats(self) -> Dict[str, float]:
+        """Report what the pool is doing
+
+        Returns:
+          dict: "workers" (threads started so far), "max_workers", "active" (threads
+                running a call), "queued" (calls waiting for a thread), "max_queue",
+                "completed" (calls run since startup), and the mean and max seconds
+                those calls waited for a thread
+        """
+        with self._stats_lock:
+            completed = self._completed
+            return {
+                "workers": len(self._threads),
+                "max_workers": self.max_workers,
+                "active": self._active,
+                "queued": self._queued,
+                "max_queue": self.max_queue,
+                "completed": completed,
+                "wait_seconds_mean": (
+                    self._wait_seconds_total / completed if completed else 0.0
+                ),
+                "wait_seconds_max": self._wait_seconds_max,
+            }
+
+
+def current_wait() -> float:
+    """Seconds the call running on this thread waited for it, or 0 off the pool"""
+    return getattr(_current, "wait", 0.0)
+
+
+_executor = None
+_lock = threading.Lock()
+
+
+def get_rule_executor() -> RuleExecutor:
+    """Return the process-wide rule executor, creating it on first use"""
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = RuleExecutor(
+                max_workers=MODEL_CALL_WORKERS,
+                max_queue=MODEL_CALL_QUEUE_SIZE,
+                thread_name_prefix="model-call",
+            )
+    return _executor
+
+
+def _reset_after_fork():
+    """Forget the parent's executor in a forked child, whose threads did not survive"""
+    global _executor, _lock
+    _executor = None
+    _lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,171 @@
+# Language detection for the Doc._.language extension. Detection runs only when
+# something reads the extension, and the result is kept on the Doc, so texts nobody asks
+# about cost nothing.
+#
+# The default detector is a character n-gram model built from the sample texts in
+# helpers/language_samples. It is deterministic and needs no extra dependencies. Add a
+# language by adding a <code>.txt sample of a few hundred words. The "langdetect"
+# detector uses the langdetect package instead.
+import math
+import os
+import threading
+from collections import Counter
+from typing import Callable, Dict
+
+from config import LANGUAGE_DETECTOR
+
+SAMPLES_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "language_samples"
+)
+NGRAM_SIZES = (1, 2, 3)
+UNKNOWN_LANGUAGE = {"language": "UNKNOWN", "score": 0.0}
+
+
+def ngram_counts(text: str) -> Counter:
+    """Count the character n-grams of a text
+
+    Words are lowercased and padded with a space either side, and anything but letters
+    is ignored.
+
+    Args:
+      text (str): the text to count n-grams in
+
+    Returns:
+      Counter: n-gram -> number of occurrences
+    """
+    counts = Counter()
+    for word in "".join(c if c.isalpha() else " " for c in text.lower()).split():
+        padded = f" {word} "
+        for n in NGRAM_SIZES:
+            counts.update(padded[i : i + n] for i in range(len(padded) - n + 1))
+    counts.pop(" ", None)
+    return counts
+
+
+class NgramLanguageDetector:
+    """Detects a text's language from the character n-grams it shares with each language.
+
+    A naive Bayes model: each language's n-gram frequencies in its sample text, with
+    add-one smoothing, give the likelihood of the text's n-grams in that language.
+
+    Attributes:
+    languages (List[str]): The language codes the detector can return, in sorted order.
+
+    Methods:
+    detect(text) -> Dict[str, object]: The most likely language and its probability.
+    """
+
+    def __init__(self, samples: Dict[str, str]):
+        counts = {language: ngram_counts(text) for language, text in samples.items()}
+        vocabulary_size = len(set().union(*counts.values()))
+
+        self.languages = sorted(counts)
+        self._log_probs = {}
+        self._unseen_log_prob = {}
+        for language in self.languages:
+            total = sum(counts[language].values()) + vocabulary_size
+            self._log_probs[language] = {
+                ngram: math.log((count + 1) / total)
+                for ngram, count in counts[language].items()
+            }
+            self._unseen_log_prob[language] = math.log(1 / total)
+
+    @classmethod
+    def from_samples_folder(cls, path: str = SAMPLES_PATH) -> "NgramLanguageDetector":
+        """Build a detector from a folder of <language code>.txt sample texts"""
+        samples = {}
+        for filename in os.listdir(path):
+            language, extension = os.path.splitext(filename)
+            if extension == ".txt":
+                with open(os.path.join(path, filename), encoding="utf-8") as fh:
+                    samples[language] = fh.read()
+        return cls(samples)
+
+    def detect(self, text: str) -> Dict[str, object]:
+        """Find the most likely language of a text
+
+        Args:
+          text (str): the text to detect the language of
+
+        Returns:
+          dict: "language" (the language code, or "UNKNOWN" if the text has no letters)
+                and "score" (the probability of that language among those known)
+        """
+        counts = ngram_counts(text)
+        if not counts:
+            return dict(UNKNOWN_LANGUAGE)
+
+        log_likelihoods = {}
+        for language in self.languages:
+            log_probs = self._log_probs[language]
+            unseen = self._unseen_log_prob[language]
+            log_likelihoods[language] = sum(
+                count * log_probs.get(ngram, unseen) for ngram, count in counts.items()
+            )
+
+        # Ties go to the first language code, so the answer is always the same
+        language = max(self.languages, key=lambda code: log_likelihoods[code])
+        best = log_likelihoods[language]
+        total = sum(math.exp(value - best) for value in log_likelihoods.values())
+        return {"language": language, "score": round(1 / total, 4)}
+
+
+_ngram_detector = None
+_ngram_lock = threading.Lock()
+
+
+def ngram_language(text: str) -> Dict[str, object]:
+    """Detect a text's language with the n-gram detector, building it on first use"""
+    global _ngram_detector
+    if _ngram_detector is None:
+        with _ngram_lock:
+            if _ngram_detector is None:
+                _ngram_detector = NgramLanguageDetector.from_samples_folder()
+    return _ngram_detector.detect(text)
+
+
+def langdetect_language(text: str) -> Dict[str, object]:
+    """Detect a text's language with the langdetect package, as spacy_langdetect did
+
+    The detector is seeded, so the same text always gets the same answer.
+    """
+    from langdetect import DetectorFactory, detect_langs
+    from langdetect.lang_detect_exception import LangDetectException
+
+    DetectorFactory.seed = 0
+    try:
+        detected = detect_langs(text)[0]
+    except LangDetectException:
+        return dict(UNKNOWN_LANGUAGE)
+    return {"language": str(detected.lang), "score": float(detected.prob)}
+
+
+LANGUAGE_DETECTORS: Dict[str, Callable[[str], Dict[str, object]]] = {
+    "ngram": ngram_language,
+    "langdetect": langdetect_language,
+}
+
+
+def doc_language(doc) -> Dict[str, object]:
+    """Getter for the Doc._.language and Span._.language extensions
+
+    The language is detected on first read and cached in the Doc's user_data, so it is
+    never computed for texts nobody asks about, nor computed twice. Span results are
+    not cached.
+
+    Args:
+      doc (Doc or Span): the parsed text
+
+    Returns:
+      dict: "language" and "score", as returned by the detector named by the
+            LanguageDetector environment variable
+    """
+    detect = LANGUAGE_DETECTORS[LANGUAGE_DETECTOR]
+    user_data = getattr(doc, "user_data", None)
+    if user_data is None:
+        return detect(doc.text)
+
+    key = ("language", LANGUAGE_DETECTOR)
+    if key not in user_data:
+        user_data[key] = detect(doc.text)
+    return user_data[key]
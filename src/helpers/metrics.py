@@ -0,0 +1,203 @@
+# Prometheus metrics for the moderation service: how long each rule takes and how it
+# decides, every call to a model endpoint, verdict cache lookups, the rule executor's
+# queue, micro-batch sizes and the lexicon version in use. GET /metrics serves them in
+# the Prometheus text format.
+#
+# Under gunicorn each worker process records its own values, so the metrics run in
+# prometheus_client's multiprocess mode: gunicorn.conf.py points PROMETHEUS_MULTIPROC_DIR
+# at an empty folder before the app is imported, every process writes its values to
+# files there, and /metrics adds up the files of every worker, whichever worker serves
+# it. Without PROMETHEUS_MULTIPROC_DIR, e.g. for `python src/app.py`, the metrics of the
+# one process are served as they are.
+import functools
+import os
+import time
+from typing import Any, Callable, Optional, Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+# Seconds, from a local rule on a short title up to a model call near its read timeout
+DURATION_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+# Rule output code -> outcome label
+OUTCOMES = {0: "pass", 1: "fail", 2: "flag"}
+
+RULE_DURATION = Histogram(
+    "moderation_rule_duration_seconds",
+    "Time taken by each rule call, including any model call it makes",
+    ["rule"],
+    buckets=DURATION_BUCKETS,
+)
+RULE_CALLS = Counter(
+    "moderation_rule_calls_total",
+    "Rule results by outcome: pass, fail, flag, or error if the rule raised",
+    ["rule", "outcome"],
+)
+RULE_TIMEOUTS = Counter(
+    "moderation_rule_timeouts_total",
+    "Rules still running at the request deadline, reported for human moderation",
+    ["rule"],
+)
+MODEL_CALL_DURATION = Histogram(
+    "moderation_model_call_duration_seconds",
+    "Time taken by each call to a model scoring endpoint",
+    ["endpoint"],
+    buckets=DURATION_BUCKETS,
+)
+MODEL_CALLS = Counter(
+    "moderation_model_calls_total",
+    "Calls to each model scoring endpoint, by HTTP status, or error if none came back",
+    ["endpoint", "status"],
+)
+MODEL_SENT_BYTES = Counter(
+    "moderation_model_sent_bytes_total",
+    "Request body bytes sent to each model scoring endpoint",
+    ["endpoint"],
+)
+MODEL_RECEIVED_BYTES = Counter(
+    "moderation_model_received_bytes_total",
+    "Response body bytes received from each model scoring endpoint",
+    ["endpoint"],
+)
+VERDICT_CACHE_LOOKUPS = Counter(
+    "moderation_verdict_cache_lookups_total",
+    "Verdict cache lookups by rule and result: memory, disk or miss",
+    ["rule", "result"],
+)
+EXECUTOR_QUEUED = Gauge(
+    "moderation_executor_queued",
+    "Rule calls waiting for an executor thread",
+    ["pool"],
+    multiprocess_mode="livesum",
+)
+EXECUTOR_ACTIVE = Gauge(
+    "moderation_executor_active",
+    "Executor threads running a rule call",
+    ["pool"],
+    multiprocess_mode="livesum",
+)
+EXECUTOR_WAIT = Histogram(
+    "moderation_executor_wait_seconds",
+    "Time rule calls waited for an executor thread",
+    ["pool"],
+    buckets=DURATION_BUCKETS,
+)
+MICRO_BATCH_SIZE = Histogram(
+    "moderation_micro_batch_size",
+    "Texts sent in each call to an endpoint that scores a list of texts",
+    ["endpoint"],
+    buckets=BATCH_SIZE_BUCKETS,
+)
+LEXICON_VERSION = Gauge(
+    "moderation_lexicon_version",
+    "1 for the lexicon version each live process uses, labelled by process",
+    ["version"],
+    multiprocess_mode="liveall",
+)
+
+
+def outcome(result: Any) -> str:
+    """The outcome label of a rule output tuple"""
+    code = result[0] if isinstance(result, tuple) and result else None
+    return OUTCOMES.get(code, "other")
+
+
+@functools.lru_cache(maxsize=None)
+def instrumented(rule: str, func: Callable) -> Callable:
+    """Wrap a rule function so each call records its duration and outcome
+
+    The wrapper is built once per rule function and reused for every call.
+
+    Args:
+      rule (str): the rule name to label the metrics with
+      func (callable): the rule function, or its batch_func, which returns a list of
+                       outputs, one per text
+
+    Returns:
+      callable: func, timed
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            RULE_CALLS.labels(rule, "error").inc()
+            raise
+        finally:
+            RULE_DURATION.labels(rule).observe(time.perf_counter() - start)
+        for output in result if isinstance(result, list) else [result]:
+            RULE_CALLS.labels(rule, outcome(output)).inc()
+        return result
+
+    return wrapper
+
+
+def record_model_call(
+    endpoint: str,
+    seconds: float,
+    status: Optional[int],
+    sent: int,
+    received: int,
+):
+    """Record one call to a model scoring endpoint
+
+    Args:
+      endpoint (str): the endpoint name, or its host when it is not a named endpoint
+      seconds (float): how long the call took
+      status (int, optional): the HTTP status, or None if no response came back
+      sent (int): request body bytes
+      received (int): response body bytes
+    """
+    MODEL_CALL_DURATION.labels(endpoint).observe(seconds)
+    MODEL_CALLS.labels(endpoint, str(status) if status else "error").inc()
+    MODEL_SENT_BYTES.labels(endpoint).inc(sent)
+    MODEL_RECEIVED_BYTES.labels(endpoint).inc(received)
+
+
+def record_lexicon_version(version: str, previous: Optional[str] = None):
+    """Mark the lexicon version this process uses, and stop reporting the previous one"""
+    if previous:
+        LEXICON_VERSION.labels(previous).set(0)
+    LEXICON_VERSION.labels(version).set(1)
+
+
+def render() -> Tuple[bytes, str]:
+    """The metrics of every live worker in the Prometheus text format
+
+    Returns:
+      tuple: the response body and its content type
+    """
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
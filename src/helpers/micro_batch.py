@@ -0,0 +1,239 @@
+# Coalesces single-text scoring calls from concurrent requests into one call per batch.
+# The complaint and not-an-experience endpoints accept a list of texts, so rather than
+# each rule call posting its own one-item list, texts arriving within a few milliseconds
+# of each other are scored together and each caller gets its own prediction back.
+#
+# There is no dispatcher thread: the first caller to join a batch waits up to the
+# batch's window for others to join (or for it to fill), then makes the scoring call on
+# its own thread and hands every caller its result. A lone request therefore waits at
+# most one window, and a full batch is sent at once.
+#
+# A failed batch call does not fail the other requests in it: each caller whose texts
+# shared the batch with others sends its own texts again in an unbatched call, on its
+# own thread, so a text the endpoint cannot score, or a transient error, only fails
+# the request it belongs to.
+import logging
+import os
+import threading
+from collections import Counter
+from typing import Any, Callable, Dict, List
+
+from config import MICRO_BATCH_RULES
+from helpers.metrics import MICRO_BATCH_SIZE
+
+logger = logging.getLogger(__name__)
+
+
+class _Batch:
+    """Texts waiting to be scored together, and then their results"""
+
+    def __init__(self):
+        self.texts = []
+        self.full = threading.Event()
+        self.done = threading.Event()
+        self.results = None
+        self.error = None
+
+
+class MicroBatcher:
+    """Scores texts from concurrent callers in shared batches.
+
+    Attributes:
+    name (str): The endpoint name, for reporting.
+    max_batch_size (int): The most texts sent in one scoring call. 1 turns batching off.
+    max_wait_seconds (float): How long the first text of a batch waits for others.
+
+    Methods:
+    score(text) -> Any: Score one text, blocking until its batch has been scored.
+    score_many(texts) -> List[Any]: Score several texts together, blocking until their batches have been scored.
+    stats() -> Dict[str, Any]: Batch and text counts and a histogram of batch sizes.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        score_batch: Callable[[List[str]], List[Any]],
+        max_batch_size: int,
+        max_wait_seconds: float,
+    ):
+        """Create a batcher
+
+        Args:
+          name (str): the endpoint name
+          score_batch (callable): scores a list of texts with one call, returning one
+                                  result per text in the same order
+          max_batch_size (int): the most texts sent in one scoring call
+          max_wait_seconds (float): how long a batch stays open for more texts
+        """
+        self.name = name
+        self.score_batch = score_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait_seconds = max_wait_seconds
+        self._lock = threading.Lock()
+        self._open = None
+        self._sizes = Counter()
+
+    def score(self, text: str) -> Any:
+        """Score one text in a batch with any others arriving at the same time
+
+        Args:
+          text (str): the text to score
+
+        Returns:
+          The text's result from score_batch
+
+        Raises:
+          Exception: whatever score_batch raised for the text
+        """
+        return self.score_many([text])[0]
+
+    def score_many(self, texts: List[str]) -> List[Any]:
+        """Score several texts, e.g. a review's title and comment, in the same batch
+
+        The texts join the open batch together, so they are sent in one call unless
+        they do not fit in what is left of it. If a batch they were in fails and held
+        other callers' texts too, they are sent again in one call of their own.
+
+        Args:
+          texts (list): the texts to score
+
+        Returns:
+          list: each text's result from score_batch, in the same order
+
+        Raises:
+          Exception: whatever score_batch raised for these texts
+        """
+        if self.max_batch_size <= 1:
+            self._record(len(texts))
+            return self.score_batch(texts)
+
+        slots = []
+        led = []
+        with self._lock:
+            for text in texts:
+                batch = self._open
+                if batch is None:
+                    batch = self._open = _Batch()
+                    led.append(batch)
+                slots.append((batch, len(batch.texts)))
+                batch.texts.append(text)
+                if len(batch.texts) >= self.max_batch_size:
+                    self._open = None
+                    batch.full.set()
+
+        # Send the batches these texts opened, once full or at the end of the window
+        for batch in led:
+            batch.full.wait(self.max_wait_seconds)
+            with self._lock:
+                if self._open is batch:
+                    self._open = None
+            self._send(batch)
+
+        results = []
+        retry = []
+        for position, (batch, index) in enumerate(slots):
+            batch.done.wait()
+            if batch.error is None:
+                results.append(batch.results[index])
+                continue
+            own = sum(1 for b, _ in slots if b is batch)
+            if own == len(batch.texts):
+                # Only these texts were in the batch, so sending them again alone
+                # would repeat the same call
+                raise batch.error
+            results.append(None)
+            retry.append(position)
+
+        if retry:
+            logger.warning(
+                f"{self.name} batch call failed, sending {len(retry)} of its texts "
+                f"again on their own: {slots[retry[0]][0].error!r}"
+            )
+            self._record(len(retry))
+            retried = self.score_batch([texts[position] for position in retry])
+            for position, result in zip(retry, retried):
+                results[position] = result
+        return results
+
+    def _send(self, batch: _Batch):
+        self._record(len(batch.texts))
+        try:
+            results = self.score_batch(batch.texts)
+            if len(results) != len(batch.texts):
+                raise ValueError(
+                    f"{self.name} returned {len(results)} results for "
+                    f"{len(batch.texts)} texts"
+                )
+            batch.results = results
+        except Exception as e:
+            batch.error = e
+        finally:
+            batch.done.set()
+
+    def _record(self, size: int):
+        with self._lock:
+            self._sizes[size] += 1
+        MICRO_BATCH_SIZE.labels(self.name).observe(size)
+
+    def stats(self) -> Dict[str, Any]:
+        """Report how many scoring calls were made, for how many texts, in what sizes
+
+        Returns:
+          dict: "batches" (scoring calls made), "texts" (texts scored), "mean_size",
+                "max_batch_size", "max_wait_ms" and "sizes" (batch size -> number of
+                batches of that size)
+        """
+        with self._lock:
+            batches = sum(self._sizes.values())
+            texts = sum(size * count for size, count in self._sizes.items())
+            return {
+                "batches": batches,
+                "texts": texts,
+                "mean_size": texts / batches if batches else 0.0,
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait_seconds * 1000,
+                "sizes": dict(sorted(self._sizes.items())),
+            }
+
+
+_batchers: Dict[str, MicroBatcher] = {}
+_lock = threading.Lock()
+
+
+def get_batcher(
+    name: str, score_batch: Callable[[List[str]], List[Any]]
+) -> MicroBatcher:
+    """Return the process-wide batcher for an endpoint, creating it on first use
+
+    Args:
+      name (str): the endpoint name, a key of MICRO_BATCH_RULES
+      score_batch (callable): scores a list of texts with one call to the endpoint
+
+    Returns:
+      MicroBatcher: the endpoint's batcher, with its size and window from
+                    MICRO_BATCH_RULES
+    """
+    with _lock:
+        if name not in _batchers:
+            max_batch_size, max_wait_ms = MICRO_BATCH_RULES.get(name, (1, 0))
+            _batchers[name] = MicroBatcher(
+                name, score_batch, max_batch_size, max_wait_ms / 1000
+            )
+        return _batchers[name]
+
+
+def batching_stats() -> Dict[str, Dict[str, Any]]:
+    """Report the stats() of every batcher in this process, by endpoint name"""
+    with _lock:
+        return {name: batcher.stats() for name, batcher in _batchers.items()}
+
+
+def _reset_after_fork():
+    """Forget the parent's batchers in a forked child, as their locks may be held"""
+    global _batchers, _lock
+    _batchers = {}
+    _lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,188 @@
+# Shared HTTP client for the Azure ML scoring endpoints. All remote rules post through
+# one urllib3 PoolManager, so TCP+TLS connections are kept alive and reused per endpoint
+# host, the SSL context is built once per process, and every call has explicit
+# connect/read timeouts.
+import logging
+import os
+import ssl
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import urllib3
+from urllib3.util import Retry, Timeout
+
+from config import MODEL_CONNECT_TIMEOUT, MODEL_POOL_MAXSIZE, MODEL_READ_TIMEOUT
+from helpers.metrics import record_model_call
+
+logger = logging.getLogger(__name__)
+
+
+class ModelEndpointError(Exception):
+    """Raised when a scoring endpoint responds with an error status code"""
+
+    def __init__(self, url: str, status: int, body: bytes):
+        self.url = url
+        self.status = status
+        self.body = body
+        super().__init__(f"{url} responded with status {status}")
+
+
+def allow_self_signed_https(allowed: bool) -> bool:
+    """
+    Decide whether SSL certificate verification is skipped for the scoring endpoints.
+    Verification can be re-enabled by setting PYTHONHTTPSVERIFY.
+
+    Parameters:
+    allowed (bool): True if the scoring services may use self-signed certificates.
+
+    Returns:
+    bool: True if certificate verification should be bypassed.
+    """
+    return bool(
+        allowed
+        and not os.environ.get("PYTHONHTTPSVERIFY", "")
+        and getattr(ssl, "_create_unverified_context", None)
+    )
+
+
+class ModelClient:
+    """Pooled, keep-alive HTTP client for posting to model scoring endpoints.
+
+    Attributes:
+    pool_maxsize (int): The number of idle connections kept open per endpoint host.
+    timeout (Timeout): The connect and read timeouts applied to every call.
+
+    Methods:
+    post(url, body, headers, timeout=None, endpoint=None) -> bytes: POST a scoring request and return the response body.
+    stats() -> Dict[str, Dict[str, int]]: Pool size and connection reuse statistics per endpoint host.
+    """
+
+    def __init__(
+        self,
+        pool_maxsize: int = MODEL_POOL_MAXSIZE,
+        connect_timeout: float = MODEL_CONNECT_TIMEOUT,
+        read_timeout: float = MODEL_READ_TIMEOUT,
+        allow_self_signed: bool = True,
+    ):
+        self.pool_maxsize = pool_maxsize
+        self.timeout = Timeout(connect=connect_timeout, read=read_timeout)
+
+        # This is needed if you use self-signed certificates in your scoring service.
+        if allow_self_signed_https(allow_self_signed):
+            ssl_context = ssl._create_unverified_context()
+            cert_reqs = "CERT_NONE"
+            urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+        else:
+            ssl_context = ssl.create_default_context()
+            cert_reqs = "CERT_REQUIRED"
+
+        self._manager = urllib3.PoolManager(
+            maxsize=pool_maxsize,
+            ssl_context=ssl_context,
+            cert_reqs=cert_reqs,
+            timeout=self.timeout,
+            # Retry once when a connection cannot be made, e.g. one the endpoint
+            # closed while it sat idle in the pool. A POST that may have reached the
+            # endpoint is not sent again: a read timeout usually means the endpoint
+            # is overloaded, and resending would double its load and the wait
+            retries=Retry(total=1, connect=1, read=0, status=0, allowed_methods=None),
+        )
+
+    def post(
+        self,
+        url: str,
+        body: bytes,
+        headers: Dict[str, str],
+        timeout: Optional[Timeout] = None,
+        endpoint: Optional[str] = None,
+    ) -> bytes:
+        """POST a scoring request over a pooled connection
+
+        Args:
+          url (str): the scoring endpoint URL
+          body (bytes): the encoded request payload
+          headers (dict): request headers, including authorisation
+          timeout (Timeout, optional): overrides the client's default timeouts
+          endpoint (str, optional): the endpoint name to record the call's metrics
+                                    under. Defaults to the URL's host
+
+        Returns:
+          bytes: the raw response body
+
+        Raises:
+          ModelEndpointError: if the endpoint responds with a 4xx or 5xx status
+        """
+        start = time.perf_counter()
+        status, data = None, b""
+        try:
+            response = self._manager.request(
+                "POST",
+                url,
+                body=body,
+                headers=headers,
+                timeout=timeout or self.timeout,
+            )
+            status, data = response.status, response.data
+        finally:
+            record_model_call(
+                endpoint or urlparse(url).netloc,
+                time.perf_counter() - start,
+                status,
+                len(body),
+                len(data),
+            )
+        if status >= 400:
+            raise ModelEndpointError(url, status, data)
+
+        return data
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Report pool size and connection reuse for each endpoint host
+
+        Returns:
+          dict: keyed by "scheme://host:port", with the pool's max size, idle
+                connections, connections opened, requests made and requests that
+                reused an existing connection
+        """
+        stats = {}
+        pools = self._manager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            stats[f"{pool.scheme}://{pool.host}:{pool.port}"] = {
+                "max_size": self.pool_maxsize,
+                "idle": sum(
+                    1 for conn in list(getattr(pool.pool, "queue", [])) if conn
+                ),
+                "connections_opened": pool.num_connections,
+                "requests": pool.num_requests,
+                "reused": max(pool.num_requests - pool.num_connections, 0),
+            }
+        return stats
+
+
+_client = None
+_lock = threading.Lock()
+
+
+def get_model_client() -> ModelClient:
+    """Return the process-wide model client, creating it on first use"""
+    global _client
+    with _lock:
+        if _client is None:
+            _client = ModelClient()
+    return _client
+
+
+def _reset_after_fork():
+    """Drop the parent's pooled sockets in a forked child"""
+    global _client, _lock
+    _client = None
+    _lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
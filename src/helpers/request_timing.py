@@ -0,0 +1,178 @@
+# Opt-in timing breakdown of one /automoderator request, for finding out where the time
+# went when a review was slow. The figures show how busy the service is, so only a
+# request carrying the admin key can ask for them, with the X-Debug-Timing header or a
+# "debug-timing" field in its body. Its response then carries a "timing" entry with the
+# time taken to decode the request JSON, to parse each text with spaCy, by each rule
+# on each text (and how long the call waited for an executor thread first), and to
+# encode the response.
+#
+# Nothing is timed for requests that do not ask: no RequestTiming is created, and the
+# rules run unwrapped, so the response and the work done are exactly as before.
+import functools
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from helpers.executor import current_wait
+
+DEBUG_TIMING_HEADER = "X-Debug-Timing"
+DEBUG_TIMING_FIELD = "debug-timing"
+
+
+def wants_timing(header: Optional[str], data: Any, admin: bool) -> bool:
+    """Whether a request asked for a timing breakdown, and may have one
+
+    Args:
+      header (str, optional): the X-Debug-Timing header value
+      data: the decoded request body
+      admin (bool): whether the request carries the admin key
+
+    Returns:
+      bool: True if the request carries the admin key, and the header or the body's
+            "debug-timing" field is set to a true value
+    """
+    if not admin:
+        return False
+    if header is not None and header.strip().lower() in ("1", "true", "yes"):
+        return True
+    return isinstance(data, dict) and data.get(DEBUG_TIMING_FIELD) is True
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 3)
+
+
+class TextTiming:
+    """The timings of one text of a request: its spaCy parse and its rules.
+
+    Methods:
+    timed(rule, func) -> Callable: func, recording its wall time and executor wait under rule.
+    timed_parse(func) -> Callable: func, recording its wall time and executor wait as the parse.
+    record_rule(rule, seconds, wait, shared=1) -> None: Record one rule call.
+
+    report() -> Dict[str, Any]: The text's timings in milliseconds.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._parse = None
+        self._rules = {}
+
+    def timed(self, rule: str, func: Callable) -> Callable:
+        """Wrap a rule function so its call is timed for this text"""
+        return timed_together([self], rule, func)
+
+    def timed_parse(self, func: Callable) -> Callable:
+        """Wrap the spaCy pipeline so parsing this text is timed"""
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            wait = current_wait()
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._parse = (time.perf_counter() - start, wait)
+
+        return wrapper
+
+    def record_rule(self, rule: str, seconds: float, wait: float, shared: int = 1):
+        """Record the wall time of a rule call, its executor wait and the texts it scored"""
+        with self._lock:
+            self._rules[rule] = (seconds, wait, shared)
+
+    def report(self) -> Dict[str, Any]:
+        """The text's timings
+
+        Returns:
+          dict: "nlp_ms" and "nlp_queue_wait_ms" for the parse, when it was timed, and
+                "rules": rule name -> "wall_ms" and "queue_wait_ms", plus
+                "combined_texts" for a call that scored several texts at once. Rules
+                that were not run, or were still running, are left out
+        """
+        with self._lock:
+            report = {}
+            if self._parse is not None:
+                report["nlp_ms"] = _ms(self._parse[0])
+                report["nlp_queue_wait_ms"] = _ms(self._parse[1])
+            rules = {}
+            for rule, (seconds, wait, shared) in self._rules.items():
+                rules[rule] = {"wall_ms": _ms(seconds), "queue_wait_ms": _ms(wait)}
+                if shared > 1:
+                    rules[rule]["combined_texts"] = shared
+            report["rules"] = rules
+            return report
+
+
+def timed_together(timings: List[TextTiming], rule: str, func: Callable) -> Callable:
+    """Wrap a rule function so its call is timed for every text it scores
+
+    Used for a rule call that scores several texts at once, e.g. a review's title and
+    comment sent to a model in one request: each text is given the call's time.
+
+    Args:
+      timings (list): the TextTiming of each text the call scores
+      rule (str): the rule name
+      func (callable): the rule function or batch_func
+
+    Returns:
+      callable: func, timed
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        wait = current_wait()
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            seconds = time.perf_counter() - start
+            for timing in timings:
+                timing.record_rule(rule, seconds, wait, len(timings))
+
+    return wrapper
+
+
+class RequestTiming:
+    """The timing breakdown of one request.
+
+    Attributes:
+    fields (List[str]): The name of each text in the request, e.g. title and comment.
+    texts (List[TextTiming]): The timings of each text, in the same order.
+
+    Methods:
+    record(stage, seconds) -> None: Record the time taken by a stage of the request, e.g. decoding its JSON.
+    report() -> Dict[str, Any]: The breakdown in milliseconds, for the response.
+    """
+
+    def __init__(self, fields: List[str], started: Optional[float] = None):
+        """Start timing a request
+
+        Args:
+          fields (list): the name of each text in the request
+          started (float, optional): time.perf_counter() when the request arrived.
+                                     Defaults to now
+        """
+        self.fields = fields
+        self.texts = [TextTiming() for _ in fields]
+        self._started = time.perf_counter() if started is None else started
+        self._stages = {}
+
+    def record(self, stage: str, seconds: float):
+        """Record the time taken by a stage of the request"""
+        self._stages[stage] = seconds
+
+    def report(self) -> Dict[str, Any]:
+        """The breakdown so far
+
+        Returns:
+          dict: "<stage>_ms" for each recorded stage, each text's report() by field
+                name, and "total_ms" since the request arrived
+        """
+        report = {
+            f"{stage}_ms": _ms(seconds) for stage, seconds in self._stages.items()
+        }
+        for field, timing in zip(self.fields, self.texts):
+            report[field] = timing.report()
+        report["total_ms"] = _ms(time.perf_counter() - self._started)
+        return report
@@ -0,0 +1,46 @@
+# The request and response formats of the /automoderator routes, shared by the Flask
+# app (app.py) and the async app (asgi_app.py) so the two cannot drift apart.
+
+
+def parse_review(data):
+    """Pull the fields needed for moderation out of an /automoderator request body
+
+    Args:
+      data (dict): the decoded request JSON
+
+    Returns:
+      tuple: request id key, request id, title text, comment text and organisation name
+    """
+    request_id_key = next(iter(data))
+    request_id = data[request_id_key]
+
+    title = data["request"][0]["text"]
+    comment = data["request"][1]["text"]
+    org = data["organisation-name"]
+
+    if not isinstance(title, str) or not isinstance(comment, str):
+        raise TypeError("title and comment text must be strings")
+
+    return request_id_key, request_id, title, comment, org
+
+
+def build_response(request_id_key, request_id, title, comment):
+    """Assemble the /automoderator response from the title and comment reports"""
+    title["id"] = "title"
+    comment["id"] = "comment"
+
+    return {
+        "{}".format(request_id_key): "{}".format(request_id),
+        "response": [title, comment],
+    }
+
+
+def batch_error(item, error):
+    """Build the batch response entry for a review that could not be moderated"""
+    response = {}
+    if isinstance(item, dict) and item:
+        request_id_key = next(iter(item))
+        response["{}".format(request_id_key)] = "{}".format(item[request_id_key])
+    response["error"] = f"{type(error).__name__}: {error}"
+
+    return response
@@ -0,0 +1,150 @@
+# Works out which spaCy pipeline components the moderation rules need, from the token
+# attributes the rules and the matcher patterns read, so that the rest can be left out
+# of the pipeline. Every component left in runs on every title and comment, so an
+# unused one costs time on every request.
+import logging
+from collections import defaultdict
+from timeit import default_timer
+from typing import Dict, Iterable, List, Set
+
+logger = logging.getLogger(__name__)
+
+# Token attributes that are only set by a pipeline component. Lexical attributes (TEXT,
+# ORTH, LOWER, LIKE_URL, IS_UPPER, ...) come from the tokenizer, which always runs.
+ATTR_COMPONENTS = {
+    "TAG": "tagger",
+    "POS": "tagger",
+    "LEMMA": "tagger",
+    "DEP": "parser",
+    "HEAD": "parser",
+    "SENT_START": "parser",
+    "IS_SENT_START": "parser",
+    "ENT_TYPE": "ner",
+    "ENT_IOB": "ner",
+    "ENT_ID": "ner",
+    "ENT_KB_ID": "ner",
+}
+
+# Matcher pattern keys that are operators rather than token attributes
+_PATTERN_OPERATORS = {"OP"}
+
+
+def pattern_attrs(patterns: Dict[str, List[List[dict]]]) -> Dict[str, Set[str]]:
+    """List the token attributes read by each matcher label
+
+    Args:
+      patterns (dict): matcher label -> list of token patterns, as passed to Matcher.add
+
+    Returns:
+      dict: matcher label -> the upper case token attributes its patterns read
+    """
+    attrs = defaultdict(set)
+    for label, label_patterns in patterns.items():
+        for pattern in label_patterns:
+            for token in pattern:
+                attrs[label].update(
+                    key.upper()
+                    for key in token
+                    if key.upper() not in _PATTERN_OPERATORS
+                )
+    return dict(attrs)
+
+
+def required_components(consumers: Dict[str, Iterable[str]]) -> Dict[str, List[str]]:
+    """Work out the pipeline components needed to set the attributes consumers read
+
+    Args:
+      consumers (dict): rule or matcher label -> the token attributes it reads
+
+    Returns:
+      dict: component name -> the "consumer: attribute" reasons it is needed, for
+            each component that is needed
+    """
+    reasons = defaultdict(list)
+    for consumer, attrs in consumers.items():
+        for attr in sorted(attrs):
+            component = ATTR_COMPONENTS.get(attr)
+            if component is not None:
+                reasons[component].append(f"{consumer}: {attr}")
+    return dict(reasons)
+
+
+def time_components(nlp, texts: List[str], repeats: int = 3) -> Dict[str, float]:
+    """Measure the mean time each pipeline component takes per doc
+
+    Args:
+      nlp (spacy.Language): the loaded pipeline
+      texts (list): sample texts to time the components on
+      repeats (int): times to run the pipeline over the texts
+
+    Returns:
+      dict: component name -> mean milliseconds per doc, in pipeline order
+    """
+    totals = {name: 0.0 for name, _ in nlp.pipeline}
+    for _ in range(repeats):
+        for text in texts:
+            doc = nlp.make_doc(text)
+            for name, component in nlp.pipeline:
+                t1 = default_timer()
+                doc = component(doc)
+                totals[name] += default_timer() - t1
+
+    runs = repeats * len(texts)
+    return {name: total * 1000 / runs for name, total in totals.items()}
+
+
+def prune_pipeline(
+    nlp, required: Dict[str, List[str]], sample_texts: List[str] = None
+) -> Dict[str, object]:
+    """Remove every pipeline component that is not required
+
+    The pipeline is built when the app is imported, before logging is configured, so
+    the report is returned for log_pipeline_report() to log later.
+
+    Args:
+      nlp (spacy.Language): the loaded pipeline, changed in place
+      required (dict): the needed components, as returned by required_components()
+      sample_texts (list, optional): texts to time the components on before pruning.
+                                     No timings are taken if not given
+
+    Returns:
+      dict: the kept and removed components, the reasons each kept one is needed, and
+            the measured milliseconds per doc of each component
+    """
+    timings = time_components(nlp, sample_texts) if sample_texts else {}
+
+    removed = [name for name in nlp.pipe_names if name not in required]
+    for name in removed:
+        nlp.remove_pipe(name)
+
+    report = {
+        "kept": list(nlp.pipe_names),
+        "removed": removed,
+        "reasons": {name: required[name] for name in nlp.pipe_names},
+        "ms_per_doc": timings,
+    }
+    return report
+
+
+def log_pipeline_report(report: Dict[str, object]):
+    """Log which components were kept and removed, and the time saved per doc"""
+    for name in report["kept"]:
+        logger.info(
+            f"spaCy component {name} kept for {', '.join(report['reasons'][name])}"
+        )
+
+    timings = report["ms_per_doc"]
+    if not report["removed"]:
+        logger.info("No unused spaCy components to remove")
+    elif not timings:
+        logger.info(f"Unused spaCy components removed: {', '.join(report['removed'])}")
+    else:
+        saved = sum(timings[name] for name in report["removed"])
+        total = sum(timings.values())
+        logger.info(
+            "Unused spaCy components removed: "
+            + ", ".join(
+                f"{name} ({timings[name]:.2f} ms/doc)" for name in report["removed"]
+            )
+            + f". Saves {saved:.2f} of {total:.2f} ms per doc spent in components"
+        )
@@ -0,0 +1,216 @@
+# In-process cache of remote model verdicts. The same titles and copy-pasted comments
+# arrive constantly, so the result of each remote rule is kept for a while, keyed by a
+# hash of the exact arguments passed to the rule and the version of the endpoint that
+# produced it.
+import copy
+import functools
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+from config import VERDICT_CACHE_RULES, VERDICT_CACHE_SIZE, VERDICT_CACHE_TTL_SECONDS
+from helpers.disk_cache import disk_verdict_cache
+from helpers.endpoints import get_endpoint
+from helpers.metrics import VERDICT_CACHE_LOOKUPS
+
+_MISSING = object()
+
+
+class VerdictCache:
+    """A thread-safe LRU cache whose entries also expire after a fixed time.
+
+    Attributes:
+    max_size (int): The number of verdicts kept before the least recently used is evicted.
+    ttl_seconds (float): How long a verdict is kept before it must be fetched again.
+
+    Methods:
+    get(key, rule=None) -> Any: Return a cached verdict, or None on a miss.
+    set(key, value) -> None: Store a verdict, evicting the least recently used if full.
+    stats() -> Dict[str, Any]: Size, evictions and hit/miss counters per rule.
+    clear() -> None: Drop every cached verdict.
+    """
+
+    def __init__(
+        self,
+        max_size: int = VERDICT_CACHE_SIZE,
+        ttl_seconds: float = VERDICT_CACHE_TTL_SECONDS,
+    ):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = {}
+        self._misses = {}
+        self._evictions = 0
+
+    def get(self, key: str, rule: Optional[str] = None) -> Any:
+        """Look a verdict up, counting the hit or miss against the rule
+
+        Args:
+          key (str): the verdict key, see verdict_key()
+          rule (str, optional): the rule to attribute the hit or miss to
+
+        Returns:
+          The cached verdict, or None if it is missing or has expired
+        """
+        with self._lock:
+            expires_at, value = self._entries.get(key, (0, _MISSING))
+            if value is not _MISSING and expires_at < time.monotonic():
+                del self._entries[key]
+                value = _MISSING
+
+            if value is _MISSING:
+                self._misses[rule] = self._misses.get(rule, 0) + 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._hits[rule] = self._hits.get(rule, 0) + 1
+
+        # Hand out a copy so callers cannot change the cached lists
+        return copy.deepcopy(value)
+
+    def set(self, key: str, value: Any):
+        """Store a verdict
+
+        Args:
+          key (str): the verdict key, see verdict_key()
+          value: the rule's output
+        """
+        with self._lock:
+            self._entries[key] = (
+                time.monotonic() + self.ttl_seconds,
+                copy.deepcopy(value),
+            )
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Report the cache's size, evictions and hit/miss counters per rule"""
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "evictions": self._evictions,
+                "hits": dict(self._hits),
+                "misses": dict(self._misses),
+            }
+
+    def clear(self):
+        """Drop every cached verdict"""
+        with self._lock:
+            self._entries.clear()
+
+
+verdict_cache = VerdictCache()
+
+
+def verdict_key(rule: str, version: str, args: tuple, kwargs: dict) -> str:
+    """Hash a rule's arguments, together with the endpoint version, into a cache key
+
+    Args:
+      rule (str): the rule name
+      version (str): the version tag of the endpoint the rule calls
+      args (tuple): the rule's positional arguments
+      kwargs (dict): the rule's keyword arguments
+
+    Returns:
+      str: the hex digest identifying this verdict
+    """
+    payload = json.dumps(
+        [rule, version, list(args), sorted(kwargs.items())],
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def cached_verdict(endpoint_name: str):
+    """A decorator that serves a remote rule's verdict from the verdict cache
+
+    The rule's output is cached under its exact arguments and the version of the
+    named endpoint, unless caching is switched off for that endpoint in
+    VERDICT_CACHE_RULES. Misses in memory fall back to the disk verdict cache when
+    one is configured. Exceptions are never cached.
+
+    Args:
+      endpoint_name (str): the endpoint registry name of the model the rule calls
+    """
+
+    def decorator(func: Callable):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not VERDICT_CACHE_RULES.get(endpoint_name, False):
+                return func(*args, **kwargs)
+
+            version = get_endpoint(endpoint_name).version
+            key = verdict_key(func.__name__, version, args, kwargs)
+            result = _lookup(key, func.__name__)
+            if result is None:
+                result = func(*args, **kwargs)
+                _store(key, func.__name__, version, result)
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def cached_verdicts(
+    endpoint_name: str,
+    rule: str,
+    calls: List[dict],
+    compute: Callable[[List[dict]], List[Any]],
+) -> List[Any]:
+    """Serve several calls of a remote rule from the verdict cache, computing the misses together
+
+    The batch counterpart of cached_verdict: entries are shared with it, so a verdict
+    cached by either is found by both.
+
+    Args:
+      endpoint_name (str): the endpoint registry name of the model the rule calls
+      rule (str): the name of the rule function decorated with cached_verdict
+      calls (list): the keyword arguments of each call of the rule
+      compute (callable): works out the verdicts for a list of those keyword
+                          arguments that were not cached, in one go
+
+    Returns:
+      list: the verdict for each call, in the same order
+    """
+    if not VERDICT_CACHE_RULES.get(endpoint_name, False):
+        return compute(calls)
+
+    version = get_endpoint(endpoint_name).version
+    keys = [verdict_key(rule, version, (), kwargs) for kwargs in calls]
+    results = [_lookup(key, rule) for key in keys]
+
+    missing = [i for i, result in enumerate(results) if result is None]
+    if missing:
+        for i, result in zip(missing, compute([calls[i] for i in missing])):
+            _store(keys[i], rule, version, result)
+            results[i] = result
+    return results
+
+
+def _lookup(key: str, rule: str) -> Any:
+    """Find a verdict in memory, or on disk when a disk cache is configured"""
+    result = verdict_cache.get(key, rule=rule)
+    found = "memory"
+    if result is None and disk_verdict_cache is not None:
+        result = disk_verdict_cache.get(key)
+        found = "disk"
+        if result is not None:
+            verdict_cache.set(key, result)
+    VERDICT_CACHE_LOOKUPS.labels(rule, found if result is not None else "miss").inc()
+    return result
+
+
+def _store(key: str, rule: str, version: str, result: Any):
+    """Keep a newly computed verdict in memory, and on disk when configured"""
+    if disk_verdict_cache is not None:
+        disk_verdict_cache.set(key, rule, version, result)
+    verdict_cache.set(key, result)
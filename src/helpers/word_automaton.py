@@ -0,0 +1,147 @@
+# Aho-Corasick automaton for finding every occurrence of a fixed list of words in a
+# single pass over a text, however long the list is. Used by the profanity rules in
+# place of one regex search per list entry.
+import re
+from collections import deque
+from typing import Iterable, Iterator, List, Set, Tuple
+
+# Characters that give a list entry a special meaning when it is used as a regex
+_REGEX_SPECIAL = set("()[]{}?*+|^$\\.")
+
+
+def is_word_char(char: str) -> bool:
+    """True if char matches the regex \\w class"""
+    return char.isalnum() or char == "_"
+
+
+def is_word_boundary(text: str, index: int) -> bool:
+    """True if the regex \\b assertion holds at position index of text"""
+    before = index > 0 and is_word_char(text[index - 1])
+    after = index < len(text) and is_word_char(text[index])
+    return before != after
+
+
+class WordAutomaton:
+    """Finds all occurrences of a set of words in one pass over a text.
+
+    Attributes:
+    words (List[str]): The distinct words the automaton was built from.
+
+    Methods:
+    iter_matches(text) -> Iterator[Tuple[int, int, str]]: Every (start, end, word) occurrence, including overlapping ones.
+    find_words(text) -> Set[str]: The words that occur in text between word boundaries, as a regex \\bword\\b search would find them.
+    """
+
+    def __init__(self, words: Iterable[str]):
+        self.words = list(dict.fromkeys(word for word in words if word))
+
+        # goto[state] maps a character to the next state, fail[state] is the longest
+        # proper suffix of state that is also a prefix in the trie, and out[state]
+        # lists the indexes of the words ending at state
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+
+        for index, word in enumerate(self.words):
+            state = 0
+            for char in word:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = next_state
+            self._out[state].append(index)
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                if self._fail[next_state] == next_state:
+                    self._fail[next_state] = 0
+                self._out[next_state] = (
+                    self._out[next_state] + self._out[self._fail[next_state]]
+                )
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int, str]]:
+        """Yield every occurrence of every word in text
+
+        Args:
+          text (str): the text to search
+
+        Returns:
+          Iterator of (start, end, word) tuples, in order of end position
+        """
+        goto, fail, out, words = self._goto, self._fail, self._out, self.words
+        state = 0
+        for end, char in enumerate(text, 1):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for index in out[state]:
+                word = words[index]
+                yield end - len(word), end, word
+
+    def find_words(self, text: str) -> Set[str]:
+        """Find the words that occur in text with a word boundary at either end
+
+        Args:
+          text (str): the text to search
+
+        Returns:
+          set: the words found, as would be found by searching for \\bword\\b
+        """
+        return {
+            word
+            for start, end, word in self.iter_matches(text)
+            if is_word_boundary(text, start) and is_word_boundary(text, end)
+        }
+
+
+class WordListMatcher:
+    """Matches a word list against text with \\bword\\b semantics in a single pass.
+
+    Plain entries go into a WordAutomaton. Entries containing regex syntax keep their
+    regex meaning and are searched with patterns compiled once, up front.
+
+    Methods:
+    find_words(text) -> List[str]: The list entries found in text.
+    """
+
+    def __init__(self, words: Iterable[str]):
+        # Keep the first spelling of each entry to report, keyed by the stripped form
+        # that is searched for
+        self._reported = {}
+        patterns = []
+        for word in words:
+            key = word.strip()
+            if not key or key in self._reported:
+                continue
+            self._reported[key] = word
+            if _REGEX_SPECIAL.intersection(key):
+                patterns.append((key, re.compile(r"\b" + key + r"\b")))
+
+        self._patterns = patterns
+        self._automaton = WordAutomaton(
+            key for key in self._reported if not _REGEX_SPECIAL.intersection(key)
+        )
+
+    def find_words(self, text: str) -> List[str]:
+        """Find the list entries that occur in text between word boundaries
+
+        Args:
+          text (str): the text to search
+
+        Returns:
+          list: the matching entries, as given to the matcher
+        """
+        found = self._automaton.find_words(text)
+        found.update(key for key, pattern in self._patterns if pattern.search(text))
+        return [self._reported[key] for key in found]
@@ -0,0 +1,358 @@
+# Compiled word lists used by the rules. The csv lists in the data folder are compiled
+# into frozensets (for O(1) lookups) and automata (for single-pass phrase matching),
+# and saved as one versioned binary artifact so workers load them in one step at
+# startup instead of re-parsing every csv.
+#
+# Build the artifact (from the src folder) whenever the csv lists change:
+#   python -m lexicon build
+# If the artifact is missing, was built by an older format, or is older than any csv
+# list, the lists are compiled from the csv files instead. The lexicon is loaded on the
+# first get_lexicon() call, which the apps make at startup, rather than on import.
+#
+# While the service runs, a watcher thread recompiles the lists in the background when
+# a csv changes and swaps the new lexicon in with a single assignment. Each request
+# takes one snapshot with get_lexicon() and uses it for every rule, so a reload never
+# changes the lists part way through a review.
+import argparse
+import hashlib
+import logging
+import os
+import pickle
+import threading
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, List, Optional
+
+from config import LEXICON_WATCH_SECONDS, data_path
+from helpers.filehelper import read_csv_list
+from helpers.metrics import record_lexicon_version
+from helpers.word_automaton import WordListMatcher
+
+logger = logging.getLogger(__name__)
+
+LEXICON_FORMAT_VERSION = 1  # bump when the Lexicon fields or their compilation change
+LEXICON_ARTIFACT = os.path.join(data_path, "lexicon.pkl")
+
+# Lexicon field -> csv list it is compiled from
+LEXICON_SOURCES = {
+    "acronyms": "acronym-list.csv",
+    "profanity": "profanity-list-hard.csv",
+    "profanity_soft": "profanity-list-soft.csv",
+    "descriptions_adj": "descriptions-adjectives.csv",
+    "descriptions_nouns": "descriptions-nouns.csv",
+    "non_names": "non-names.csv",
+    "def_names": "def-names.csv",
+}
+
+
+@dataclass(frozen=True)
+class Lexicon:
+    """The compiled word lists, ready for the rules to use.
+
+    Attributes:
+    version (str): A hash of the csv lists the lexicon was compiled from.
+    acronyms (FrozenSet[str]): Uppercase words allowed by the all caps rule.
+    profanity (FrozenSet[str]): Lowercase hard profanity, matched against tokens.
+    profanity_soft (WordListMatcher): Soft profanity, matched against text with word boundaries.
+    descriptions_adj (FrozenSet[str]): Adjectives not allowed before a descriptions noun.
+    descriptions_nouns (FrozenSet[str]): Nouns not allowed after a descriptions adjective.
+    non_names (FrozenSet[str]): Lowercase words that are never reported as names.
+    def_names (FrozenSet[str]): Lowercase words that are always reported as names.
+    """
+
+    version: str
+    acronyms: FrozenSet[str]
+    profanity: FrozenSet[str]
+    profanity_soft: WordListMatcher
+    descriptions_adj: FrozenSet[str]
+    descriptions_nouns: FrozenSet[str]
+    non_names: FrozenSet[str]
+    def_names: FrozenSet[str]
+
+    def __str__(self):
+        # Keeps verdict cache keys for rules that take the lexicon short and versioned
+        return f"Lexicon({self.version})"
+
+
+def read_sources(path: str = data_path) -> Dict[str, List[str]]:
+    """Read every csv list the lexicon is compiled from
+
+    Args:
+      path (str): the data folder
+
+    Returns:
+      dict: the raw list for each Lexicon field
+    """
+    return {
+        field: read_csv_list(os.path.join(path, filename))
+        for field, filename in LEXICON_SOURCES.items()
+    }
+
+
+def source_fingerprint(path: str = data_path) -> Dict[str, List[int]]:
+    """Modification time and size of each csv list, to tell if an artifact is stale"""
+    fingerprint = {}
+    for filename in LEXICON_SOURCES.values():
+        stat = os.stat(os.path.join(path, filename))
+        fingerprint[filename] = [stat.st_mtime_ns, stat.st_size]
+    return fingerprint
+
+
+def compile_lexicon(path: str = data_path) -> Lexicon:
+    """Compile the csv lists in the data folder into a Lexicon
+
+    Args:
+      path (str): the data folder
+
+    Returns:
+      Lexicon: the compiled lists
+    """
+    sources = read_sources(path)
+
+    digest = hashlib.sha256(str(LEXICON_FORMAT_VERSION).encode())
+    for field in sorted(sources):
+        digest.update(field.encode())
+        digest.update("\n".join(sources[field]).encode("utf-8"))
+
+    return Lexicon(
+        version=digest.hexdigest()[:12],
+        acronyms=frozenset(sources["acronyms"]),
+        profanity=frozenset(word.lower() for word in sources["profanity"]),
+        profanity_soft=WordListMatcher(
+            word.lower() for word in sources["profanity_soft"]
+        ),
+        descriptions_adj=frozenset(sources["descriptions_adj"]),
+        descriptions_nouns=frozenset(sources["descriptions_nouns"]),
+        non_names=frozenset(word.lower() for word in sources["non_names"]),
+        def_names=frozenset(word.lower() for word in sources["def_names"]),
+    )
+
+
+def save_lexicon(
+    lexicon: Lexicon, artifact: str = LEXICON_ARTIFACT, path: str = data_path
+):
+    """Write a compiled lexicon to its binary artifact
+
+    Args:
+      lexicon (Lexicon): the compiled lists
+      artifact (str): the file to write
+      path (str): the data folder the lexicon was compiled from
+    """
+    payload = {
+        "format": LEXICON_FORMAT_VERSION,
+        "fingerprint": source_fingerprint(path),
+        "lexicon": lexicon,
+    }
+    # Write then rename, so a worker starting up never reads a half-written artifact
+    tmp = f"{artifact}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as fh:
+        pickle.dump(payload, fh, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, artifact)
+
+
+def load_lexicon(
+    artifact: str = LEXICON_ARTIFACT, path: str = data_path
+) -> Optional[Lexicon]:
+    """Read a lexicon from its artifact, if the artifact is current
+
+    Args:
+      artifact (str): the file to read
+      path (str): the data folder the lexicon should match
+
+    Returns:
+      Lexicon, or None if the artifact is missing, from another format version, or
+      older than the csv lists
+    """
+    if not os.path.exists(artifact):
+        return None
+
+    try:
+        with open(artifact, "rb") as fh:
+            payload = pickle.load(fh)
+    except (pickle.UnpicklingError, EOFError, AttributeError, ImportError) as e:
+        logger.warning(f"Ignoring {artifact}: it could not be read ({e})")
+        return None
+
+    if payload.get("format") != LEXICON_FORMAT_VERSION:
+        logger.info(f"Ignoring {artifact}: built by another lexicon format version")
+        return None
+    if payload.get("fingerprint") != source_fingerprint(path):
+        logger.info(
+            f"Ignoring {artifact}: the csv lists have changed since it was built"
+        )
+        return None
+
+    return payload["lexicon"]
+
+
+def build_lexicon(path: str = data_path) -> Lexicon:
+    """Load the lexicon artifact, falling back to compiling the csv lists
+
+    Args:
+      path (str): the data folder
+
+    Returns:
+      Lexicon: the compiled lists
+    """
+    lexicon = load_lexicon(path=path)
+    if lexicon is None:
+        lexicon = compile_lexicon(path)
+    logger.info(f"Lexicon {lexicon.version} loaded")
+    return lexicon
+
+
+_fingerprint = None
+_lexicon = None
+_reload_lock = threading.Lock()
+
+
+def get_lexicon() -> Lexicon:
+    """Return the compiled word lists currently in use, loading them on first use
+
+    Take this once per request and pass it to the rules: a reload swaps in a new
+    lexicon but never modifies one that has been handed out.
+
+    Raises:
+      FileNotFoundError: if a csv list is missing and there is no usable artifact
+    """
+    global _fingerprint, _lexicon
+    lexicon = _lexicon
+    if lexicon is None:
+        with _reload_lock:
+            if _lexicon is None:
+                _fingerprint = source_fingerprint()
+                _lexicon = build_lexicon()
+                record_lexicon_version(_lexicon.version)
+            lexicon = _lexicon
+    return lexicon
+
+
+def reload_lexicon(path: str = data_path, force: bool = False) -> bool:
+    """Recompile the csv lists if they have changed and swap the new lexicon in
+
+    Compiling happens in the calling thread without holding up requests, which keep
+    using the current lexicon until the swap.
+
+    Args:
+      path (str): the data folder
+      force (bool): recompile even if no csv has changed size or modification time
+
+    Returns:
+      bool: True if a lexicon with a new version was swapped in
+    """
+    global _fingerprint, _lexicon
+    get_lexicon()
+    with _reload_lock:
+        try:
+            fingerprint = source_fingerprint(path)
+            if fingerprint == _fingerprint and not force:
+                return False
+            lexicon = compile_lexicon(path)
+            # A csv still being written changes again while it is read; wait for the
+            # next check rather than swap in a half-written list
+            if source_fingerprint(path) != fingerprint:
+                logger.info("Csv lists changed while compiling, retrying later")
+                return False
+        except Exception as e:
+            logger.error(f"Lexicon reload failed, keeping {_lexicon.version}: {e}")
+            return False
+
+        _fingerprint = fingerprint
+        if lexicon.version == _lexicon.version:
+            return False
+
+        previous, _lexicon = _lexicon.version, lexicon
+        record_lexicon_version(lexicon.version, previous)
+        logger.info(f"Lexicon {previous} replaced by {lexicon.version}")
+        return True
+
+
+class LexiconWatcher:
+    """A daemon thread that reloads the lexicon whenever a csv list changes.
+
+    Attributes:
+    interval (float): Seconds between checks of the csv lists.
+
+    Methods:
+    start() -> None: Start checking in the background.
+    stop() -> None: Stop checking and wait for the thread to finish.
+    """
+
+    def __init__(self, interval: float = LEXICON_WATCH_SECONDS):
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="lexicon-watcher", daemon=True
+        )
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            reload_lexicon()
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+
+_watcher = None
+_watcher_lock = threading.Lock()
+
+
+def start_lexicon_watcher(
+    interval: float = LEXICON_WATCH_SECONDS,
+) -> Optional[LexiconWatcher]:
+    """Start this process's lexicon watcher, if it is not running already
+
+    Threads do not survive a fork, so pre-forking servers must call this in each
+    worker after the fork.
+
+    Args:
+      interval (float): seconds between checks. 0 or less disables the watcher
+
+    Returns:
+      LexiconWatcher, or None if watching is disabled
+    """
+    global _watcher
+    if interval <= 0:
+        return None
+    with _watcher_lock:
+        if _watcher is None:
+            _watcher = LexiconWatcher(interval)
+            _watcher.start()
+        return _watcher
+
+
+def _reset_after_fork():
+    """Forget the parent's watcher and locks in a forked child"""
+    global _watcher, _watcher_lock, _reload_lock
+    _watcher = None
+    _watcher_lock = threading.Lock()
+    _reload_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def main(argv=None):
+    """Compile the csv word lists into the lexicon artifact"""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="compile and save the lexicon artifact")
+    build.add_argument("--output", default=LEXICON_ARTIFACT, help="artifact file")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        lexicon = compile_lexicon()
+        save_lexicon(lexicon, args.output)
+        print(f"Saved lexicon {lexicon.version} to {args.output}")
+
+
+if __name__ == "__main__":
+    # Run main from the importable module, so the artifact pickles lexicon.Lexicon
+    # rather than __main__.Lexicon
+    from lexicon import main as lexicon_main
+
+    lexicon_main()
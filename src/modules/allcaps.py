@@ -1,17 +1,21 @@
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
-from config import ALL_CAPS_THRESHOLD, acronyms
+from config import ALL_CAPS_THRESHOLD
 from helpers.common_functions import log_exceptions
+from lexicon import Lexicon, get_lexicon
 
 
 @log_exceptions
-def all_caps_rule(body) -> Tuple[int, int, List[str]]:
+def all_caps_rule(
+    body, lexicon: Optional[Lexicon] = None
+) -> Tuple[int, int, List[str]]:
     """Comments must not be in caps lock. Caps lock is defined as more than three words in all caps,
     excluding uppercase words in an acronyms list.
     This function is to check if the review contains any allcaps words.
 
     Args:
         body (spaCy Doc) : spacy doc object for the comment
+        lexicon (Lexicon, optional) : the word lists to use, defaults to the current lexicon
 
     Returns:
         0/1/2 (int) : for pass/fail/human moderation
@@ -21,6 +25,7 @@ def all_caps_rule(body) -> Tuple[int, int, List[str]]:
 
     # Uppercase words longer than 1 character and not in acronyms list are counted as all caps.
     words = [word.text for word in body]
+    acronyms = (lexicon or get_lexicon()).acronyms
 
     allcaps_words = []
     for word in words:
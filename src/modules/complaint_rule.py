@@ -1,34 +1,20 @@
 import json
-import os
-import ssl
-import urllib.request
 from typing import List, Tuple
 
-from helpers.common_functions import clean_api_key, correct_url_format, log_exceptions
-
-
-def allow_self_signed_https(allowed):
-    """
-    Configures the SSL context to allow or disallow self-signed HTTPS certificates based on the provided argument.
-
-    Parameters:
-    allowed (bool): If True, bypasses SSL certificate verification.
-    """
-    if (
-        allowed
-        and not os.environ.get("PYTHONHTTPSVERIFY", "")
-        and getattr(ssl, "_create_unverified_context", None)
-    ):
-        ssl._create_default_https_context = ssl._create_unverified_context
+from helpers.common_functions import log_exceptions
+from helpers.endpoints import get_endpoint
+from helpers.micro_batch import get_batcher
+from helpers.model_client import get_model_client
+from helpers.verdict_cache import cached_verdict, cached_verdicts
 
 
 @log_exceptions
+@cached_verdict("complaint")
 def complaint_rule(submission_words: str) -> Tuple[int, List[str]]:
     """
     Determines if the provided text is a complaint or not.
-    This function prepares the data to be sent in the request,
-    sets the API key and headers, makes an HTTP request with the prepared data,
-    and deciphers the result upon receiving a response.
+    The text is scored by score_complaints, in a batch with any texts from other
+    requests arriving at the same time, and the result is deciphered.
 
     Args:
         submission_words (str) : lowercase text to be analyzed.
@@ -37,41 +23,70 @@ def complaint_rule(submission_words: str) -> Tuple[int, List[str]]:
         tuple of length 2: first value is the score (0 or 1),
         second value is the prediction ("No_Complaint" or "Complaint").
     """
-    allow_self_signed_https(
-        True
-    )  # this line is needed if you use self-signed certificate in your scoring service.
-
     assert isinstance(submission_words, str)
 
-    data = {"data": [submission_words]}
+    return complaint_verdict(
+        get_batcher("complaint", score_complaints).score(submission_words)
+    )
 
-    body = str.encode(json.dumps(data))
 
-    url = os.getenv("ComplaintsURL")
-    url = correct_url_format(url)
-    api_key = os.getenv("ComplaintsKey")
-    api_key = clean_api_key(api_key)
+@log_exceptions
+def complaint_rule_batch(submission_words: List[str]) -> List[Tuple[int, List[str]]]:
+    """
+    complaint_rule for several texts, e.g. the title and comment of a review.
+    Texts whose verdict is not cached are scored together in one call.
+
+    Args:
+        submission_words (list) : lowercase texts to be analyzed.
 
-    if not api_key:
-        raise Exception("A key should be provided to invoke the endpoint")
+    Returns:
+        list: the complaint_rule result for each text, in the same order.
+    """
+    assert all(isinstance(text, str) for text in submission_words)
 
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": ("Bearer " + api_key),
-    }
+    def score(calls):
+        predictions = get_batcher("complaint", score_complaints).score_many(
+            [call["submission_words"] for call in calls]
+        )
+        return [complaint_verdict(prediction) for prediction in predictions]
 
-    req = urllib.request.Request(url, body, headers)
+    return cached_verdicts(
+        "complaint",
+        "complaint_rule",
+        [{"submission_words": text} for text in submission_words],
+        score,
+    )
 
-    response = urllib.request.urlopen(req)
 
-    result = response.read()
-    interim_result = result.decode()
-    result_final = int(interim_result[1])
+def complaint_verdict(prediction: int) -> Tuple[int, List[str]]:
+    """Turn the complaint model's prediction into the rule's score and label"""
     score = 0
-    prediction = "No_Complaint"
+    label = "No_Complaint"
 
-    if result_final == 1:
+    if prediction == 1:
         score = 1
-        prediction = "Complaint"
+        label = "Complaint"
+
+    return score, [label]
+
+
+def score_complaints(texts: List[str]) -> List[int]:
+    """Score several texts with one call to the complaint model
+
+    Args:
+        texts (list) : lowercase texts to be analyzed.
+
+    Returns:
+        list: the model's prediction for each text, 1 for a complaint or 0 if not.
+    """
+    data = {"data": texts}
+
+    body = str.encode(json.dumps(data))
+
+    endpoint = get_endpoint("complaint")
 
-    return score, [prediction]
+    result = get_model_client().post(
+        endpoint.url, body, endpoint.headers, endpoint=endpoint.name
+    )
+    # The model responds with a JSON list of predictions, e.g. [1] or [0, 1]
+    return [int(prediction) for prediction in json.loads(result.decode())]
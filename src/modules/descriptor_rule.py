@@ -1,22 +1,29 @@
 import json
-import os
-import urllib.request
-from typing import List, Tuple
+import logging
+from typing import List, Optional, Tuple
 
-from config import descriptions_adj, descriptions_nouns
-from helpers.common_functions import clean_api_key, correct_url_format, log_exceptions
+from helpers.common_functions import log_exceptions
+from helpers.endpoints import get_endpoint
+from helpers.model_client import ModelEndpointError, get_model_client
+from helpers.verdict_cache import cached_verdict
+from lexicon import Lexicon, get_lexicon
+
+logger = logging.getLogger(__name__)
 
 
 @log_exceptions
+@cached_verdict("descriptor")
 def descriptor_rule(
     submission_words: str,
-    desc_adjectives_to_use=descriptions_adj,
-    descriptions_nouns=descriptions_nouns,
+    desc_adjectives_to_use=None,
+    descriptions_nouns=None,
+    lexicon: Optional[Lexicon] = None,
 ) -> Tuple[int, List[str]]:
     """Check string for descriptors in the form of Adjective -> Noun
     The function then checks if the Adjectives -> Nouns identified are in a list of preselected terms.
     Args:
         submission_words : string to check - it has more args than this, describe them all.
+        lexicon (Lexicon, optional) : the word lists to use, defaults to the current lexicon
       Returns:
         Tuple[int, List[str]]: A tuple containing two elements:
             - An integer label (0 or 1) where 1 indicates that at least one valid descriptor was found.
@@ -26,36 +33,29 @@ def descriptor_rule(
     if not isinstance(submission_words, str):
         raise ValueError("expected a string")
 
+    lexicon = lexicon or get_lexicon()
+    if desc_adjectives_to_use is None:
+        desc_adjectives_to_use = lexicon.descriptions_adj
+    if descriptions_nouns is None:
+        descriptions_nouns = lexicon.descriptions_nouns
+
     data = {"data": str(submission_words)}
 
     body = str.encode(json.dumps(data))
 
-    url = os.getenv("DescriptionsURL")
-    url = correct_url_format(url)
-    api_key = os.getenv("DescriptionsKey")
-    api_key = clean_api_key(api_key)
-
-    if not api_key:
-        raise Exception("A key should be provided to invoke the endpoint")
-
-    # The azureml-model-deployment header will force the request to go to a specific deployment.
-    # Remove this header to have the request observe the endpoint traffic rules
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": ("Bearer " + api_key),
-    }
-
-    req = urllib.request.Request(url, body, headers)
+    endpoint = get_endpoint("descriptor")
 
     try:
-        response = urllib.request.urlopen(req)
-        result = response.read()
+        result = get_model_client().post(
+            endpoint.url, body, endpoint.headers, endpoint=endpoint.name
+        )
         result = json.loads(result)
         predicted_classes = json.loads(result)
 
-    except urllib.error.HTTPError as error:
-        print(f"failed with str {str(error.code)}")
-        print(error.info())
+    except ModelEndpointError as error:
+        logger.error(
+            f"Descriptor endpoint failed with status {error.status}: {error.body!r}"
+        )
         raise
 
     result_label = 0
@@ -1,10 +1,11 @@
 import re
 import string
-from typing import List
+from typing import List, Optional
 
 from fuzzywuzzy import fuzz
 
-from config import PARTIAL_RATIO_THRESHOLD, def_names, non_names
+from config import PARTIAL_RATIO_THRESHOLD
+from lexicon import Lexicon, get_lexicon
 
 
 def remove_punctuation(input_string: str) -> str:
@@ -12,7 +13,7 @@ def remove_punctuation(input_string: str) -> str:
     return re.sub(r"[^\w\s]", "", input_string)
 
 
-def remove_non_names(result: List[str]) -> List[str]:
+def remove_non_names(result: List[str], lexicon: Optional[Lexicon] = None) -> List[str]:
     """
     Removes common false positives from a list of names identified by NLP model.
     For example, our model will flag 'lord' in 'thank the lord I'm OK'; but
@@ -20,26 +21,32 @@ def remove_non_names(result: List[str]) -> List[str]:
 
     Args:
         result: a lowercase list of suspected names.
+        lexicon (Lexicon, optional) : the word lists to use, defaults to the current lexicon
     Returns:
          a list: a list of names with non-names removed
     """
+    non_names = (lexicon or get_lexicon()).non_names
     filtered_names = [name for name in result if name not in non_names]
 
     return filtered_names
 
 
-def definite_names(submission_words: str) -> List[str]:
+def definite_names(
+    submission_words: str, lexicon: Optional[Lexicon] = None
+) -> List[str]:
     """
     Add names to the result that are listed as definite names
 
     Args:
         submission_words : a string to check for names
+        lexicon (Lexicon, optional) : the word lists to use, defaults to the current lexicon
     Returns:
         a list: a list of names found
     """
     # remove all punctuation and make lowercase
     submission_no_punc = remove_punctuation(submission_words).lower()
 
+    def_names = (lexicon or get_lexicon()).def_names
     def_names_result = [n for n in submission_no_punc.split(" ") if n in def_names]
 
     return def_names_result
@@ -1,13 +1,13 @@
 import json
 import logging
-import os
-import urllib
-from typing import List, Tuple
-
-import requests
+from typing import List, Optional, Tuple
 
 from config import MAX_TITLE_CHARS
-from helpers.common_functions import clean_api_key, correct_url_format, log_exceptions
+from helpers.common_functions import log_exceptions
+from helpers.endpoints import get_endpoint
+from helpers.model_client import get_model_client
+from helpers.verdict_cache import cached_verdict
+from lexicon import Lexicon
 from modules.names_helpers import (
     allow_name_signoff,
     allow_org_name,
@@ -17,33 +17,27 @@ from modules.names_helpers import (
 
 
 @log_exceptions
-def names_rule(submission_words: str, org_name: str) -> Tuple[int, List[str]]:
+@cached_verdict("names")
+def names_rule(
+    submission_words: str, org_name: str, lexicon: Optional[Lexicon] = None
+) -> Tuple[int, List[str]]:
     """Check a string for names
 
     Args:
         submission_words : a string to check for names
         org_name: the organisation being reviewed
+        lexicon: the word lists to use, defaults to the current lexicon
     Returns:
         tuple of length 2: first value is the score,
         second  value is a list of names
     """
 
-    url = os.getenv("NamesURL")
-    url = correct_url_format(url)
-    api_key = os.getenv("NamesKey")
-    api_key = clean_api_key(api_key)
-
     body = str.encode(json.dumps({"data": submission_words}))
+    endpoint = get_endpoint("names")
 
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": ("Bearer " + api_key),
-        "azureml-model-deployment": "names-module",
-    }
-
-    req = urllib.request.Request(url, body, headers)
-    response = urllib.request.urlopen(req)
-    result = response.read()
+    result = get_model_client().post(
+        endpoint.url, body, endpoint.headers, endpoint=endpoint.name
+    )
     result = json.loads(result)
     predicted_classes = json.loads(result)
 
@@ -55,10 +49,10 @@ def names_rule(submission_words: str, org_name: str) -> Tuple[int, List[str]]:
     ]
 
     # Remove names from the result that are in non_names
-    filtered_names = remove_non_names(result)
+    filtered_names = remove_non_names(result, lexicon)
 
     # Add any names from submission_words that are in def_names
-    def_names_result = definite_names(submission_words)
+    def_names_result = definite_names(submission_words, lexicon)
     full_result = list(set(def_names_result + filtered_names))
 
     # remove org names
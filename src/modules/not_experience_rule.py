@@ -1,13 +1,16 @@
 import json
-import os
-import urllib
 from typing import List, Tuple
 
 from config import MAX_TITLE_CHARS
-from helpers.common_functions import clean_api_key, correct_url_format, log_exceptions
+from helpers.common_functions import log_exceptions
+from helpers.endpoints import get_endpoint
+from helpers.micro_batch import get_batcher
+from helpers.model_client import get_model_client
+from helpers.verdict_cache import cached_verdict, cached_verdicts
 
 
 @log_exceptions
+@cached_verdict("not_experience")
 def not_experience_rule(submission_words: str) -> Tuple[int, List[str]]:
     """Function to check comment and title for content that does not describe an experience.
 
@@ -17,43 +20,85 @@ def not_experience_rule(submission_words: str) -> Tuple[int, List[str]]:
         a tuple of length 2: first value is the score (0 if an experience 1 if not),
         second value is the prediction ("Experience" or "Not_an_experience")
     """
-    score = 0
-    prediction = "Experience"
     # If submission is a title then skip model and mark as 'Experience'
     if len(submission_words) <= MAX_TITLE_CHARS:
-        return (score, [prediction])
+        return not_experience_verdict(0)
 
-    # This is extracting the text from the submitted json
-    data = {"data": [submission_words]}
+    return not_experience_verdict(
+        get_batcher("not_experience", score_not_experiences).score(submission_words)
+    )
+
+
+@log_exceptions
+def not_experience_rule_batch(
+    submission_words: List[str],
+) -> List[Tuple[int, List[str]]]:
+    """not_experience_rule for several texts, e.g. the title and comment of a review.
+
+    Titles are marked as 'Experience' without the model, and the other texts whose
+    verdict is not cached are scored together in one call.
+
+    Args:
+        submission_words : lowercase strings to check for not an experience
+    Returns:
+        a list of the not_experience_rule result for each text, in the same order
+    """
+    results = [not_experience_verdict(0) for _ in submission_words]
+    scored = [
+        i for i, text in enumerate(submission_words) if len(text) > MAX_TITLE_CHARS
+    ]
+
+    def score(calls):
+        predictions = get_batcher("not_experience", score_not_experiences).score_many(
+            [call["submission_words"] for call in calls]
+        )
+        return [not_experience_verdict(prediction) for prediction in predictions]
+
+    verdicts = cached_verdicts(
+        "not_experience",
+        "not_experience_rule",
+        [{"submission_words": submission_words[i]} for i in scored],
+        score,
+    )
+    for i, verdict in zip(scored, verdicts):
+        results[i] = verdict
+    return results
 
-    body = str.encode(json.dumps(data))
 
-    url = os.getenv("NotAnExperienceURL")
-    url = correct_url_format(url)
-    api_key = os.getenv("NotAnExperienceKey")
-    api_key = clean_api_key(api_key)
+def not_experience_verdict(prediction: int) -> Tuple[int, List[str]]:
+    """Turn the not an experience model's prediction into the rule's score and label"""
+    score = 0
+    label = "Experience"
+
+    if prediction == 1:
+        score = 1
+        label = "Not_an_experience"
 
-    if not api_key:
-        raise Exception("A key should be provided to invoke the endpoint")
+    return score, [label]
 
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": ("Bearer " + api_key),
-    }
 
-    req = urllib.request.Request(url, body, headers)
+def score_not_experiences(texts: List[str]) -> List[int]:
+    """Score several texts with one call to the not an experience model
 
-    response = urllib.request.urlopen(req)
+    Args:
+        texts : lowercase strings to check for not an experience
+    Returns:
+        a list of the model's prediction for each text, 1 if not an experience or 0 if
+        an experience
+    """
+    # This is extracting the text from the submitted json
+    data = {"data": texts}
 
-    result = response.read()
+    body = str.encode(json.dumps(data))
+
+    endpoint = get_endpoint("not_experience")
+
+    result = get_model_client().post(
+        endpoint.url, body, endpoint.headers, endpoint=endpoint.name
+    )
     result = result.decode()
     result = json.loads(
         json.loads(result)
     )  # We have to do this because the returned result is double-serialised.
-    result_final = int(result["0"])
-
-    if result_final == 1:
-        score = 1
-        prediction = "Not_an_experience"
-
-    return score, [prediction]
+    # Predictions are keyed by the position of each text, as strings: {"0": 1, ...}
+    return [int(result[str(i)]) for i in range(len(texts))]
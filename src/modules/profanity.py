@@ -1,38 +1,38 @@
 import logging
 import os
 import sys
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
 sys.path.append(os.path.abspath("nhsuk.moderation-api\src"))
-from config import profanity
 from helpers.common_functions import log_exceptions
+from lexicon import Lexicon, get_lexicon
 
 logger = logging.getLogger(__name__)
 
 
 @log_exceptions
 def profanity_rule(
-    submission_words: List[str], profanity_list=profanity
+    submission_words: List[str],
+    profanity_list=None,
+    lexicon: Optional[Lexicon] = None,
 ) -> Tuple[int, List[str]]:
     """Checks words for profanity
 
     Args:
         submission_words (list) : list of strings (words) to check for profanity
-        profanity (list) : list of strings of profane words to check for in submission
+        profanity_list (list, optional) : profane words to check for, defaults to the lexicon
+        lexicon (Lexicon, optional) : the word lists to use, defaults to the current lexicon
 
     Returns:
         a tuple of length 2: first value is the score (0 for no profanity, 1 otherwise),
         second value is a list of profanity words included in submission
     """
-    result = list(
-        set(
-            [
-                profane_word.lower()
-                for profane_word in profanity_list
-                if profane_word.lower() in submission_words
-            ]
-        )
-    )
+    if profanity_list is None:
+        profane_words = (lexicon or get_lexicon()).profanity
+    else:
+        profane_words = frozenset(word.lower() for word in profanity_list)
+
+    result = list(profane_words.intersection(submission_words))
 
     profane_count = len(result)
 
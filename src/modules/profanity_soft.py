@@ -1,19 +1,22 @@
-import re
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
-from config import profanity_soft
 from helpers.common_functions import log_exceptions
+from helpers.word_automaton import WordListMatcher
+from lexicon import Lexicon, get_lexicon
 
 
 @log_exceptions
 def profanity_rule_soft(
-    submission_words: str, profanity_list=profanity_soft
+    submission_words: str,
+    profanity_list=None,
+    lexicon: Optional[Lexicon] = None,
 ) -> Tuple[int, List[str]]:
     """Checks a string for soft profanity
 
     Args:
         submission_words (list) : a string to check for profanity
-        profanity (list) : list of strings of profane words to check for in submission
+        profanity_list (list, optional) : soft profane words to check for, defaults to the lexicon
+        lexicon (Lexicon, optional) : the word lists to use, defaults to the current lexicon
 
     Returns:
         tuple of length 2: first value is the score (0 for no soft profanity, 1 otherwise),
@@ -21,13 +24,12 @@ def profanity_rule_soft(
     """
     assert isinstance(submission_words, str)
 
-    result = []
-    for profane_word in profanity_list:
-        pattern = r"\b" + profane_word.lower().strip() + r"\b"
-        if re.search(pattern, submission_words):
-            result.append(profane_word.lower())
+    if profanity_list is None:
+        matcher = (lexicon or get_lexicon()).profanity_soft
+    else:
+        matcher = WordListMatcher(word.lower() for word in profanity_list)
 
-    result = list(set(result))
+    result = list(set(matcher.find_words(submission_words)))
 
     profane_count = len(result)
     if profane_count > 0:
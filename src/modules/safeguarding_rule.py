@@ -1,15 +1,17 @@
 import json
 import logging
-import os
-import urllib
 from typing import List, Tuple
 
-from helpers.common_functions import clean_api_key, correct_url_format, log_exceptions
+from helpers.common_functions import log_exceptions
+from helpers.endpoints import get_endpoint
+from helpers.model_client import get_model_client
+from helpers.verdict_cache import cached_verdict
 
 logger = logging.getLogger(__name__)
 
 
 @log_exceptions
+@cached_verdict("safeguarding")
 def safeguarding_rule(submission_words: str) -> Tuple[int, List[str], str]:
     """Checks a string for safeguarding indications such as selfharm
 
@@ -21,21 +23,12 @@ def safeguarding_rule(submission_words: str) -> Tuple[int, List[str], str]:
         third value is probability / confidence (str)
     """
 
-    url = os.getenv("SafeguardingURL")
-    url = correct_url_format(url)
-    api_key = os.getenv("SafeguardingKey")
-    api_key = clean_api_key(api_key)
     body = str.encode(json.dumps({"data": submission_words}))
+    endpoint = get_endpoint("safeguarding")
 
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": ("Bearer " + api_key),
-        "azureml-model-deployment": "safeguarding",
-    }
-
-    req = urllib.request.Request(url, body, headers)
-    response = urllib.request.urlopen(req)
-    result = response.read()
+    result = get_model_client().post(
+        endpoint.url, body, endpoint.headers, endpoint=endpoint.name
+    )
     result = json.loads(result)
     predicted_classes = json.loads(result)
 
@@ -2,8 +2,13 @@
 # both spaCy's built-in URL matching functionality and regular expressions. The module
 # also provides functionality to verify if the detected URLs are not in a list of
 # URL exceptions.
+#
+# The URL regex is compiled once at import. Its two lists of top level domains are
+# generated from a trie of URL_TLDS, so a TLD is matched a character at a time rather
+# than by trying every alternative in turn. Texts that cannot contain a URL skip the
+# regex altogether, and in the rest only the words that could hold a URL are searched.
 import logging
-from typing import List, Tuple
+from typing import Iterable, List, Tuple
 
 import regex as re
 
@@ -14,6 +19,127 @@ logger = logging.getLogger(__name__)
 url_exceptions = ["...", "...?"]
 
 
+# Top level domains accepted after the last dot of a URL, matched case-insensitively
+URL_TLDS = tuple(
+    (
+        "com net org edu gov mil aero asia biz cat coop info int jobs mobi museum name "
+        "post pro tel travel xxx ac ad ae af ag ai al am an ao aq ar as at au aw ax az "
+        "ba bb bd be bf bg bh bi bj bm bn bo br bs bt bv bw by bz ca cc cd cf cg ch ci "
+        "ck cl cm cn co cr cs cu cv cx cy cz dd de dj dk dm do dz ec ee eg eh er es et "
+        "eu fi fj fk fm fo fr ga gb gd ge gf gg gh gi gl gm gn gp gq gr gs gt gu gw gy "
+        "hk hm hn hr ht hu id ie il im in io iq ir is it je jm jo jp ke kg kh ki km kn "
+        "kp kr kw ky kz la lb lc li lk lr ls lt lu lv ly ma mc md me mg mh mk ml mm mn "
+        "mo mp mq mr ms mt mu mv mw mx my mz na nc ne nf ng ni nl no np nr nu nz om pa "
+        "pe pf pg ph pk pl pm pn pr ps pt pw py qa re ro rs ru rw sa sb sc sd se sg sh "
+        "si sj Ja sk sl sm sn so sr ss st su sv sx sy sz tc td tf tg th tj tk tl tm tn "
+        "to tp tr tt tv tw tz ua ug uk us uy uz va vc ve vg vi vn vu wf ws ye yt yu za "
+        "zm zw"
+    ).split()
+)
+
+# The URL regex, with <TLDS> standing for an alternation of URL_TLDS
+URL_PATTERN_TEMPLATE = r"(?i)\b((?:ftp|ftps|http|https?:(?:/{1,3}|[a-z0-9%])|[a-z0-9.\-]+[.](?:<TLDS>)/)(?:[^\s()<>{}\[\]]+|\([^\s()]*?\([^\s()]+\)[^\s()]*?\)|\([^\s]+?\))+(?:\([^\s()]*?\([^\s()]+\)[^\s()]*?\)|\([^\s]+?\)|[^\s`!()\[\]{};:'\".,<>?«»“”‘’])|(?:(?<!@)[a-z0-9]+(?:[.\-][a-z0-9]+)*[.](?:<TLDS>)\b/?(?!@)))"
+
+
+def tld_trie_pattern(tlds: Iterable[str]) -> str:
+    """Build a regex alternation of top level domains that branches like a trie
+
+    The pattern matches exactly the strings that "|".join(tlds) matches
+    case-insensitively. For "co", "com" and "coop" it is "co(?:m|op)?" rather than
+    "com|coop|co".
+
+    Args:
+        tlds (Iterable[str]): the top level domains
+
+    Returns:
+        str: the regex alternation, without an enclosing group
+    """
+    trie = {}
+    for tld in tlds:
+        node = trie
+        for char in tld.lower():
+            node = node.setdefault(char, {})
+        node[""] = {}  # marks the end of a TLD
+
+    def node_pattern(node: dict) -> str:
+        # Children that only end a TLD are collapsed into one character class
+        leaves = [char for char, child in sorted(node.items()) if child == {"": {}}]
+        branches = [
+            re.escape(char) + node_pattern(child)
+            for char, child in sorted(node.items())
+            if char and char not in leaves
+        ]
+        if len(leaves) == 1:
+            branches.append(re.escape(leaves[0]))
+        elif leaves:
+            branches.append("[" + "".join(re.escape(char) for char in leaves) + "]")
+
+        if not branches:
+            return ""
+        if "" in node:
+            return "(?:" + "|".join(branches) + ")?"
+        if len(branches) > 1:
+            return "(?:" + "|".join(branches) + ")"
+        return branches[0]
+
+    return node_pattern(trie)
+
+
+def url_pattern(tld_pattern: str) -> str:
+    """Fill a top level domain alternation into the URL regex"""
+    return URL_PATTERN_TEMPLATE.replace("<TLDS>", tld_pattern)
+
+
+url_regex = re.compile(url_pattern(tld_trie_pattern(URL_TLDS)))
+
+# str.split() also splits on these separators, which the URL regex treats as text
+_SPLIT_ONLY_SEPARATORS = ("\x1c", "\x1d", "\x1e", "\x1f")
+
+
+def might_contain_url(text: str) -> bool:
+    """Cheap check that rules out most texts the URL regex cannot match
+
+    Every URL regex match contains a ".", "/" or ":", or starts with "ftp" or "http",
+    which the regex accepts without any punctuation after them.
+
+    Args:
+        text (str): the text to check
+
+    Returns:
+        bool: False only if the URL regex cannot match the text
+    """
+    if "." in text or "/" in text or ":" in text:
+        return True
+    lowered = text.lower()
+    return "ftp" in lowered or "http" in lowered
+
+
+def url_candidates(text: str) -> str:
+    """Cut a text down to the words the URL regex could match in
+
+    A URL regex match never contains whitespace, so it lies inside a single word, and
+    that word passes might_contain_url(). Searching the passing words, joined by
+    spaces, finds exactly the matches a search of the whole text would.
+
+    Args:
+        text (str): the text to cut down
+
+    Returns:
+        str: the words of text that might contain a URL, separated by spaces
+    """
+    if any(separator in text for separator in _SPLIT_ONLY_SEPARATORS):
+        return text
+
+    lowered = text.lower()
+    if "ftp" in lowered or "http" in lowered:
+        words = [word for word in text.split() if might_contain_url(word)]
+    else:
+        words = [
+            word for word in text.split() if "." in word or "/" in word or ":" in word
+        ]
+    return " ".join(words)
+
+
 @log_exceptions
 def find_match_for_url_rule(text: str) -> Tuple[int, List[str]]:
     """
@@ -29,12 +155,9 @@ def find_match_for_url_rule(text: str) -> Tuple[int, List[str]]:
     score = 0
     matched_urls = []
 
-    if isinstance(text, str):
-        # Search for text matching an URL regex
-        urls_found = re.findall(
-            r"(?i)\b((?:ftp|ftps|http|https?:(?:/{1,3}|[a-z0-9%])|[a-z0-9.\-]+[.](?:com|net|org|edu|gov|mil|aero|asia|biz|cat|coop|info|int|jobs|mobi|museum|name|post|pro|tel|travel|xxx|ac|ad|ae|af|ag|ai|al|am|an|ao|aq|ar|as|at|au|aw|ax|az|ba|bb|bd|be|bf|bg|bh|bi|bj|bm|bn|bo|br|bs|bt|bv|bw|by|bz|ca|cc|cd|cf|cg|ch|ci|ck|cl|cm|cn|co|cr|cs|cu|cv|cx|cy|cz|dd|de|dj|dk|dm|do|dz|ec|ee|eg|eh|er|es|et|eu|fi|fj|fk|fm|fo|fr|ga|gb|gd|ge|gf|gg|gh|gi|gl|gm|gn|gp|gq|gr|gs|gt|gu|gw|gy|hk|hm|hn|hr|ht|hu|id|ie|il|im|in|io|iq|ir|is|it|je|jm|jo|jp|ke|kg|kh|ki|km|kn|kp|kr|kw|ky|kz|la|lb|lc|li|lk|lr|ls|lt|lu|lv|ly|ma|mc|md|me|mg|mh|mk|ml|mm|mn|mo|mp|mq|mr|ms|mt|mu|mv|mw|mx|my|mz|na|nc|ne|nf|ng|ni|nl|no|np|nr|nu|nz|om|pa|pe|pf|pg|ph|pk|pl|pm|pn|pr|ps|pt|pw|py|qa|re|ro|rs|ru|rw|sa|sb|sc|sd|se|sg|sh|si|sj|Ja|sk|sl|sm|sn|so|sr|ss|st|su|sv|sx|sy|sz|tc|td|tf|tg|th|tj|tk|tl|tm|tn|to|tp|tr|tt|tv|tw|tz|ua|ug|uk|us|uy|uz|va|vc|ve|vg|vi|vn|vu|wf|ws|ye|yt|yu|za|zm|zw)/)(?:[^\s()<>{}\[\]]+|\([^\s()]*?\([^\s()]+\)[^\s()]*?\)|\([^\s]+?\))+(?:\([^\s()]*?\([^\s()]+\)[^\s()]*?\)|\([^\s]+?\)|[^\s`!()\[\]{};:'\".,<>?«»“”‘’])|(?:(?<!@)[a-z0-9]+(?:[.\-][a-z0-9]+)*[.](?:com|net|org|edu|gov|mil|aero|asia|biz|cat|coop|info|int|jobs|mobi|museum|name|post|pro|tel|travel|xxx|ac|ad|ae|af|ag|ai|al|am|an|ao|aq|ar|as|at|au|aw|ax|az|ba|bb|bd|be|bf|bg|bh|bi|bj|bm|bn|bo|br|bs|bt|bv|bw|by|bz|ca|cc|cd|cf|cg|ch|ci|ck|cl|cm|cn|co|cr|cs|cu|cv|cx|cy|cz|dd|de|dj|dk|dm|do|dz|ec|ee|eg|eh|er|es|et|eu|fi|fj|fk|fm|fo|fr|ga|gb|gd|ge|gf|gg|gh|gi|gl|gm|gn|gp|gq|gr|gs|gt|gu|gw|gy|hk|hm|hn|hr|ht|hu|id|ie|il|im|in|io|iq|ir|is|it|je|jm|jo|jp|ke|kg|kh|ki|km|kn|kp|kr|kw|ky|kz|la|lb|lc|li|lk|lr|ls|lt|lu|lv|ly|ma|mc|md|me|mg|mh|mk|ml|mm|mn|mo|mp|mq|mr|ms|mt|mu|mv|mw|mx|my|mz|na|nc|ne|nf|ng|ni|nl|no|np|nr|nu|nz|om|pa|pe|pf|pg|ph|pk|pl|pm|pn|pr|ps|pt|pw|py|qa|re|ro|rs|ru|rw|sa|sb|sc|sd|se|sg|sh|si|sj|Ja|sk|sl|sm|sn|so|sr|ss|st|su|sv|sx|sy|sz|tc|td|tf|tg|th|tj|tk|tl|tm|tn|to|tp|tr|tt|tv|tw|tz|ua|ug|uk|us|uy|uz|va|vc|ve|vg|vi|vn|vu|wf|ws|ye|yt|yu|za|zm|zw)\b/?(?!@)))",
-            text,
-        )
+    if isinstance(text, str) and might_contain_url(text):
+        # Search for text matching an URL regex, in the words that could hold one
+        urls_found = url_regex.findall(url_candidates(text))
 
         if urls_found:
             score = 1
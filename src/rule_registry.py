@@ -0,0 +1,210 @@
+# Registry of the moderation rules run by HardRules. Each rule declares what it reads
+# from the text, whether it runs locally or calls a remote model, and where its matched
+# values sit in its output, so rules can be added, reordered or disabled here without
+# touching HardRules.
+#
+# RULES is in report order: the order rules appear in the response. The order they run
+# in is decided by the policy (RulePolicy):
+#   run_all       every rule is called at once (the default)
+#   stop_on_fail  the cheap local rules run first, and the remote models are only
+#                 called if none of them failed (code 1); once a remote rule fails, the
+#                 remote calls that have not started yet are dropped. Rules that are not
+#                 run are left out of the report, as a passing rule is
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+from config import DISABLED_RULES, RULE_POLICY
+from modules.allcaps import all_caps_rule
+from modules.complaint_rule import complaint_rule, complaint_rule_batch
+from modules.descriptor_rule import descriptor_rule
+from modules.email_rule import check_email_rule
+from modules.names_rule import names_rule
+from modules.not_experience_rule import (
+    not_experience_rule,
+    not_experience_rule_batch,
+)
+from modules.profanity import profanity_rule
+from modules.profanity_soft import profanity_rule_soft
+from modules.safeguarding_rule import safeguarding_rule
+from modules.url_rule import check_url_rule
+
+LOCAL = "local"
+REMOTE = "remote"
+
+RUN_ALL = "run_all"
+STOP_ON_FAIL = "stop_on_fail"
+RULE_POLICIES = (RUN_ALL, STOP_ON_FAIL)
+
+# What a rule can read, as provided by HardRules.rule_inputs()
+RULE_INPUTS = (
+    "doc",  # the parsed text
+    "text",  # the text as submitted
+    "lower_text",  # the text in lower case
+    "words",  # the lower case token texts
+    "org_name",  # the organisation being reviewed
+    "lexicon",  # the word lists snapshot for the review
+    "nlp",  # the spaCy pipeline
+    "matcher",  # the token matcher
+)
+
+
+class RuleConfigError(Exception):
+    """Raised when the rule registry or its configuration is invalid"""
+
+
+@dataclass(frozen=True)
+class Rule:
+    """A moderation rule and how to call it.
+
+    Attributes:
+    name (str): The rule name reported to the caller.
+    func (Callable): The rule function. It returns a tuple starting with the code: 0 for pass, 1 for fail, 2 for flag for review.
+    inputs (Dict[str, str]): Keyword argument of func -> the RULE_INPUTS entry passed as it.
+    cost (str): LOCAL for rules computed in process, REMOTE for rules that call a model endpoint.
+    values_index (int): Position of the matched values in func's output.
+    probability_index (int, optional): Position of a probability to report, if any.
+    batch_func (Callable, optional): func for several texts at once: it takes the same keyword arguments, each a list with one value per text, and returns a list of func's outputs. Set for rules whose model accepts a list of texts, so a review's texts are sent in one call.
+    """
+
+    name: str
+    func: Callable
+    inputs: Dict[str, str]
+    cost: str
+    values_index: int = 1
+    probability_index: Optional[int] = None
+    batch_func: Optional[Callable] = None
+
+
+RULES: Tuple[Rule, ...] = (
+    Rule(
+        "allCaps",
+        all_caps_rule,
+        {"body": "doc", "lexicon": "lexicon"},
+        LOCAL,
+        values_index=2,
+    ),
+    Rule("emailRule", check_email_rule, {"submission_words": "text"}, LOCAL),
+    Rule(
+        "urlRule",
+        check_url_rule,
+        {"nlp": "nlp", "doc": "doc", "matcher": "matcher"},
+        LOCAL,
+    ),
+    Rule(
+        "profanityDetectionHard",
+        profanity_rule,
+        {"submission_words": "words", "lexicon": "lexicon"},
+        LOCAL,
+    ),
+    Rule(
+        "profanityDetectionSoft",
+        profanity_rule_soft,
+        {"submission_words": "lower_text", "lexicon": "lexicon"},
+        LOCAL,
+    ),
+    Rule(
+        "namesRule",
+        names_rule,
+        {"submission_words": "text", "org_name": "org_name", "lexicon": "lexicon"},
+        REMOTE,
+    ),
+    Rule(
+        "descriptorRuleHard",
+        descriptor_rule,
+        {"submission_words": "lower_text", "lexicon": "lexicon"},
+        REMOTE,
+    ),
+    Rule(
+        "safeguardingRule",
+        safeguarding_rule,
+        {"submission_words": "lower_text"},
+        REMOTE,
+        probability_index=2,
+    ),
+    Rule(
+        "complaintRule",
+        complaint_rule,
+        {"submission_words": "lower_text"},
+        REMOTE,
+        batch_func=complaint_rule_batch,
+    ),
+    Rule(
+        "notAnExperienceRule",
+        not_experience_rule,
+        {"submission_words": "lower_text"},
+        REMOTE,
+        batch_func=not_experience_rule_batch,
+    ),
+)
+
+
+def validate_rules(rules: Tuple[Rule, ...]):
+    """Check rule names are unique and every rule reads known inputs at a known cost
+
+    Raises:
+      RuleConfigError: if a rule is invalid
+    """
+    names = [rule.name for rule in rules]
+    duplicates = {name for name in names if names.count(name) > 1}
+    if duplicates:
+        raise RuleConfigError(f"Rule names registered more than once: {duplicates}")
+    for rule in rules:
+        unknown = set(rule.inputs.values()) - set(RULE_INPUTS)
+        if unknown:
+            raise RuleConfigError(f"{rule.name} reads unknown inputs: {unknown}")
+        if rule.cost not in (LOCAL, REMOTE):
+            raise RuleConfigError(f"{rule.name} has unknown cost {rule.cost!r}")
+
+
+def active_rules(
+    rules: Tuple[Rule, ...] = RULES, disabled: List[str] = DISABLED_RULES
+) -> Tuple[Rule, ...]:
+    """The registered rules, in report order, less those disabled by DisabledRules
+
+    Args:
+      rules (tuple): the registered rules
+      disabled (list): names of rules to leave out
+
+    Returns:
+      tuple: the rules to run
+
+    Raises:
+      RuleConfigError: if a disabled name is not a registered rule
+    """
+    unknown = set(disabled) - {rule.name for rule in rules}
+    if unknown:
+        raise RuleConfigError(f"Cannot disable unknown rules: {unknown}")
+    return tuple(rule for rule in rules if rule.name not in disabled)
+
+
+def run_stages(rules: Tuple[Rule, ...], policy: str = RULE_POLICY) -> List[List[int]]:
+    """Group rules into the stages a policy runs them in
+
+    Args:
+      rules (tuple): the rules to run
+      policy (str): one of RULE_POLICIES
+
+    Returns:
+      list: stages in run order, each a list of indexes into rules. The rules in a
+            stage are called at once
+
+    Raises:
+      RuleConfigError: if the policy is unknown
+    """
+    if policy == RUN_ALL:
+        return [list(range(len(rules)))]
+    if policy == STOP_ON_FAIL:
+        stages = [
+            [i for i, rule in enumerate(rules) if rule.cost == cost]
+            for cost in (LOCAL, REMOTE)
+        ]
+        return [stage for stage in stages if stage]
+    raise RuleConfigError(
+        f"Unknown rule policy {policy!r}, expected one of {RULE_POLICIES}"
+    )
+
+
+validate_rules(RULES)
+# Fail at startup, rather than on the first review, on a bad RulePolicy or DisabledRules
+run_stages(RULES)
+ACTIVE_RULES = active_rules()
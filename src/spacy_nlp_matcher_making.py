@@ -1,66 +1,96 @@
+# Loads the spaCy pipeline and the token matcher used by the rules. Only the pipeline
+# components that set an attribute read by a rule or a matcher pattern are kept (see
+# helpers/spacy_pipeline.py); the rest are removed at load, so they do not run on every
+# title and comment. Language detection is not a pipeline component either:
+# Doc._.language is only worked out when something reads it (see
+# helpers/language_detection.py).
 import os
 
 import spacy
 from spacy.matcher import Matcher
-from spacy_langdetect import LanguageDetector
+from spacy.tokens import Doc, Span
 
-nlp = spacy.load("en_core_web_sm")
-nlp.add_pipe(LanguageDetector(), name="language_detector", last=True)
-matcher = Matcher(nlp.vocab)
-matcher.add("URL", None, [{"LIKE_URL": True}])
-# Personally identifiable description
-matcher.add(
-    "Title matched",
-    None,
-    [
-        {"TEXT": {"REGEX": r"(?i)(?:mrs|mr|miss|dr|ms)[.]?"}},
-        {"TEXT": {"REGEX": r"[A-Z][a-z]*"}},
+from config import SPACY_PIPELINE_TIMINGS
+from helpers.language_detection import doc_language
+from helpers.spacy_pipeline import pattern_attrs, prune_pipeline, required_components
+
+# Token attributes the rules read from the Doc themselves, besides the matcher patterns
+RULE_TOKEN_ATTRS = {
+    "all_caps_rule": ["ORTH"],
+    "check_url_rule": ["ORTH"],
+    "profanity_rule": ["LOWER"],
+}
+
+# Matcher label -> token patterns, added to the matcher in this order
+MATCHER_PATTERNS = {
+    "URL": [[{"LIKE_URL": True}]],
+    # Personally identifiable description
+    "Title matched": [
+        [
+            {"TEXT": {"REGEX": r"(?i)(?:mrs|mr|miss|dr|ms)[.]?"}},
+            {"TEXT": {"REGEX": r"[A-Z][a-z]*"}},
+        ],
     ],
-)
-matcher.add(
-    "Personal Description",
-    None,
-    [
-        {"TAG": "JJ", "TEXT": {"IN": ["blonde", "ginger", "brunette", "redhead"]}}
-    ],  # Adjectives associated with hair colour
-    [
-        {"TAG": "JJ"},
-        {"TAG": "NN", "TEXT": {"IN": ["hair", "glasses"]}},
-    ],  # Explicit characteristics
-)
-# http://regexlib.com/UserPatterns.aspx?authorid=d95177b0-6014-4e73-a959-73f1663ae814
-# UK mobile phone number, with optional +44 national code.
-# Allows optional brackets and spaces at appropriate positions.
-matcher.add(
-    "Telephone number",
-    None,
-    [{"TEXT": {"REGEX": r"(\+44\s?7\d{3}|\(?07\d{3}\)?)\s?\d{3}\s?\d{3}$"}}],
-)
-# https://emailregex.com
-matcher.add(
-    "Email",
-    None,
-    [{"TEXT": {"REGEX": r"([a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$)"}}],
-)
-# https://stackoverflow.com/questions/164979/regex-for-matching-uk-postcodes
-# Please note this just detects the UK postcode format and cannot verify postcodes, which are
-# constantly changing and arbitrarily complex.
-matcher.add(
-    "UK postcode",
-    None,
-    [
-        {
-            "TEXT": {
-                "REGEX": r"""(([A-Z][A-HJ-Y]?\d[A-Z\d]?|ASCN|STHL|TDCU|BBND|[BFS]IQQ|PCRN|TKCA)?
+    "Personal Description": [
+        [
+            {"TAG": "JJ", "TEXT": {"IN": ["blonde", "ginger", "brunette", "redhead"]}}
+        ],  # Adjectives associated with hair colour
+        [
+            {"TAG": "JJ"},
+            {"TAG": "NN", "TEXT": {"IN": ["hair", "glasses"]}},
+        ],  # Explicit characteristics
+    ],
+    # http://regexlib.com/UserPatterns.aspx?authorid=d95177b0-6014-4e73-a959-73f1663ae814
+    # UK mobile phone number, with optional +44 national code.
+    # Allows optional brackets and spaces at appropriate positions.
+    "Telephone number": [
+        [{"TEXT": {"REGEX": r"(\+44\s?7\d{3}|\(?07\d{3}\)?)\s?\d{3}\s?\d{3}$"}}],
+    ],
+    # https://emailregex.com
+    "Email": [
+        [{"TEXT": {"REGEX": r"([a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$)"}}],
+    ],
+    # https://stackoverflow.com/questions/164979/regex-for-matching-uk-postcodes
+    # Please note this just detects the UK postcode format and cannot verify postcodes, which are
+    # constantly changing and arbitrarily complex.
+    "UK postcode": [
+        [
+            {
+                "TEXT": {
+                    "REGEX": r"""(([A-Z][A-HJ-Y]?\d[A-Z\d]?|ASCN|STHL|TDCU|BBND|[BFS]IQQ|PCRN|TKCA)?
 \d[A-Z]{2}|BFPO ?\d{1,4}|(KY\d|MSR|VG|AI)[ -]?\d{4}|[A-Z]{2}?\d{2}|GE ?CX|GIR ?0A{2}|SAN ?TA1)$"""
+                }
             }
-        }
+        ],
     ],
-)
+    # Social media handle regex/detector (matches words starting with @)
+    "Social Media": [
+        [{"TEXT": {"REGEX": r"@\S+"}}],
+    ],
+}
+
+# Fabricated reviews the pipeline components are timed on at startup
+SAMPLE_TEXTS = [
+    "Great service",
+    "The receptionist was rude and I waited two hours for my appointment.",
+    "Dr Smith listened to everything I said and explained my test results clearly. "
+    "The nurse with ginger hair took my bloods and was very gentle. I would "
+    "recommend this surgery to anyone, although booking online at www.example.com "
+    "is still difficult and the phone line is always busy in the morning.",
+]
 
-# Social media handle regex/detector (matches words starting with @)
-matcher.add(
-    "Social Media",
-    None,
-    [{"TEXT": {"REGEX": r"@\S+"}}],
+nlp = spacy.load("en_core_web_sm")
+# Which components were kept and removed, logged by the app once logging is set up
+pipeline_report = prune_pipeline(
+    nlp,
+    required_components({**RULE_TOKEN_ATTRS, **pattern_attrs(MATCHER_PATTERNS)}),
+    SAMPLE_TEXTS if SPACY_PIPELINE_TIMINGS else None,
 )
+
+# doc._.language and span._.language are detected on first read, for rules that need them
+Doc.set_extension("language", getter=doc_language, force=True)
+Span.set_extension("language", getter=doc_language, force=True)
+
+matcher = Matcher(nlp.vocab)
+for label, patterns in MATCHER_PATTERNS.items():
+    matcher.add(label, None, *patterns)
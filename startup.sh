@@ -9,4 +9,5 @@ echo "starting SSH..."
 service ssh start
 
 echo "starting flask app..."
-flask run
+# Loads the app once, then forks the workers (see gunicorn.conf.py)
+exec gunicorn --config gunicorn.conf.py
@@ -0,0 +1,36 @@
+from src.helpers.disk_cache import DiskVerdictCache
+
+
+def test_disk_cache_round_trip(tmp_path):
+    cache = DiskVerdictCache(str(tmp_path / "verdicts.db"))
+    cache.set("a", "complaint_rule", "v1", (1, ["Complaint"]))
+
+    assert cache.get("a") == (1, ["Complaint"])
+    assert cache.get("b") is None
+    assert cache.stats()["hits"] == 1
+
+
+def test_disk_cache_shared_between_instances(tmp_path):
+    path = str(tmp_path / "verdicts.db")
+    DiskVerdictCache(path).set("a", "names_rule", "v1", (1, ["alice"]))
+
+    assert DiskVerdictCache(path).get("a") == (1, ["alice"])
+
+
+def test_disk_cache_evicts_to_size(tmp_path):
+    cache = DiskVerdictCache(str(tmp_path / "verdicts.db"), max_entries=2)
+    for key in ["a", "b", "c"]:
+        cache.set(key, "complaint_rule", "v1", (0, ["No_Complaint"]))
+
+    assert cache.evict() == 1
+    assert cache.get("a") is None
+    assert cache.get("c") == (0, ["No_Complaint"])
+
+
+def test_disk_cache_purge_by_rule(tmp_path):
+    cache = DiskVerdictCache(str(tmp_path / "verdicts.db"))
+    cache.set("a", "complaint_rule", "v1", (0, ["No_Complaint"]))
+    cache.set("b", "names_rule", "v1", (0, []))
+
+    assert cache.purge(rule="names_rule") == 1
+    assert cache.stats()["by_rule"] == {"complaint_rule": 1}
@@ -0,0 +1,28 @@
+import pytest
+
+from src.helpers.endpoints import EndpointConfigError, build_endpoint
+
+
+def test_build_endpoint_cleans_url_and_key():
+    endpoint = build_endpoint(
+        "safeguarding", "'https://example.com/score'", " `abc` ", "safeguarding"
+    )
+    assert endpoint.url == "https://example.com/score"
+    assert endpoint.headers == {
+        "Content-Type": "application/json",
+        "Authorization": "Bearer abc",
+        "azureml-model-deployment": "safeguarding",
+    }
+
+
+@pytest.mark.parametrize(
+    "url, api_key",
+    [
+        (None, "abc"),
+        ("https://example.com/score", None),
+        ("https://example.com/score", "''"),
+    ],
+)
+def test_build_endpoint_missing_config(url, api_key):
+    with pytest.raises(EndpointConfigError):
+        build_endpoint("complaint", url, api_key)
@@ -0,0 +1,52 @@
+import threading
+import time
+
+import src.helpers.event_loop as event_loop
+from src.helpers.event_loop import SKIPPED, TIMED_OUT, gather_calls, run_coroutine
+from src.helpers.executor import RuleExecutor
+
+
+def test_gather_calls_keeps_order():
+    calls = [(lambda x: x * 2, [i], {}) for i in range(5)]
+    assert run_coroutine(gather_calls(calls)) == [0, 2, 4, 6, 8]
+
+
+def test_gather_calls_abandons_calls_at_the_deadline():
+    release = threading.Event()
+    calls = [(lambda: 1, [], {}), (release.wait, [], {})]
+    results = run_coroutine(gather_calls(calls, deadline=time.monotonic() + 0.1))
+    release.set()
+    assert results == [1, TIMED_OUT]
+
+
+def test_gather_calls_stop_when():
+    release = threading.Event()
+    calls = [(lambda: 1, [], {}), (release.wait, [], {})]
+    results = run_coroutine(gather_calls(calls, stop_when=lambda result: result == 1))
+    release.set()
+    assert results == [1, SKIPPED]
+
+
+def test_a_full_executor_does_not_stop_the_loop(monkeypatch):
+    executor = RuleExecutor(max_workers=1, max_queue=1)
+    monkeypatch.setattr(event_loop, "get_rule_executor", lambda: executor)
+    release = threading.Event()
+
+    # One request fills the pool and its queue, with calls left over waiting for room
+    start = time.monotonic()
+    first = [(release.wait, [], {}) for _ in range(4)]
+    first_results = run_coroutine(
+        gather_calls(first, deadline=time.monotonic() + 0.2), timeout=2
+    )
+    # A second request still gets its placeholders at its own deadline
+    second_results = run_coroutine(
+        gather_calls([(lambda: 1, [], {})], deadline=time.monotonic() + 0.2),
+        timeout=2,
+    )
+    elapsed = time.monotonic() - start
+    release.set()
+    executor.shutdown()
+
+    assert first_results == [TIMED_OUT] * 4
+    assert second_results == [TIMED_OUT]
+    assert elapsed < 1
@@ -0,0 +1,88 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from src.helpers.executor import ExecutorFull, RuleExecutor, current_wait
+
+
+def test_stats_count_queued_and_active_calls():
+    executor = RuleExecutor(max_workers=1, max_queue=5)
+    release = threading.Event()
+    first = executor.submit(release.wait)
+    second = executor.submit(lambda: "done")
+    time.sleep(0.05)
+
+    stats = executor.stats()
+    assert stats["active"] == 1
+    assert stats["queued"] == 1
+
+    release.set()
+    assert second.result() == "done"
+    first.result()
+    stats = executor.stats()
+    assert stats["active"] == stats["queued"] == 0
+    assert stats["completed"] == 2
+    assert stats["wait_seconds_max"] >= 0.05
+    executor.shutdown()
+
+
+def test_submit_refuses_calls_while_the_queue_is_full():
+    executor = RuleExecutor(max_workers=1, max_queue=1)
+    release = threading.Event()
+    executor.submit(release.wait)
+    executor.submit(lambda: None)
+
+    with pytest.raises(ExecutorFull):
+        executor.submit(lambda: None)
+
+    release.set()
+    executor.shutdown()
+
+
+def test_run_async_waits_for_room_on_the_loop():
+    executor = RuleExecutor(max_workers=1, max_queue=1)
+    release = threading.Event()
+
+    async def saturate():
+        calls = [executor.run_async(release.wait) for _ in range(3)]
+        tasks = [asyncio.ensure_future(call) for call in calls]
+        # The third call waits on the loop, which is free to run this sleep
+        await asyncio.sleep(0.05)
+        waiting = executor.stats()["queued"]
+        release.set()
+        return waiting, await asyncio.gather(*tasks)
+
+    waiting, results = asyncio.run(saturate())
+    assert waiting == 1
+    assert results == [True, True, True]
+    executor.shutdown()
+
+
+def test_cancelled_calls_leave_the_queue():
+    executor = RuleExecutor(max_workers=1, max_queue=1)
+    release = threading.Event()
+    executor.submit(release.wait)
+    queued = executor.submit(lambda: None)
+
+    assert queued.cancel()
+    assert executor.stats()["queued"] == 0
+    executor.submit(lambda: None)  # the cancelled call's slot is free again
+
+    release.set()
+    executor.shutdown()
+    assert executor.stats()["completed"] == 2
+
+
+def test_current_wait_reports_the_running_calls_wait():
+    executor = RuleExecutor(max_workers=1, max_queue=5)
+    release = threading.Event()
+    first = executor.submit(release.wait)
+    second = executor.submit(current_wait)
+    time.sleep(0.05)
+    release.set()
+
+    first.result()
+    assert second.result() >= 0.05
+    assert current_wait() == 0.0
@@ -0,0 +1,64 @@
+import pytest
+
+from src.helpers.language_detection import (
+    NgramLanguageDetector,
+    doc_language,
+    ngram_counts,
+    ngram_language,
+)
+
+
+def test_ngram_counts_ignore_case_and_non_letters():
+    counts = ngram_counts("Ab, ab 12!")
+    assert counts["a"] == 2
+    assert counts[" ab"] == counts["ab "] == 2
+    assert "1" not in counts and "," not in counts
+
+
+@pytest.mark.parametrize(
+    "text, language",
+    [
+        ("The receptionist was rude and I waited two hours", "en"),
+        ("Staff were lovely", "en"),
+        ("Diolch yn fawr am y gofal, roedd y nyrs yn wych", "cy"),
+        ("Le personnel était très gentil, merci beaucoup", "fr"),
+        ("Die Ärztin war sehr nett und hat sich Zeit genommen", "de"),
+        ("Muy buena atención, gracias", "es"),
+        ("Bardzo dziękuję za pomoc", "pl"),
+    ],
+)
+def test_ngram_language(text, language):
+    result = ngram_language(text)
+    assert result["language"] == language
+    assert 0 < result["score"] <= 1
+
+
+def test_ngram_language_is_deterministic():
+    results = {str(ngram_language("Friendly and helpful")) for _ in range(5)}
+    assert len(results) == 1
+
+
+def test_text_without_letters_is_unknown():
+    assert ngram_language("12345 !!!") == {"language": "UNKNOWN", "score": 0.0}
+
+
+def test_detector_from_samples():
+    detector = NgramLanguageDetector({"a": "aaa aaa", "b": "bbb bbb"})
+    assert detector.languages == ["a", "b"]
+    assert detector.detect("aa")["language"] == "a"
+    assert detector.detect("bb")["language"] == "b"
+
+
+class Doc:
+    def __init__(self, text):
+        self.text = text
+        self.user_data = {}
+
+
+def test_doc_language_is_cached_on_the_doc():
+    doc = Doc("The nurse was very kind")
+    result = doc_language(doc)
+
+    assert result["language"] == "en"
+    assert list(doc.user_data.values()) == [result]
+    assert doc_language(doc) is result
@@ -0,0 +1,178 @@
+import json
+import os
+import subprocess
+import sys
+import textwrap
+
+import pytest
+from prometheus_client import REGISTRY
+
+# The app's modules import the metrics as helpers.metrics. Importing them as
+# src.helpers.metrics would register every metric a second time
+from helpers.metrics import (
+    instrumented,
+    record_lexicon_version,
+    record_model_call,
+    render,
+)
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def test_instrumented_rule_records_duration_and_outcome():
+    rule = instrumented("testRule", lambda text: (1, [text]))
+    before = sample("moderation_rule_calls_total", rule="testRule", outcome="fail")
+    timed = sample("moderation_rule_duration_seconds_count", rule="testRule")
+
+    assert rule("hello") == (1, ["hello"])
+    assert rule is instrumented("testRule", rule.__wrapped__)
+    assert (
+        sample("moderation_rule_calls_total", rule="testRule", outcome="fail")
+        == before + 1
+    )
+    assert (
+        sample("moderation_rule_duration_seconds_count", rule="testRule") == timed + 1
+    )
+
+
+def test_instrumented_batch_counts_each_text():
+    rule = instrumented("testBatchRule", lambda texts: [(0, []) for _ in texts])
+    before = sample("moderation_rule_calls_total", rule="testBatchRule", outcome="pass")
+
+    rule(["a", "b", "c"])
+
+    assert (
+        sample("moderation_rule_calls_total", rule="testBatchRule", outcome="pass")
+        == before + 3
+    )
+
+
+def test_instrumented_rule_counts_errors():
+    def failing_rule():
+        raise ValueError("model down")
+
+    rule = instrumented("testFailingRule", failing_rule)
+    with pytest.raises(ValueError):
+        rule()
+    assert (
+        sample("moderation_rule_calls_total", rule="testFailingRule", outcome="error")
+        == 1
+    )
+
+
+def test_record_model_call():
+    record_model_call("test_endpoint", 0.2, 200, 120, 30)
+    record_model_call("test_endpoint", 5.0, None, 120, 0)
+
+    assert sample(
+        "moderation_model_calls_total", endpoint="test_endpoint", status="200"
+    )
+    assert sample(
+        "moderation_model_calls_total", endpoint="test_endpoint", status="error"
+    )
+    assert sample("moderation_model_sent_bytes_total", endpoint="test_endpoint") == 240
+    assert (
+        sample("moderation_model_received_bytes_total", endpoint="test_endpoint") == 30
+    )
+
+
+def test_lexicon_version_follows_reloads():
+    record_lexicon_version("old")
+    record_lexicon_version("new", previous="old")
+
+    assert sample("moderation_lexicon_version", version="old") == 0
+    assert sample("moderation_lexicon_version", version="new") == 1
+
+
+def test_render_serves_prometheus_text():
+    body, content_type = render()
+
+    assert content_type.startswith("text/plain")
+    assert b"# TYPE moderation_rule_duration_seconds histogram" in body
+
+
+# Runs gunicorn's hooks around real forks, in a process whose metrics are in
+# multiprocess mode from the start
+FORKED_WORKERS = textwrap.dedent(
+    """
+    import importlib.util
+    import json
+    import os
+    import sys
+
+    spec = importlib.util.spec_from_file_location("gunicorn_conf", "gunicorn.conf.py")
+    conf = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(conf)
+
+    import lexicon
+    from helpers.metrics import render
+    from prometheus_client.parser import text_string_to_metric_families
+
+    lexicon.source_fingerprint = lambda path=None: {}
+    lexicon.build_lexicon = lambda: lexicon.Lexicon(
+        "v1", frozenset(), frozenset(), None, frozenset(), frozenset(), frozenset(),
+        frozenset(),
+    )
+
+    class Server:
+        class log:
+            info = staticmethod(print)
+
+    lexicon.get_lexicon()  # as the app does on import, in the preloaded master
+    conf.when_ready(Server)
+
+    workers = []
+    for _ in range(2):
+        ready, go = os.pipe(), os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            conf.post_fork(Server, None)
+            os.write(ready[1], b"1")
+            os.read(go[0], 1)
+            os._exit(0)
+        os.read(ready[0], 1)
+        workers.append((pid, go[1]))
+
+    series = [
+        [sample.labels["pid"], sample.labels["version"], sample.value]
+        for family in text_string_to_metric_families(render()[0].decode())
+        for sample in family.samples
+        if sample.name == "moderation_lexicon_version"
+    ]
+    for pid, go in workers:
+        os.write(go, b"1")
+        os.waitpid(pid, 0)
+    print(json.dumps({
+        "master": str(os.getpid()),
+        "workers": [str(pid) for pid, _ in workers],
+        "series": series,
+    }))
+    """
+)
+
+
+def test_lexicon_version_is_reported_by_each_worker_not_the_master(tmp_path):
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    env = dict(
+        os.environ,
+        PROMETHEUS_MULTIPROC_DIR=str(tmp_path),
+        LexiconWatchSeconds="0",
+        PYTHONPATH=os.pathsep.join([os.path.join(root, "src"), root]),
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", FORKED_WORKERS],
+        cwd=root,
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=60,
+        check=True,
+    )
+    report = json.loads(result.stdout.splitlines()[-1])
+
+    assert sorted(report["series"]) == sorted(
+        [pid, "v1", 1.0] for pid in report["workers"]
+    )
+    assert report["master"] not in [pid for pid, _, _ in report["series"]]
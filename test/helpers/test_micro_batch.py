@@ -0,0 +1,124 @@
+import threading
+
+import pytest
+
+from src.helpers.micro_batch import MicroBatcher
+
+
+def score_lengths(calls):
+    def score_batch(texts):
+        calls.append(list(texts))
+        return [len(text) for text in texts]
+
+    return score_batch
+
+
+def score_concurrently(batcher, texts):
+    results = {}
+
+    def score(text):
+        results[text] = batcher.score(text)
+
+    threads = [threading.Thread(target=score, args=(text,)) for text in texts]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_concurrent_texts_are_scored_in_one_call():
+    calls = []
+    batcher = MicroBatcher("lengths", score_lengths(calls), 10, max_wait_seconds=0.2)
+    texts = ["a", "bb", "ccc", "dddd"]
+
+    assert score_concurrently(batcher, texts) == {text: len(text) for text in texts}
+    assert len(calls) == 1 and sorted(calls[0]) == sorted(texts)
+    assert batcher.stats()["sizes"] == {4: 1}
+
+
+def test_full_batches_are_sent_without_waiting():
+    calls = []
+    batcher = MicroBatcher("lengths", score_lengths(calls), 2, max_wait_seconds=60)
+
+    assert score_concurrently(batcher, ["a", "bb"]) == {"a": 1, "bb": 2}
+    assert len(calls) == 1
+
+
+def test_score_many_sends_texts_together():
+    calls = []
+    batcher = MicroBatcher("lengths", score_lengths(calls), 10, max_wait_seconds=0.01)
+
+    assert batcher.score_many(["title", "a comment"]) == [5, 9]
+    assert calls == [["title", "a comment"]]
+
+
+def test_score_many_splits_texts_over_full_batches():
+    calls = []
+    batcher = MicroBatcher("lengths", score_lengths(calls), 2, max_wait_seconds=0.01)
+
+    assert batcher.score_many(["a", "bb", "ccc"]) == [1, 2, 3]
+    assert calls == [["a", "bb"], ["ccc"]]
+
+
+def test_a_lone_text_is_sent_after_the_window():
+    calls = []
+    batcher = MicroBatcher("lengths", score_lengths(calls), 10, max_wait_seconds=0.01)
+
+    assert batcher.score("abc") == 3
+    assert calls == [["abc"]]
+    assert batcher.stats()["batches"] == 1
+
+
+def test_batch_size_one_turns_batching_off():
+    calls = []
+    batcher = MicroBatcher("lengths", score_lengths(calls), 1, max_wait_seconds=60)
+
+    assert batcher.score("abc") == 3
+    assert batcher.stats()["sizes"] == {1: 1}
+
+
+def test_errors_reach_a_lone_caller():
+    calls = []
+
+    def fail(texts):
+        calls.append(list(texts))
+        raise ValueError("endpoint down")
+
+    batcher = MicroBatcher("failing", fail, 10, max_wait_seconds=0.01)
+    with pytest.raises(ValueError):
+        batcher.score("abc")
+    assert calls == [["abc"]]
+
+
+def test_a_poisoned_text_only_fails_its_own_caller():
+    calls = []
+
+    def score_batch(texts):
+        calls.append(list(texts))
+        if "poison" in texts:
+            raise ValueError("cannot score poison")
+        return [len(text) for text in texts]
+
+    batcher = MicroBatcher("poisoned", score_batch, 10, max_wait_seconds=0.2)
+    results, errors = {}, {}
+
+    def score(text):
+        try:
+            results[text] = batcher.score(text)
+        except ValueError as e:
+            errors[text] = e
+
+    threads = [
+        threading.Thread(target=score, args=(text,))
+        for text in ["a", "bb", "poison", "dddd"]
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == {"a": 1, "bb": 2, "dddd": 4}
+    assert list(errors) == ["poison"]
+    assert len(calls[0]) == 4
+    assert sorted(calls[1:]) == [["a"], ["bb"], ["dddd"], ["poison"]]
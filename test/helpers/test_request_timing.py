@@ -0,0 +1,54 @@
+import time
+
+from src.helpers.request_timing import (
+    RequestTiming,
+    TextTiming,
+    timed_together,
+    wants_timing,
+)
+
+
+def test_wants_timing_from_header_or_field():
+    assert wants_timing("1", {}, admin=True)
+    assert wants_timing("true", None, admin=True)
+    assert wants_timing(None, {"debug-timing": True}, admin=True)
+    assert not wants_timing(None, {"request": []}, admin=True)
+    assert not wants_timing("0", {"debug-timing": "yes"}, admin=True)
+
+
+def test_wants_timing_needs_the_admin_key():
+    assert not wants_timing("1", {"debug-timing": True}, admin=False)
+
+
+def test_text_timing_records_rules_and_parse():
+    timing = TextTiming()
+    rule = timing.timed("testRule", lambda text: time.sleep(0.01) or (0, []))
+    parse = timing.timed_parse(lambda text: text.split())
+
+    assert rule("hello") == (0, [])
+    assert parse("hello world") == ["hello", "world"]
+    report = timing.report()
+    assert report["rules"]["testRule"]["wall_ms"] >= 10
+    assert report["rules"]["testRule"]["queue_wait_ms"] == 0
+    assert "combined_texts" not in report["rules"]["testRule"]
+    assert "nlp_ms" in report
+
+
+def test_combined_call_is_timed_for_every_text():
+    title, comment = TextTiming(), TextTiming()
+    batch = timed_together([title, comment], "testRule", lambda texts: texts)
+
+    batch(["a", "b"])
+
+    for timing in (title, comment):
+        assert timing.report()["rules"]["testRule"]["combined_texts"] == 2
+
+
+def test_request_timing_report():
+    timing = RequestTiming(["title", "comment"])
+    timing.record("parse_json", 0.0012)
+
+    report = timing.report()
+    assert report["parse_json_ms"] == 1.2
+    assert report["title"] == {"rules": {}}
+    assert report["total_ms"] >= 0
@@ -0,0 +1,65 @@
+from src.helpers.spacy_pipeline import (
+    pattern_attrs,
+    prune_pipeline,
+    required_components,
+)
+
+
+class Pipeline:
+    """The parts of spacy.Language that pruning uses"""
+
+    def __init__(self, names):
+        self.pipeline = [(name, lambda doc: doc) for name in names]
+
+    @property
+    def pipe_names(self):
+        return [name for name, _ in self.pipeline]
+
+    def make_doc(self, text):
+        return text
+
+    def remove_pipe(self, name):
+        self.pipeline = [(n, c) for n, c in self.pipeline if n != name]
+
+
+def test_pattern_attrs():
+    patterns = {
+        "URL": [[{"LIKE_URL": True}]],
+        "Description": [[{"TAG": "JJ", "OP": "?"}, {"lower": "hair"}]],
+    }
+    assert pattern_attrs(patterns) == {
+        "URL": {"LIKE_URL"},
+        "Description": {"TAG", "LOWER"},
+    }
+
+
+def test_required_components():
+    required = required_components(
+        {
+            "all_caps_rule": ["ORTH"],
+            "Description": {"TAG", "LOWER"},
+            "Entity": ["ENT_TYPE"],
+        }
+    )
+    assert required == {"tagger": ["Description: TAG"], "ner": ["Entity: ENT_TYPE"]}
+
+
+def test_prune_pipeline_removes_unneeded_components():
+    nlp = Pipeline(["tagger", "parser", "ner"])
+    report = prune_pipeline(
+        nlp, {"tagger": ["Description: TAG"]}, ["a text", "another"]
+    )
+
+    assert nlp.pipe_names == ["tagger"]
+    assert report["kept"] == ["tagger"]
+    assert report["removed"] == ["parser", "ner"]
+    assert report["reasons"] == {"tagger": ["Description: TAG"]}
+    assert set(report["ms_per_doc"]) == {"tagger", "parser", "ner"}
+
+
+def test_prune_pipeline_without_timings():
+    nlp = Pipeline(["tagger", "parser", "ner"])
+    report = prune_pipeline(nlp, {})
+
+    assert nlp.pipe_names == []
+    assert report["ms_per_doc"] == {}
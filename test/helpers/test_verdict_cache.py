@@ -0,0 +1,40 @@
+import time
+
+from src.helpers.verdict_cache import VerdictCache, verdict_key
+
+
+def test_verdict_cache_evicts_least_recently_used():
+    cache = VerdictCache(max_size=2, ttl_seconds=60)
+    cache.set("a", (1, ["Complaint"]))
+    cache.set("b", (0, ["No_Complaint"]))
+    cache.get("a")
+    cache.set("c", (0, ["No_Complaint"]))
+
+    assert cache.get("a") == (1, ["Complaint"])
+    assert cache.get("b") is None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_verdict_cache_expires_entries():
+    cache = VerdictCache(max_size=2, ttl_seconds=0.01)
+    cache.set("a", (1, ["Complaint"]))
+    time.sleep(0.02)
+
+    assert cache.get("a", rule="complaint_rule") is None
+    assert cache.stats()["misses"] == {"complaint_rule": 1}
+
+
+def test_verdict_cache_returns_copies():
+    cache = VerdictCache(max_size=2, ttl_seconds=60)
+    cache.set("a", (1, ["alice"]))
+    cache.get("a")[1].append("bob")
+
+    assert cache.get("a") == (1, ["alice"])
+
+
+def test_verdict_key_depends_on_version_and_arguments():
+    key = verdict_key("names_rule", "v1", ("Thanks Alice",), {"org_name": "A"})
+
+    assert key == verdict_key("names_rule", "v1", ("Thanks Alice",), {"org_name": "A"})
+    assert key != verdict_key("names_rule", "v2", ("Thanks Alice",), {"org_name": "A"})
+    assert key != verdict_key("names_rule", "v1", ("Thanks Alice",), {"org_name": "B"})
@@ -0,0 +1,33 @@
+import re
+
+import pytest
+
+from src.helpers.word_automaton import WordAutomaton, WordListMatcher
+
+
+def test_automaton_finds_overlapping_words():
+    automaton = WordAutomaton(["he", "she", "hers", "his"])
+    matches = {
+        (start, end, word) for start, end, word in automaton.iter_matches("ushers")
+    }
+    assert matches == {(1, 4, "she"), (2, 4, "he"), (2, 6, "hers")}
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "load of rubbish don't go there the doctor is a prick",
+        "pricks and prickly pears",
+        "piss off, said the _piss_ artist",
+        "pissoff prick!prick",
+        "",
+    ],
+)
+def test_matcher_agrees_with_regex_search(text):
+    words = ["prick", "piss", "piss off", "b.tch"]
+    expected = {word for word in words if re.search(r"\b" + word + r"\b", text)}
+    assert set(WordListMatcher(words).find_words(text)) == expected
+
+
+def test_matcher_keeps_regex_entries():
+    assert WordListMatcher(["b.tch"]).find_words("what a bitch") == ["b.tch"]
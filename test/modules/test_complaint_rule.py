@@ -3,7 +3,7 @@ import json
 import pytest
 
 from src.helpers import common_functions
-from src.modules.complaint_rule import complaint_rule
+from src.modules.complaint_rule import complaint_rule, complaint_rule_batch
 
 common_functions.load_env_variables()
 
@@ -37,6 +37,15 @@ def test_complaint_rule(body, expected):
     assert complaint_rule(body) == expected
 
 
+def test_complaint_rule_batch():
+    """
+    Checks that scoring a title and comment together gives the same results as
+    scoring each on its own.
+    """
+    bodies = [test_comments["suing"]["Comment"], test_comments["terrible"]["Comment"]]
+    assert complaint_rule_batch(bodies) == [(1, ["Complaint"]), (0, ["No_Complaint"])]
+
+
 def test_complaints_rule_logging(caplog):
     """
     Checks that any triggering of the complaints rule is properly recorded to the log.
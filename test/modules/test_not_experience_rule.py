@@ -3,7 +3,10 @@ import json
 import pytest
 
 from src.helpers import common_functions
-from src.modules.not_experience_rule import not_experience_rule
+from src.modules.not_experience_rule import (
+    not_experience_rule,
+    not_experience_rule_batch,
+)
 
 common_functions.load_env_variables()
 
@@ -22,6 +25,17 @@ def test_not_experience_rule(body, expected):
     assert not_experience_rule(body) == expected
 
 
+def test_not_experience_rule_batch():
+    bodies = [
+        "Great service",
+        test_comments["not_an_experience"]["Comment"],
+        test_comments["an_experience"]["Comment"],
+    ]
+    assert not_experience_rule_batch(bodies) == [
+        not_experience_rule(body) for body in bodies
+    ]
+
+
 def test_nae_logging(caplog):
     input_for_error = 5
     with pytest.raises(Exception):
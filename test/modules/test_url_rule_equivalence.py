@@ -0,0 +1,103 @@
+import random
+
+import pytest
+import regex
+
+import src.modules.url_rule as url_rule
+
+# The URL regex as it was before the TLD trie and prefilter, kept verbatim
+LEGACY_URL_REGEX = regex.compile(
+    r"(?i)\b((?:ftp|ftps|http|https?:(?:/{1,3}|[a-z0-9%])|[a-z0-9.\-]+[.](?:com|net|org|edu|gov|mil|aero|asia|biz|cat|coop|info|int|jobs|mobi|museum|name|post|pro|tel|travel|xxx|ac|ad|ae|af|ag|ai|al|am|an|ao|aq|ar|as|at|au|aw|ax|az|ba|bb|bd|be|bf|bg|bh|bi|bj|bm|bn|bo|br|bs|bt|bv|bw|by|bz|ca|cc|cd|cf|cg|ch|ci|ck|cl|cm|cn|co|cr|cs|cu|cv|cx|cy|cz|dd|de|dj|dk|dm|do|dz|ec|ee|eg|eh|er|es|et|eu|fi|fj|fk|fm|fo|fr|ga|gb|gd|ge|gf|gg|gh|gi|gl|gm|gn|gp|gq|gr|gs|gt|gu|gw|gy|hk|hm|hn|hr|ht|hu|id|ie|il|im|in|io|iq|ir|is|it|je|jm|jo|jp|ke|kg|kh|ki|km|kn|kp|kr|kw|ky|kz|la|lb|lc|li|lk|lr|ls|lt|lu|lv|ly|ma|mc|md|me|mg|mh|mk|ml|mm|mn|mo|mp|mq|mr|ms|mt|mu|mv|mw|mx|my|mz|na|nc|ne|nf|ng|ni|nl|no|np|nr|nu|nz|om|pa|pe|pf|pg|ph|pk|pl|pm|pn|pr|ps|pt|pw|py|qa|re|ro|rs|ru|rw|sa|sb|sc|sd|se|sg|sh|si|sj|Ja|sk|sl|sm|sn|so|sr|ss|st|su|sv|sx|sy|sz|tc|td|tf|tg|th|tj|tk|tl|tm|tn|to|tp|tr|tt|tv|tw|tz|ua|ug|uk|us|uy|uz|va|vc|ve|vg|vi|vn|vu|wf|ws|ye|yt|yu|za|zm|zw)/)(?:[^\s()<>{}\[\]]+|\([^\s()]*?\([^\s()]+\)[^\s()]*?\)|\([^\s]+?\))+(?:\([^\s()]*?\([^\s()]+\)[^\s()]*?\)|\([^\s]+?\)|[^\s`!()\[\]{};:'\".,<>?«»“”‘’])|(?:(?<!@)[a-z0-9]+(?:[.\-][a-z0-9]+)*[.](?:com|net|org|edu|gov|mil|aero|asia|biz|cat|coop|info|int|jobs|mobi|museum|name|post|pro|tel|travel|xxx|ac|ad|ae|af|ag|ai|al|am|an|ao|aq|ar|as|at|au|aw|ax|az|ba|bb|bd|be|bf|bg|bh|bi|bj|bm|bn|bo|br|bs|bt|bv|bw|by|bz|ca|cc|cd|cf|cg|ch|ci|ck|cl|cm|cn|co|cr|cs|cu|cv|cx|cy|cz|dd|de|dj|dk|dm|do|dz|ec|ee|eg|eh|er|es|et|eu|fi|fj|fk|fm|fo|fr|ga|gb|gd|ge|gf|gg|gh|gi|gl|gm|gn|gp|gq|gr|gs|gt|gu|gw|gy|hk|hm|hn|hr|ht|hu|id|ie|il|im|in|io|iq|ir|is|it|je|jm|jo|jp|ke|kg|kh|ki|km|kn|kp|kr|kw|ky|kz|la|lb|lc|li|lk|lr|ls|lt|lu|lv|ly|ma|mc|md|me|mg|mh|mk|ml|mm|mn|mo|mp|mq|mr|ms|mt|mu|mv|mw|mx|my|mz|na|nc|ne|nf|ng|ni|nl|no|np|nr|nu|nz|om|pa|pe|pf|pg|ph|pk|pl|pm|pn|pr|ps|pt|pw|py|qa|re|ro|rs|ru|rw|sa|sb|sc|sd|se|sg|sh|si|sj|Ja|sk|sl|sm|sn|so|sr|ss|st|su|sv|sx|sy|sz|tc|td|tf|tg|th|tj|tk|tl|tm|tn|to|tp|tr|tt|tv|tw|tz|ua|ug|uk|us|uy|uz|va|vc|ve|vg|vi|vn|vu|wf|ws|ye|yt|yu|za|zm|zw)\b/?(?!@)))"
+)
+
+CORPUS = [
+    "You should really go to this address:http://www.foufos.gr",
+    "There's a better Dr here: https://www.fouFos.gr",
+    "And a better Dr here http://foufos.gr or here tbh http://betterdr.it",
+    "http://www.foufos.gr/kino is where I had better luck",
+    "www.mp3.com www.t.co www.bookthebestholiday.travel www.foufos-.gr",
+    "the nhs.uk website and gov.uk/guidance both said to call 111",
+    "I emailed name@example.com and mailto:name@example.com",
+    "rdar://1234 ///:ss ... ...? a.b.c 1.5mg 10.30am e.g. i.e.",
+    "httpfoo ftpserver ftps https HTTPS://EXAMPLE.COM FTP://files.example.org/a.txt",
+    "see example.com/ (or example.co.uk) and [example.net] {example.org}",
+    "(see http://example.com/path_(with)_parens) and http://example.com/a(b(c)d)e",
+    "visit WWW.EXAMPLE.CO, www.example.coop; www.example.comx and example.museum.",
+    "Dr.Smith was great.Really great.The staff were kind.Ja.ja was mentioned",
+    "call 0800 123 4567 at 9:30 or 10:45, ward 5/6",
+    "“quoted www.example.com” and ‘example.org’ and «example.net»",
+    "Kelvin \u212a and long s \u017f: example.\u212ae and example.\u017fe",
+    "This is a normal review with no links in it at all",
+    "tabs\tand\nnewlines\u00a0www.example.com\u3000example.org\u2028http://x.co",
+    "separators\x1cwww.example.com\x1fexample.org and name @example.com @ example.net",
+    "",
+]
+
+URL_FRAGMENTS = [
+    "http://",
+    "https://",
+    "ftp://",
+    "www.",
+    ".com",
+    ".co",
+    ".uk",
+    ".org/",
+    "/path",
+    "?q=1",
+    "(x)",
+    ":",
+    "@",
+    "-",
+    "mp3",
+    "http",
+    "ftps",
+    ".",
+    "..",
+    "nhs",
+    "gov",
+]
+WORDS = ["the", "doctor", "was", "kind", "Ja", "co", "com", "uk", "surgery", "3"]
+
+
+def generated_corpus(n, seed=7):
+    """Random strings of review words, URL fragments and punctuation"""
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(n):
+        parts = [
+            rng.choice(URL_FRAGMENTS) if rng.random() < 0.4 else rng.choice(WORDS)
+            for _ in range(rng.randint(1, 12))
+        ]
+        texts.append(
+            "".join(
+                p + rng.choice(["", "", " ", ".", "/", ",", "\n", "\u00a0", "\x1c"])
+                for p in parts
+            )
+        )
+    return texts
+
+
+def test_url_pattern_template_reproduces_legacy_regex():
+    assert url_rule.url_pattern("|".join(url_rule.URL_TLDS)) == LEGACY_URL_REGEX.pattern
+
+
+def test_tld_trie_pattern_matches_the_same_tlds():
+    trie = regex.compile(
+        r"(?i)(?:" + url_rule.tld_trie_pattern(url_rule.URL_TLDS) + r")"
+    )
+    alternation = regex.compile(r"(?i)(?:" + "|".join(url_rule.URL_TLDS) + r")")
+    candidates = (
+        set(url_rule.URL_TLDS)
+        | {a + b for a in "acjmoz" for b in "abcemostuz"}
+        | {"coo", "comx", "aer", "museu", "JA", "Ja", "xx", "travels"}
+    )
+    for candidate in candidates:
+        assert bool(trie.fullmatch(candidate)) == bool(
+            alternation.fullmatch(candidate)
+        ), candidate
+
+
+@pytest.mark.parametrize("text", CORPUS + generated_corpus(500))
+def test_find_match_for_url_rule_matches_legacy_regex(text):
+    expected = LEGACY_URL_REGEX.findall(text)
+    assert url_rule.find_match_for_url_rule(text) == (int(bool(expected)), expected)
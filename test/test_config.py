@@ -0,0 +1,60 @@
+import json
+import os
+import subprocess
+import sys
+import textwrap
+
+# The settings are read when config is first imported, so each check runs in a fresh
+# process that finds the .env file written for it
+READ_SETTINGS = textwrap.dedent(
+    """
+    import json
+    import sys
+
+    import dotenv.main
+
+    dotenv.main.find_dotenv = lambda *args, **kwargs: sys.argv[1]
+
+    import config
+    from helpers.common_functions import is_admin_authorization
+
+    print(json.dumps({
+        "admin_key": config.ADMIN_API_KEY,
+        "watch_seconds": config.LEXICON_WATCH_SECONDS,
+        "admin": is_admin_authorization("Bearer from-dotenv"),
+    }))
+    """
+)
+
+
+def read_settings(tmp_path, **environ):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env_file = tmp_path / ".env"
+    env_file.write_text("AdminKey=from-dotenv\nLexiconWatchSeconds=7\n")
+    env = {
+        name: value
+        for name, value in os.environ.items()
+        if name not in {"AdminKey", "LexiconWatchSeconds", "environmentShort"}
+    }
+    env.update(environ, PYTHONPATH=os.path.join(root, "src"))
+    result = subprocess.run(
+        [sys.executable, "-c", READ_SETTINGS, str(env_file)],
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=60,
+        check=True,
+    )
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def test_settings_in_a_dotenv_file_take_effect(tmp_path):
+    settings = read_settings(tmp_path)
+
+    assert settings == {"admin_key": "from-dotenv", "watch_seconds": 7.0, "admin": True}
+
+
+def test_deployed_environments_ignore_a_dotenv_file(tmp_path):
+    settings = read_settings(tmp_path, environmentShort="PROD")
+
+    assert settings == {"admin_key": None, "watch_seconds": 60.0, "admin": False}
@@ -0,0 +1,156 @@
+import asyncio
+import json
+
+import pytest
+
+REVIEWS = [
+    {
+        "id": "test-1",
+        "request": [
+            {"id": "title", "text": "Great service"},
+            {
+                "id": "comment",
+                "text": "The receptionist was friendly and the doctor explained everything clearly",
+            },
+        ],
+        "organisation-name": "dummyorganisation",
+    },
+    {
+        "id": "test-2",
+        "request": [
+            {"id": "title", "text": "TERRIBLE WAIT AT THE SURGERY"},
+            {
+                "id": "comment",
+                "text": "I waited two hours. Email me at someone@example.com or see www.example.com for the details",
+            },
+        ],
+        "organisation-name": "dummyorganisation",
+    },
+]
+
+
+def post_flask(path, body, headers=None):
+    # The apps load the word lists and endpoints on import, so a missing list fails
+    # these tests rather than the collection of the whole suite
+    from src.app import app as flask_app
+
+    response = flask_app.test_client().post(
+        path, data=body, content_type="application/json", headers=headers or {}
+    )
+    return response.status_code, dict(response.headers), response.get_data()
+
+
+def post_asgi(path, body, method="POST", headers=None):
+    from src.asgi_app import app as asgi_app
+
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        "type": "http",
+        "method": method,
+        "path": path,
+        "headers": [(b"content-type", b"application/json")]
+        + [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()],
+    }
+    asyncio.run(asgi_app(scope, receive, send))
+
+    start, *body_messages = messages
+    headers = {k.decode().title(): v.decode() for k, v in start["headers"]}
+    return start["status"], headers, b"".join(m["body"] for m in body_messages)
+
+
+ENTRY_POINTS = {"flask": post_flask, "asgi": post_asgi}
+
+
+@pytest.fixture(params=sorted(ENTRY_POINTS))
+def post(request):
+    return ENTRY_POINTS[request.param]
+
+
+@pytest.mark.parametrize("review", REVIEWS)
+def test_automoderator_response(post, review):
+    status, headers, body = post("/automoderator", json.dumps(review).encode())
+    result = json.loads(body)
+
+    assert status == 200
+    assert headers["Content-Type"] == "application/json"
+    assert headers["X-Lexicon-Version"]
+    assert result["id"] == review["id"]
+    assert [text["id"] for text in result["response"]] == ["title", "comment"]
+    for text in result["response"]:
+        assert all({"rule", "code", "values"} <= set(r) for r in text["results"])
+
+
+@pytest.mark.parametrize("review", REVIEWS)
+def test_entry_points_return_identical_json(review):
+    body = json.dumps(review).encode()
+    flask_status, flask_headers, flask_body = post_flask("/automoderator", body)
+    asgi_status, asgi_headers, asgi_body = post_asgi("/automoderator", body)
+
+    assert flask_status == asgi_status == 200
+    assert json.loads(flask_body) == json.loads(asgi_body)
+    assert flask_headers["X-Lexicon-Version"] == asgi_headers["X-Lexicon-Version"]
+
+
+def test_asgi_rejects_other_methods():
+    status, _, _ = post_asgi("/automoderator", b"", method="GET")
+    assert status == 405
+
+
+def test_asgi_rejects_invalid_json():
+    status, _, _ = post_asgi("/automoderator", b"not json")
+    assert status == 400
+
+
+ADMIN_KEY = "test-admin-key"
+
+
+@pytest.fixture
+def admin_key(monkeypatch):
+    # The apps import common_functions as helpers.common_functions
+    monkeypatch.setattr("helpers.common_functions.ADMIN_API_KEY", ADMIN_KEY)
+    return {"Authorization": f"Bearer {ADMIN_KEY}"}
+
+
+def test_timing_breakdown_when_asked(post, admin_key):
+    review = REVIEWS[1]
+    _, _, plain = post("/automoderator", json.dumps(review).encode())
+    status, _, body = post(
+        "/automoderator",
+        json.dumps(review).encode(),
+        headers={"X-Debug-Timing": "1", **admin_key},
+    )
+    result = json.loads(body)
+    timing = result.pop("timing")
+
+    assert status == 200
+    assert "timing" not in json.loads(plain)
+    assert result == json.loads(plain)
+    assert {"parse_json_ms", "serialise_ms", "total_ms"} <= set(timing)
+    for field in ("title", "comment"):
+        assert "nlp_ms" in timing[field]
+        assert {"wall_ms", "queue_wait_ms"} <= set(timing[field]["rules"]["allCaps"])
+
+
+def test_timing_breakdown_from_request_field(post, admin_key):
+    review = dict(REVIEWS[0], **{"debug-timing": True})
+    _, _, body = post("/automoderator", json.dumps(review).encode(), headers=admin_key)
+
+    assert "timing" in json.loads(body)
+
+
+def test_timing_breakdown_needs_the_admin_key(post, admin_key):
+    review = dict(REVIEWS[0], **{"debug-timing": True})
+    _, _, body = post(
+        "/automoderator",
+        json.dumps(review).encode(),
+        headers={"X-Debug-Timing": "1", "Authorization": "Bearer wrong-key"},
+    )
+
+    assert "timing" not in json.loads(body)
@@ -1,5 +1,8 @@
-from src.hardrules import HardRules
+import time
+
+from src.hardrules import HardRules, apply_batch, apply_review
 from src.helpers import common_functions
+from src.rule_registry import LOCAL, REMOTE, STOP_ON_FAIL, Rule
 
 common_functions.load_env_variables()
 
@@ -10,3 +13,80 @@ def test_HardRules(
 ):
     obj = HardRules(body=comment, org_name=org)
     assert isinstance(obj.apply(), dict)
+
+
+def test_apply_batch():
+    reviews = [
+        ("Great service", "dummyorganisation"),
+        (
+            "This is a test comment to test the batch apply. Every text in the batch is parsed together and the rules are run in one shared pool",
+            "dummyorganisation",
+        ),
+    ]
+    results = apply_batch(reviews)
+    assert len(results) == len(reviews)
+    assert all(isinstance(result, dict) for result in results)
+
+
+def test_apply_review(org="dummyorganisation"):
+    title = "Great service"
+    comment = "This is a test comment to check that a review is moderated as one task graph, with the same reports as applying the rules to each text"
+    results = apply_review([title, comment], org_name=org)
+    assert results == [
+        HardRules(body=title, org_name=org).apply(),
+        HardRules(body=comment, org_name=org).apply(),
+    ]
+
+
+def test_apply_review_combined_calls_match(org="dummyorganisation"):
+    title = "Terrible experience"
+    comment = "I am going to take legal action against the practice, I was left waiting for hours and nobody would tell me why my appointment had been cancelled"
+    assert apply_review([title, comment], org_name=org, combine=True) == apply_review(
+        [title, comment], org_name=org, combine=False
+    )
+
+
+def test_HardRules_deadline(org="dummyorganisation"):
+    obj = HardRules(body="Great service", org_name=org)
+    results = obj.apply(deadline=time.monotonic())["results"]
+    timed_out = [result for result in results if result.get("timedOut")]
+    assert timed_out
+    assert all(result["code"] == 2 for result in timed_out)
+
+
+def test_apply_batch_deadline():
+    reviews = [("Great service", "dummyorganisation")] * 2
+    results = apply_batch(reviews, deadline=time.monotonic())
+    for result in results:
+        timed_out = [r for r in result["results"] if r.get("timedOut")]
+        assert timed_out
+        assert all(r["code"] == 2 for r in timed_out)
+
+
+def test_HardRules_stop_on_fail(org="dummyorganisation"):
+    called = []
+
+    def remote_rule(submission_words):
+        called.append(submission_words)
+        return 1, ["remote"]
+
+    rules = (
+        Rule(
+            "localRule",
+            lambda submission_words: (1, ["local"]),
+            {"submission_words": "text"},
+            LOCAL,
+        ),
+        Rule("remoteRule", remote_rule, {"submission_words": "text"}, REMOTE),
+    )
+    results = HardRules(
+        body="Great service", org_name=org, rules=rules, policy=STOP_ON_FAIL
+    ).apply()
+    assert [result["rule"] for result in results["results"]] == ["localRule"]
+    assert called == []
+
+    results = HardRules(body="Great service", org_name=org, rules=rules).apply()
+    assert [result["rule"] for result in results["results"]] == [
+        "localRule",
+        "remoteRule",
+    ]
@@ -0,0 +1,118 @@
+import os
+
+import src.lexicon
+from src.lexicon import (
+    LEXICON_SOURCES,
+    compile_lexicon,
+    get_lexicon,
+    load_lexicon,
+    reload_lexicon,
+    save_lexicon,
+    source_fingerprint,
+)
+
+
+def write_sources(path, extra_profanity=""):
+    for field, filename in LEXICON_SOURCES.items():
+        words = {
+            "acronyms": "NHS\nGP",
+            "profanity": "Damn\nprick" + extra_profanity,
+            "profanity_soft": "piss\npiss off",
+            "descriptions_adj": "fat",
+            "descriptions_nouns": "nurse",
+            "non_names": "Doctor",
+            "def_names": "Steve",
+        }[field]
+        with open(os.path.join(path, filename), "w", encoding="latin-1") as fh:
+            fh.write(words + "\n")
+
+
+def test_compile_lexicon(tmp_path):
+    write_sources(tmp_path)
+    lexicon = compile_lexicon(str(tmp_path))
+
+    assert lexicon.acronyms == {"NHS", "GP"}
+    assert lexicon.profanity == {"damn", "prick"}
+    assert lexicon.non_names == {"doctor"}
+    assert lexicon.def_names == {"steve"}
+    assert sorted(lexicon.profanity_soft.find_words("piss off")) == [
+        "piss",
+        "piss off",
+    ]
+
+
+def test_lexicon_artifact_round_trip(tmp_path):
+    write_sources(tmp_path)
+    artifact = str(tmp_path / "lexicon.pkl")
+    lexicon = compile_lexicon(str(tmp_path))
+    save_lexicon(lexicon, artifact, str(tmp_path))
+
+    loaded = load_lexicon(artifact, str(tmp_path))
+    assert loaded.version == lexicon.version
+    assert loaded.profanity == lexicon.profanity
+    assert loaded.profanity_soft.find_words("piss") == ["piss"]
+
+
+def test_stale_lexicon_artifact_is_ignored(tmp_path):
+    write_sources(tmp_path)
+    artifact = str(tmp_path / "lexicon.pkl")
+    lexicon = compile_lexicon(str(tmp_path))
+    save_lexicon(lexicon, artifact, str(tmp_path))
+
+    write_sources(tmp_path, extra_profanity="\nbloody")
+    assert load_lexicon(artifact, str(tmp_path)) is None
+    assert compile_lexicon(str(tmp_path)).version != lexicon.version
+
+
+def test_missing_or_corrupt_lexicon_artifact_is_ignored(tmp_path):
+    write_sources(tmp_path)
+    artifact = str(tmp_path / "lexicon.pkl")
+    assert load_lexicon(artifact, str(tmp_path)) is None
+
+    with open(artifact, "wb") as fh:
+        fh.write(b"not a pickle")
+    assert load_lexicon(artifact, str(tmp_path)) is None
+
+
+def test_lexicon_is_loaded_on_first_use(tmp_path, monkeypatch):
+    write_sources(tmp_path)
+    built = []
+
+    def build_lexicon():
+        built.append(compile_lexicon(str(tmp_path)))
+        return built[-1]
+
+    monkeypatch.setattr(src.lexicon, "_lexicon", None)
+    monkeypatch.setattr(src.lexicon, "build_lexicon", build_lexicon)
+    monkeypatch.setattr(
+        src.lexicon, "source_fingerprint", lambda: source_fingerprint(str(tmp_path))
+    )
+
+    assert get_lexicon() is get_lexicon() is built[0]
+    assert len(built) == 1
+
+
+def test_reload_lexicon_swaps_in_changed_lists(tmp_path, monkeypatch):
+    write_sources(tmp_path)
+    monkeypatch.setattr(src.lexicon, "_lexicon", compile_lexicon(str(tmp_path)))
+    monkeypatch.setattr(src.lexicon, "_fingerprint", source_fingerprint(str(tmp_path)))
+    snapshot = get_lexicon()
+
+    assert not reload_lexicon(str(tmp_path))
+
+    write_sources(tmp_path, extra_profanity="\nbloody")
+    assert reload_lexicon(str(tmp_path))
+    assert "bloody" in get_lexicon().profanity
+    # a request holding the old snapshot keeps its lists
+    assert "bloody" not in snapshot.profanity
+    assert not reload_lexicon(str(tmp_path))
+
+
+def test_failed_reload_keeps_current_lexicon(tmp_path, monkeypatch):
+    write_sources(tmp_path)
+    lexicon = compile_lexicon(str(tmp_path))
+    monkeypatch.setattr(src.lexicon, "_lexicon", lexicon)
+
+    os.remove(os.path.join(tmp_path, LEXICON_SOURCES["non_names"]))
+    assert not reload_lexicon(str(tmp_path), force=True)
+    assert get_lexicon() is lexicon
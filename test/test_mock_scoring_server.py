@@ -0,0 +1,102 @@
+import threading
+
+import pytest
+
+# The rules look their endpoints up as helpers.endpoints, so the registry they read is
+# the one to point at the mock server
+from helpers.endpoints import endpoints
+from src.eval_and_perform_tests.mock_scoring_server import (
+    RESPONSES,
+    Behaviour,
+    MockScoringServer,
+    env_settings,
+)
+from src.lexicon import Lexicon
+from src.modules.complaint_rule import complaint_rule, complaint_rule_batch
+from src.modules.descriptor_rule import descriptor_rule
+from src.modules.names_rule import names_rule
+from src.modules.not_experience_rule import (
+    not_experience_rule,
+    not_experience_rule_batch,
+)
+from src.modules.safeguarding_rule import safeguarding_rule
+
+LEXICON = Lexicon(
+    version="mock",
+    acronyms=frozenset(),
+    profanity=frozenset(),
+    profanity_soft=None,
+    descriptions_adj=frozenset({"rude"}),
+    descriptions_nouns=frozenset({"nurse"}),
+    non_names=frozenset({"doctor"}),
+    def_names=frozenset(),
+)
+LONG_ADVERT = (
+    "Click the link below to buy cheap appointments at our partner clinic today"
+)
+
+
+@pytest.fixture
+def mock_server(monkeypatch):
+    """The mock scoring server on a free port, with every endpoint pointed at it"""
+    server = MockScoringServer(
+        ("127.0.0.1", 0), {name: Behaviour() for name in RESPONSES}, seed=12
+    )
+    thread = threading.Thread(
+        target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+    )
+    thread.start()
+
+    for variable, value in env_settings(*server.server_address).items():
+        monkeypatch.setenv(variable, value)
+    monkeypatch.setattr(endpoints, "_endpoints", None)
+    endpoints.load()
+
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_complaint_rule_reads_the_mock(mock_server):
+    assert complaint_rule("I will complain to my solicitor")[0] == 1
+    assert complaint_rule("The staff were lovely")[0] == 0
+    assert [
+        verdict[0] for verdict in complaint_rule_batch(["legal action", "thank you"])
+    ] == [1, 0]
+
+
+def test_not_experience_rule_reads_the_mock(mock_server):
+    assert not_experience_rule(LONG_ADVERT) == (1, ["Not_an_experience"])
+    assert not_experience_rule_batch(
+        [LONG_ADVERT, "The reception staff were kind and helpful when I came in"]
+    ) == [(1, ["Not_an_experience"]), (0, ["Experience"])]
+
+
+def test_safeguarding_rule_reads_the_mock(mock_server):
+    assert safeguarding_rule("I want to end my life") == (
+        2,
+        ["Strongly Concerning"],
+        "0.91",
+    )
+    assert safeguarding_rule("A good visit")[0] == 0
+
+
+def test_names_rule_reads_the_mock(mock_server):
+    assert names_rule("The nurse Smith was rude", "dummyorg", lexicon=LEXICON) == (
+        1,
+        ["smith"],
+    )
+    assert names_rule("No names here", "dummyorg", lexicon=LEXICON) == (0, [])
+
+
+def test_descriptor_rule_reads_the_mock(mock_server):
+    assert descriptor_rule("The rude nurse was late", lexicon=LEXICON) == (
+        1,
+        ["rude nurse"],
+    )
+    assert descriptor_rule("A kind doctor", lexicon=LEXICON) == (0, [])
+
+
+def test_mock_counts_requests(mock_server):
+    safeguarding_rule("Counting this request")
+    assert mock_server.counts["safeguarding"]["requests"] >= 1
@@ -0,0 +1,63 @@
+import pytest
+
+from src.rule_registry import (
+    LOCAL,
+    REMOTE,
+    RULES,
+    RUN_ALL,
+    STOP_ON_FAIL,
+    Rule,
+    RuleConfigError,
+    active_rules,
+    run_stages,
+    validate_rules,
+)
+
+
+def rule(name, cost=LOCAL, inputs=None):
+    return Rule(name, lambda **kwargs: (0, []), inputs or {"text": "text"}, cost)
+
+
+def test_registered_rules_are_valid():
+    validate_rules(RULES)
+    assert [r.name for r in RULES] == [
+        "allCaps",
+        "emailRule",
+        "urlRule",
+        "profanityDetectionHard",
+        "profanityDetectionSoft",
+        "namesRule",
+        "descriptorRuleHard",
+        "safeguardingRule",
+        "complaintRule",
+        "notAnExperienceRule",
+    ]
+
+
+@pytest.mark.parametrize(
+    "rules",
+    [
+        (rule("a"), rule("a")),
+        (rule("a", inputs={"text": "title"}),),
+        (rule("a", cost="gpu"),),
+    ],
+)
+def test_invalid_rules_are_rejected(rules):
+    with pytest.raises(RuleConfigError):
+        validate_rules(rules)
+
+
+def test_active_rules_leave_out_disabled_rules():
+    rules = (rule("a"), rule("b"), rule("c"))
+    assert [r.name for r in active_rules(rules, ["b"])] == ["a", "c"]
+    with pytest.raises(RuleConfigError):
+        active_rules(rules, ["d"])
+
+
+def test_run_stages():
+    rules = (rule("a", REMOTE), rule("b"), rule("c", REMOTE), rule("d"))
+    assert run_stages(rules, RUN_ALL) == [[0, 1, 2, 3]]
+    assert run_stages(rules, STOP_ON_FAIL) == [[1, 3], [0, 2]]
+    assert run_stages(rules[1:2], STOP_ON_FAIL) == [[0]]
+    with pytest.raises(RuleConfigError):
+        run_stages(rules, "fastest")